@@ -0,0 +1,64 @@
+"""Measure the import time of the CLI with `python -X importtime`.
+
+    python benchmarks/startup.py --max-ms 150
+
+prints the slowest imports and exits with 1 when importing the CLI
+takes more than --max-ms milliseconds.
+"""
+
+import os
+import sys
+import argparse
+import subprocess
+from pathlib import Path
+
+SRC_PATH = Path(__file__).resolve().parents[1] / "src"
+MODULE = "adacord.cli.main"
+
+
+def import_times(module: str, runs: int):
+    """Return the best cumulative import time of every module, in µs."""
+    env = dict(os.environ, PYTHONPATH=str(SRC_PATH))
+    best = {}
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            env=env,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            check=True,
+        )
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            _, cumulative, name = line.split("|")
+            if not cumulative.strip().isdigit():
+                continue
+            name = name.strip()
+            us = int(cumulative)
+            best[name] = min(us, best.get(name, us))
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--module", default=MODULE)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--max-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    times = import_times(args.module, args.runs)
+    slowest = sorted(times.items(), key=lambda item: -item[1])
+    for name, us in slowest[: args.top]:
+        print(f"{us / 1000:8.1f} ms  {name}")
+
+    total_ms = times[args.module] / 1000
+    print(f"\nimport {args.module}: {total_ms:.1f} ms")
+    if args.max_ms is not None and total_ms > args.max_ms:
+        print(f"slower than {args.max_ms} ms", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
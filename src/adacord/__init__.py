@@ -1,4 +1,31 @@
+import sys
+
 __version__ = "0.1.13"
 
-from .cli.api import AdacordApi as api  # noqa: F401 imported but unused
-from .cli.commons import get_token  # noqa: F401 imported but unused
+# The SDK entry points are imported on first use, so that running the CLI
+# doesn't pay for requests and the rest of the SDK.
+_LAZY_ATTRIBUTES = {
+    "api": ("adacord.cli.api", "AdacordApi"),
+    "get_token": ("adacord.cli.commons", "get_token"),
+}
+
+if sys.version_info >= (3, 7):
+    import importlib
+
+    def __getattr__(name):
+        try:
+            module_name, attribute = _LAZY_ATTRIBUTES[name]
+        except KeyError:
+            raise AttributeError(
+                f"module {__name__!r} has no attribute {name!r}"
+            ) from None
+        value = getattr(importlib.import_module(module_name), attribute)
+        globals()[name] = value
+        return value
+
+    def __dir__():
+        return sorted([*globals(), *_LAZY_ATTRIBUTES])
+
+else:  # pragma: no cover
+    from .cli.api import AdacordApi as api  # noqa: F401 imported but unused
+    from .cli.commons import get_token  # noqa: F401 imported but unused
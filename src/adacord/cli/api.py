@@ -1,13 +1,45 @@
+import time
+import uuid
 import urllib
-from typing import Any, Dict, List, Union, Callable
+import threading
+import contextlib
+from typing import (
+    Any,
+    Dict,
+    List,
+    Tuple,
+    Union,
+    Callable,
+    Iterable,
+    Iterator,
+    Optional,
+)
 
 import requests
 from requests.auth import AuthBase
 
+from . import codec
+from .cache import QueryCache, BucketCache
+from .spool import Spool
+from .config import PUSH, QUERY, GET_DATA, ClientConfig
+from .writer import BucketWriter
 from .commons import get_token
+from .journal import PushJournal
+from .retries import RetryBudget, RetryPolicy
+from .uploads import (
+    DEFAULT_RETRIES,
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_MAX_BATCH_BYTES,
+    Chunk,
+    PushSummary,
+    ChunkedUploader,
+    iter_chunks,
+    iter_lingering_chunks,
+)
+from .columnar import materialize
 from .exceptions import AdacordApiError
-
-HTTP_TIMEOUT = 10
+from .jsonstream import READ_SIZE, iter_batches, iter_json_array
+from .compression import compress_body
 
 
 class AccessTokenAuth(AuthBase):
@@ -33,44 +65,165 @@ class CustomHTTPAdapter(requests.adapters.HTTPAdapter):
     """
     This adapter is a wrapper for the default HTTPAdapter for further
     customization. It does:
+        - retries with backoff, following the RetryPolicy.
         - custom exception raising.
     """
 
+    def __init__(self, *args, retry_policy: RetryPolicy = None, **kwargs):
+        self.retry_policy = retry_policy or RetryPolicy.default()
+        self._local = threading.local()
+        super().__init__(*args, **kwargs)
+
+    @contextlib.contextmanager
+    def single_attempt(self):
+        """Send the requests of the current thread once, for the callers
+        that retry on their own (e.g. the ChunkedUploader)."""
+        self._local.single_attempt = True
+        try:
+            yield
+        finally:
+            self._local.single_attempt = False
+
+    def _retry_delay(
+        self, policy: RetryPolicy, req, attempt: int, response=None, error=None
+    ):
+        # Streamed bodies can't be sent twice.
+        if not isinstance(req.body, (bytes, str, type(None))):
+            return None
+        if response is not None:
+            return policy.retry_delay(
+                req.method,
+                req.headers,
+                attempt,
+                status_code=response.status_code,
+                retry_after=response.headers.get("Retry-After"),
+            )
+        return policy.retry_delay(
+            req.method,
+            req.headers,
+            attempt,
+            maybe_processed=not isinstance(error, requests.ConnectTimeout),
+        )
+
+    def send_once(self, req, *args, **kwargs):
+        """Send the request a single time, without retries."""
+        return super().send(req, *args, **kwargs)
+
     def send(self, req, *args, **kwargs):
-        response = super().send(req, *args, **kwargs)
+        policy = self.retry_policy
+        if getattr(self._local, "single_attempt", False):
+            policy = RetryPolicy.disabled()
+        policy.record_request()
+        attempt = 0
+        while True:
+            try:
+                response = self.send_once(req, *args, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as error:
+                delay = self._retry_delay(policy, req, attempt, error=error)
+                if delay is None:
+                    raise
+            else:
+                if response.ok:
+                    break
+                delay = self._retry_delay(
+                    policy, req, attempt, response=response
+                )
+                if delay is None:
+                    break
+                response.close()
+            time.sleep(delay)
+            attempt += 1
+
         try:
             response.raise_for_status()
         except requests.HTTPError as error:
             raise AdacordApiError(
-                response.json(), status_code=response.status_code
+                codec.loads(response.content), status_code=response.status_code
             ) from error
         else:
             return response
 
 
 class HTTPClient(requests.Session):
-    """A class to make HTTP requests using the CustomHTTPAdapter."""
+    """A class to make HTTP requests using the CustomHTTPAdapter.
 
-    def __init__(self, auth: AuthBase = None):
+    The pool sizes and the timeouts come from the ClientConfig, by default
+    read from the config file and the environment variables.
+    """
+
+    def __init__(
+        self,
+        auth: AuthBase = None,
+        retry_policy: RetryPolicy = None,
+        config: ClientConfig = None,
+    ):
         super().__init__()
         self.auth: AuthBase = auth
-        adapter = CustomHTTPAdapter()
+        self.config = config or ClientConfig.from_env()
+        adapter = CustomHTTPAdapter(
+            pool_connections=self.config.pool_connections,
+            pool_maxsize=self.config.pool_maxsize,
+            pool_block=self.config.pool_block,
+            retry_policy=retry_policy,
+        )
         self.mount("http://", adapter)
         self.mount("https://", adapter)
 
-    def request(self, method: str, url: str, *args, **kwargs):
-        response = super().request(
-            method, url, timeout=HTTP_TIMEOUT, *args, **kwargs
-        )
+    @property
+    def retry_policy(self) -> Optional[RetryPolicy]:
+        return getattr(self.adapters.get("https://"), "retry_policy", None)
+
+    def timeout_for(self, operation: str = None) -> Tuple[float, float]:
+        return self.config.timeouts.for_operation(operation)
+
+    def _encode_body(self, kwargs: Dict[str, Any]):
+        """Encode the json body with the codec, compress it if big enough."""
+        headers = dict(kwargs.get("headers") or {})
+        if kwargs.get("json") is not None:
+            kwargs["data"] = codec.dumps(kwargs["json"])
+            kwargs["json"] = None
+            headers.setdefault("Content-Type", "application/json")
+        if self.config.compression and isinstance(kwargs.get("data"), bytes):
+            kwargs["data"], compression_headers = compress_body(
+                kwargs["data"],
+                self.config.compression,
+                self.config.compression_level,
+                self.config.compression_threshold,
+            )
+            headers.update(compression_headers)
+        kwargs["headers"] = headers
+
+    def request(
+        self, method: str, url: str, *args, retry: bool = True, **kwargs
+    ):
+        """Send the request, `retry=False` sends it once, whatever the
+        RetryPolicy of the adapter."""
+        kwargs.setdefault("timeout", self.timeout_for())
+        self._encode_body(kwargs)
+        adapter = self.get_adapter(url)
+        if retry or not isinstance(adapter, CustomHTTPAdapter):
+            response = super().request(method, url, *args, **kwargs)
+        else:
+            with adapter.single_attempt():
+                response = super().request(method, url, *args, **kwargs)
         if not response.ok:
             raise AdacordApiError(
-                response.json(), status_code=response.status_code
+                codec.loads(response.content), status_code=response.status_code
             )
         return response
 
     @classmethod
-    def with_token(cls, token: str) -> "HTTPClient":
-        return cls(auth=AccessTokenAuth(token_getter=lambda: token))
+    def with_token(
+        cls,
+        token: str,
+        retry_policy: RetryPolicy = None,
+        config: ClientConfig = None,
+    ) -> "HTTPClient":
+        return cls(
+            auth=AccessTokenAuth(token_getter=lambda: token),
+            retry_policy=retry_policy,
+            config=config,
+        )
 
 
 class ApiClient:
@@ -99,13 +252,13 @@ class User(ApiClient):
         data = {"email": email, "password": password}
         url = self.url_for("/users/token")
         response = self.client.post(url, json=data, auth=False)
-        return response.json()
+        return codec.loads(response.content)
 
     def request_password_reset(self, email: str) -> Dict[str, Any]:
         data = {"email": email}
         url = self.url_for("/users/password_reset")
         response = self.client.post(url, json=data, auth=False)
-        return response.json()
+        return codec.loads(response.content)
 
     def request_verification_email(
         self, email: str, password: str
@@ -113,10 +266,33 @@ class User(ApiClient):
         data = {"email": email, "password": password}
         url = self.url_for("/users/verification_email")
         response = self.client.post(url, json=data, auth=False)
-        return response.json()
+        return codec.loads(response.content)
+
+
+def is_uuid(value: str) -> bool:
+    try:
+        uuid.UUID(value)
+    except ValueError:
+        return False
+    return True
+
+
+def paginate_query(query: str, limit: int, offset: int) -> str:
+    """Wrap the query to return a single page of its results."""
+    query = query.strip().rstrip(";")
+    return f"SELECT * FROM ({query}) LIMIT {limit} OFFSET {offset}"
 
 
 class Buckets(ApiClient):
+    def __init__(self, client: HTTPClient, cache: BucketCache = None):
+        super().__init__(client)
+        self.cache = cache or BucketCache(ttl=0)
+
+    def _scope(self) -> str:
+        """What tells the credentials apart, for the caches."""
+        auth = self.client.auth
+        return auth.get_token() if isinstance(auth, AccessTokenAuth) else ""
+
     def _bucket_from_payload(
         self, bucket_payload: Dict[str, Any]
     ) -> Union["Bucket", List["Bucket"]]:
@@ -136,65 +312,316 @@ class Buckets(ApiClient):
         }
         url = self.url_for("/buckets")
         response = self.client.post(url, json=data)
-        bucket_payload = response.json()
+        bucket_payload = codec.loads(response.content)
+        self.cache.set(self._scope(), bucket_payload)
         return self._bucket_from_payload(bucket_payload)
 
     def list(self) -> List["Bucket"]:
         endpoint = "/buckets"
         url = self.url_for(endpoint)
         response = self.client.get(url)
-        bucket_payload = response.json()
+        bucket_payload = codec.loads(response.content)
+        self.cache.set(self._scope(), *bucket_payload)
         return [
             self._bucket_from_payload(payload) for payload in bucket_payload
         ]
 
     def get(self, bucket: str) -> "Bucket":
-        """Return a Bucket.
+        """Return a Bucket, from the cache if fresh.
         Args:
             bucket: the name or the uuid of the bucket.
         """
-        endpoint = f"/buckets/{bucket}"
-        url = self.url_for(endpoint)
-        response = self.client.get(url)
-        bucket_payload = response.json()
+        bucket_payload = self.cache.get(self._scope(), bucket)
+        if bucket_payload is None:
+            endpoint = f"/buckets/{bucket}"
+            url = self.url_for(endpoint)
+            response = self.client.get(url)
+            bucket_payload = codec.loads(response.content)
+            self.cache.set(self._scope(), bucket_payload)
         return self._bucket_from_payload(bucket_payload)
 
+    def reference(self, bucket: str) -> "Bucket":
+        """Return a Bucket for the operations that only need its uuid
+        (push, tokens...): no request is made when `bucket` is a uuid
+        that is not cached, the metadata of that Bucket are None.
+        Args:
+            bucket: the name or the uuid of the bucket.
+        """
+        if self.cache.get(self._scope(), bucket) is None and is_uuid(bucket):
+            return Bucket(BucketArgs.from_uuid(bucket), buckets_router=self)
+        return self.get(bucket)
+
     def delete(self, bucket: str) -> Dict[str, Any]:
+        self.cache.invalidate(self._scope(), bucket)
         url = self.url_for(f"/buckets/{bucket}")
         response = self.client.delete(url)
-        return response.json()
+        return codec.loads(response.content)
 
     def create_token(self, bucket: str, description: str = None):
         data = {"description": description}
         url = self.url_for(f"/buckets/{bucket}/tokens")
         response = self.client.post(url, json=data)
-        return response.json()
+        return codec.loads(response.content)
 
     def get_tokens(self, bucket: str):
         url = self.url_for(f"/buckets/{bucket}/tokens")
         response = self.client.get(url)
-        return response.json()
+        return codec.loads(response.content)
 
     def delete_token(self, bucket: str, token_uuid: str):
         url = self.url_for(f"/buckets/{bucket}/tokens/{token_uuid}")
         response = self.client.delete(url)
-        return response.json()
+        return codec.loads(response.content)
+
+    def _iter_rows(self, method: str, url: str, **kwargs) -> Iterator[Any]:
+        """Stream the response and parse the rows one at a time.
+
+        If the server paginates the results with a Link header, the next
+        pages are fetched as the rows are consumed.
+        """
+        while url:
+            response = self.client.request(method, url, stream=True, **kwargs)
+            with contextlib.closing(response):
+                yield from iter_json_array(
+                    response.iter_content(chunk_size=READ_SIZE)
+                )
+                url = response.links.get("next", {}).get("url")
+
+    def iter_query(
+        self, query: str, batch_size: int = None, page_size: int = None
+    ) -> Iterator[Union[Dict[str, Any], List[Dict[str, Any]]]]:
+        """Run the query and yield its rows lazily, with flat memory usage.
+        Args:
+            query: the SQL query.
+            batch_size: yield lists of `batch_size` rows instead of rows.
+            page_size: split the query in pages of `page_size` rows,
+                using LIMIT/OFFSET, each page is a request.
+        """
+        rows = self._iter_query_rows(query, page_size)
+        if batch_size:
+            return iter_batches(rows, batch_size)
+        return rows
+
+    def _iter_query_rows(
+        self, query: str, page_size: int = None
+    ) -> Iterator[Dict[str, Any]]:
+        url = self.url_for("/buckets/query")
+        timeout = self.client.timeout_for(QUERY)
+        if not page_size:
+            data = {"query": query}
+            yield from self._iter_rows("POST", url, json=data, timeout=timeout)
+            return
+
+        offset = 0
+        while True:
+            data = {"query": paginate_query(query, page_size, offset)}
+            count = 0
+            for row in self._iter_rows(
+                "POST", url, json=data, timeout=timeout
+            ):
+                count += 1
+                yield row
+            if count < page_size:
+                return
+            offset += page_size
+
+    def _cached_query(self, query: str, cache: QueryCache) -> bytes:
+        """Return the body of the query response, from the cache if fresh.
+
+        A stale result is revalidated with its ETag, if any.
+        """
+        url = self.url_for("/buckets/query")
+        key = cache.key(url, self._scope(), query)
+        entry = cache.get(key)
+        if entry and entry.fresh:
+            return entry.body
+
+        headers = {}
+        if entry and entry.etag:
+            headers["If-None-Match"] = entry.etag
+        response = self.client.post(
+            url,
+            json={"query": query},
+            headers=headers,
+            timeout=self.client.timeout_for(QUERY),
+        )
+        if entry and response.status_code == 304:
+            if cache.ttl > 0:
+                cache.refresh(key)
+            return entry.body
+        # With a ttl of 0 the results are never fresh, nor worth storing.
+        if cache.ttl > 0:
+            cache.set(key, response.content, response.headers.get("ETag"))
+        return response.content
+
+    def query(
+        self,
+        query: str,
+        as_: str = None,
+        dtypes: Dict[str, str] = None,
+        cache: QueryCache = None,
+    ) -> Union[List[Dict[str, Any]], Any]:
+        """Run the query and return its rows.
+        Args:
+            query: the SQL query.
+            as_: return the rows in columnar format instead of a list:
+                "numpy" (a dict of arrays), "arrow" or "pandas".
+            dtypes: the dtype of some columns (e.g. "int64", "string"),
+                by default it's inferred from the values.
+            cache: reuse the results of the same query from this cache.
+
+        The columnar formats are built while the response is parsed,
+        without a list of rows in between.
+        """
+        if cache is not None:
+            body = self._cached_query(query, cache)
+            if as_ is not None:
+                return materialize(iter_json_array([body]), as_, dtypes)
+            return codec.loads(body)
+
+        if as_ is not None:
+            return materialize(self.iter_query(query), as_, dtypes)
 
-    def query(self, query: str) -> List[Dict[str, Any]]:
         data = {"query": query}
-        response = self.client.post(self.url_for("/buckets/query"), json=data)
-        return response.json()
+        response = self.client.post(
+            self.url_for("/buckets/query"),
+            json=data,
+            timeout=self.client.timeout_for(QUERY),
+        )
+        return codec.loads(response.content)
+
+    def _retry_budget(self) -> Optional[RetryBudget]:
+        policy = getattr(self.client, "retry_policy", None)
+        return policy.budget if policy else None
+
+    def push_data(
+        self,
+        bucket: str,
+        rows: Iterable[Dict[str, Any]],
+        batch_size: int = None,
+        max_batch_bytes: int = None,
+        on_progress: Callable[[Chunk, PushSummary], None] = None,
+        concurrency: int = None,
+        retries: int = DEFAULT_RETRIES,
+        journal: PushJournal = None,
+        linger: float = None,
+    ) -> Union[Dict[str, Any], PushSummary]:
+        """Push rows into the bucket.
+        Args:
+            bucket: the name or the uuid of the bucket.
+            rows: the rows to push, any iterable (e.g. a generator) works.
+            batch_size: the max number of rows sent in a single request.
+            max_batch_bytes: the max size of the body of a single request.
+            on_progress: called after every chunk has been pushed.
+            concurrency: the number of chunks uploaded in parallel.
+            retries: how many times a failed chunk is sent again.
+            journal: record the acknowledged chunks, to resume the push
+                if it fails. The chunk sizes of the journal are used.
+            linger: for endless streams of rows, also send a chunk once
+                its first row has waited these seconds.
+
+        Without `batch_size`, `max_batch_bytes`, `concurrency` and
+        `journal` all the rows are sent in a single request and the
+        response payload is returned, otherwise the rows are streamed in
+        chunks and a PushSummary is returned. Every chunk has its own
+        idempotency key, so retrying it can't duplicate rows. PushError
+        is raised if a chunk can't be pushed.
+        """
+        options = (batch_size, max_batch_bytes, concurrency, journal, linger)
+        chunked = options != (None,) * 5
+        if not chunked:
+            data = {"data": rows}
+            response = self.client.post(
+                self.url_for(f"/buckets/{bucket}/data"),
+                json=data,
+                timeout=self.client.timeout_for(PUSH),
+            )
+            return codec.loads(response.content)
+
+        if journal is not None:
+            return self._push_journaled(
+                bucket, rows, journal, on_progress, concurrency, retries
+            )
+        if batch_size is None and max_batch_bytes is None:
+            batch_size = DEFAULT_BATCH_SIZE
+            max_batch_bytes = DEFAULT_MAX_BATCH_BYTES
+        key_prefix = uuid.uuid4().hex
+        if linger is not None:
+            chunks = iter_lingering_chunks(
+                rows, batch_size, max_batch_bytes, linger, key_prefix
+            )
+        else:
+            chunks = iter_chunks(
+                rows, batch_size, max_batch_bytes, key_prefix=key_prefix
+            )
+        uploader = ChunkedUploader(
+            send=lambda chunk: self.push_chunk(bucket, chunk),
+            on_progress=on_progress,
+            concurrency=concurrency or 1,
+            retries=retries,
+            budget=self._retry_budget(),
+        )
+        return uploader.push(chunks)
+
+    def _push_journaled(
+        self,
+        bucket: str,
+        rows: Iterable[Dict[str, Any]],
+        journal: PushJournal,
+        on_progress: Callable[[Chunk, PushSummary], None],
+        concurrency: int,
+        retries: int,
+    ) -> PushSummary:
+        def ack(chunk: Chunk, summary: PushSummary):
+            journal.ack(chunk)
+            if on_progress:
+                on_progress(chunk, summary)
+
+        uploader = ChunkedUploader(
+            send=lambda chunk: self.push_chunk(bucket, chunk),
+            on_progress=ack,
+            concurrency=concurrency or 1,
+            retries=retries,
+            budget=self._retry_budget(),
+        )
+        summary = uploader.push(journal.pending(rows))
+        journal.delete()
+        return summary
 
-    def push_data(self, bucket: str, rows: List[Dict[str, Any]]):
-        data = {"data": rows}
+    def push_chunk(self, bucket: str, chunk: Chunk) -> Dict[str, Any]:
+        """Send the chunk once, the ChunkedUploader retries it."""
         response = self.client.post(
-            self.url_for(f"/buckets/{bucket}/data"), json=data
+            self.url_for(f"/buckets/{bucket}/data"),
+            data=chunk.payload,
+            headers=chunk.headers,
+            timeout=self.client.timeout_for(PUSH),
+            retry=False,
         )
-        return response.json()
+        return codec.loads(response.content)
 
     def get_data(self, bucket: str) -> List[Dict[str, Any]]:
-        response = self.client.get(self.url_for(f"/buckets/{bucket}/data"))
-        return response.json()
+        response = self.client.get(
+            self.url_for(f"/buckets/{bucket}/data"),
+            timeout=self.client.timeout_for(GET_DATA),
+        )
+        return codec.loads(response.content)
+
+    def iter_data(
+        self, bucket: str, batch_size: int = None
+    ) -> Iterator[Union[Dict[str, Any], List[Dict[str, Any]]]]:
+        """Yield the rows of the bucket lazily, with flat memory usage.
+        Args:
+            bucket: the name or the uuid of the bucket.
+            batch_size: yield lists of `batch_size` rows instead of rows.
+        """
+        rows = self._iter_rows(
+            "GET",
+            self.url_for(f"/buckets/{bucket}/data"),
+            timeout=self.client.timeout_for(GET_DATA),
+        )
+        if batch_size:
+            return iter_batches(rows, batch_size)
+        return rows
 
 
 class ApiTokens(ApiClient):
@@ -202,17 +629,17 @@ class ApiTokens(ApiClient):
         data = {"description": description}
         url = self.url_for("/api_tokens")
         response = self.client.post(url, json=data)
-        return response.json()
+        return codec.loads(response.content)
 
     def list(self):
         url = self.url_for("/api_tokens")
         response = self.client.get(url)
-        return response.json()
+        return codec.loads(response.content)
 
     def delete(self, token_uuid: str):
         url = self.url_for(f"/api_tokens/{token_uuid}")
         response = self.client.delete(url)
-        return response.json()
+        return codec.loads(response.content)
 
 
 class BucketArgs:
@@ -234,6 +661,11 @@ class BucketArgs:
         self.schemaless = schemaless
         self.enabled_google_pubsub_sa = enabled_google_pubsub_sa
 
+    @classmethod
+    def from_uuid(cls, uuid: str) -> "BucketArgs":
+        """The args of a bucket known by its uuid only."""
+        return cls(uuid, None, None, None, None, None)
+
 
 class Bucket:
     def __init__(
@@ -251,6 +683,15 @@ class Bucket:
     def __repr__(self):
         return f"Bucket<{self.name}>"
 
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "uuid": self.uuid,
+            "name": self.name,
+            "description": self.description,
+            "url": self.url,
+            "schemaless": self.schemaless,
+        }
+
     def delete(self) -> Dict[str, Any]:
         return self._buckets_router.delete(self.uuid)
 
@@ -263,18 +704,61 @@ class Bucket:
     def delete_token(self, token_uuid: str) -> Dict[str, Any]:
         return self._buckets_router.delete_token(self.uuid, token_uuid)
 
-    def push_data(self, rows: List[Dict[str, Any]]):
-        return self._buckets_router.push_data(self.uuid, rows)
+    def push_data(
+        self,
+        rows: Iterable[Dict[str, Any]],
+        batch_size: int = None,
+        max_batch_bytes: int = None,
+        on_progress: Callable[[Chunk, PushSummary], None] = None,
+        concurrency: int = None,
+        retries: int = DEFAULT_RETRIES,
+        journal: PushJournal = None,
+        linger: float = None,
+    ) -> Union[Dict[str, Any], PushSummary]:
+        return self._buckets_router.push_data(
+            self.uuid,
+            rows,
+            batch_size=batch_size,
+            max_batch_bytes=max_batch_bytes,
+            on_progress=on_progress,
+            concurrency=concurrency,
+            retries=retries,
+            journal=journal,
+            linger=linger,
+        )
+
+    def push_chunk(self, chunk: Chunk) -> Dict[str, Any]:
+        return self._buckets_router.push_chunk(self.uuid, chunk)
+
+    def writer(
+        self, spool: Union[bool, Spool] = False, **options
+    ) -> BucketWriter:
+        """Return a BucketWriter pushing the rows written one at a time
+        in chunks, see BucketWriter for the options. With `spool`, the
+        rows are spilled to ~/.adacord/spool/<bucket> when the API can't
+        keep up."""
+        if spool is True:
+            spool = Spool.for_bucket(self.uuid)
+        return BucketWriter(self.push_chunk, spool=spool or None, **options)
 
     def get_data(self) -> List[Dict[str, Any]]:
         return self._buckets_router.get_data(self.uuid)
 
+    def iter_data(
+        self, batch_size: int = None
+    ) -> Iterator[Union[Dict[str, Any], List[Dict[str, Any]]]]:
+        return self._buckets_router.iter_data(self.uuid, batch_size)
+
 
 class AdacordApi:
     """A facade to the Adacord API"""
 
-    def __init__(self, client: HTTPClient = None):
+    def __init__(
+        self, client: HTTPClient = None, bucket_cache: BucketCache = None
+    ):
         self.client = client or HTTPClient(auth=AccessTokenAuth(get_token))
+        # The metadata of the buckets, kept in memory by default.
+        self.bucket_cache = bucket_cache or BucketCache()
 
     @property
     def User(self) -> User:
@@ -282,7 +766,7 @@ class AdacordApi:
 
     @property
     def Buckets(self) -> Buckets:
-        return Buckets(self.client)
+        return Buckets(self.client, cache=self.bucket_cache)
 
     @property
     def ApiTokens(self) -> Buckets:
@@ -292,14 +776,27 @@ class AdacordApi:
         return self.Buckets.get(bucket)
 
     @classmethod
-    def Client(cls, with_auth: bool = True, token: str = None) -> "AdacordApi":
+    def Client(
+        cls,
+        with_auth: bool = True,
+        token: str = None,
+        retry_policy: RetryPolicy = None,
+        config: ClientConfig = None,
+        bucket_cache: BucketCache = None,
+    ) -> "AdacordApi":
         if token:
-            client = HTTPClient.with_token(token)
+            client = HTTPClient.with_token(
+                token, retry_policy=retry_policy, config=config
+            )
         elif with_auth:
-            client = None
+            client = HTTPClient(
+                auth=AccessTokenAuth(get_token),
+                retry_policy=retry_policy,
+                config=config,
+            )
         else:
-            client = HTTPClient()
-        return cls(client)
+            client = HTTPClient(retry_policy=retry_policy, config=config)
+        return cls(client, bucket_cache=bucket_cache)
 
     def create_bucket(self, description: str, schemaless: bool) -> Bucket:
         return self.Buckets.create(description, schemaless)
@@ -308,5 +805,19 @@ class AdacordApi:
         return self.Buckets.get(bucket)
 
 
-def create_api(with_auth: bool = True) -> AdacordApi:
-    return AdacordApi.Client(with_auth=with_auth)
+def create_api(
+    with_auth: bool = True, config: ClientConfig = None
+) -> AdacordApi:
+    """The API used by the CLI: the bucket metadata are cached on disk,
+    the requests go through the local daemon, if `adacord daemon start`
+    is running."""
+    # Imported here, the daemon module imports this one.
+    from .daemon import use_daemon
+
+    api = AdacordApi.Client(
+        with_auth=with_auth,
+        config=config,
+        bucket_cache=BucketCache.from_config(),
+    )
+    use_daemon(api.client)
+    return api
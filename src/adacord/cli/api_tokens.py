@@ -2,6 +2,7 @@ import typer
 from tabulate import tabulate
 
 from .api import create_api
+from .output import OutputFormat, write_rows, output_option
 from .exceptions import cli_wrapper
 
 app = typer.Typer()
@@ -43,14 +44,13 @@ def create_api_token(
 
 @app.command("list")
 @cli_wrapper
-def list_api_tokens():
+def list_api_tokens(output: OutputFormat = output_option()):
     """
     Get your API tokens.
     """
     api = create_api()
     api_tokens = api.ApiTokens.list()
-    first_row = ("uuid", "token", "description", "created_on")
-    if not api_tokens:
+    if not api_tokens and output == OutputFormat.table:
         typer.echo(
             typer.style(
                 "No API tokens.",
@@ -60,14 +60,11 @@ def list_api_tokens():
         )
         return
 
-    rows = []
-    for index, row in enumerate(api_tokens, 1):
-        rows.append([index, *[row[entry] for entry in first_row]])
-
-    first_row = ("ID", "Token", "Description", "Created on")
-    first_row = ("", *first_row)
-    typer.echo(
-        tabulate([first_row, *rows], headers="firstrow", tablefmt="fancy_grid")
+    write_rows(
+        api_tokens,
+        output,
+        columns=("uuid", "token", "description", "created_on"),
+        headers=("ID", "Token", "Description", "Created on"),
     )
 
 
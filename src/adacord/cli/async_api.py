@@ -0,0 +1,540 @@
+import uuid
+import asyncio
+from typing import Any, Set, Dict, List, Union, Callable, Iterable
+
+from . import codec
+from .api import ApiClient, BucketArgs, AccessTokenAuth
+from .config import PUSH, QUERY, GET_DATA, ClientConfig
+from .commons import get_token
+from .retries import RetryBudget, RetryPolicy
+from .uploads import (
+    RETRY_BACKOFF,
+    DEFAULT_RETRIES,
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_MAX_BATCH_BYTES,
+    Chunk,
+    PushSummary,
+    iter_chunks,
+    should_retry,
+)
+from .exceptions import PushError, AdacordApiError
+from .compression import compress_body
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 20
+
+
+class AsyncHTTPClient:
+    """An asyncio HTTP client with pooled keep-alive connections.
+
+    Args:
+        auth: adds the Bearer token to the requests.
+        max_connections: the size of the connection pool.
+        max_keepalive_connections: the idle connections kept open.
+        max_concurrency: the max number of requests in flight, when set.
+        retry_policy: when to retry failed requests.
+        config: the timeouts and the HTTP/2 switch, by default read from
+            the config file and the environment variables.
+        **kwargs: passed to httpx.AsyncClient.
+    """
+
+    def __init__(
+        self,
+        auth: AccessTokenAuth = None,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        max_keepalive_connections: int = DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+        max_concurrency: int = None,
+        retry_policy: RetryPolicy = None,
+        config: ClientConfig = None,
+        **kwargs,
+    ):
+        if httpx is None:
+            raise ImportError(
+                "The async client needs httpx, "
+                "install it with `pip install adacord[async]`."
+            )
+        self.auth = auth
+        self.max_concurrency = max_concurrency
+        self.retry_policy = retry_policy or RetryPolicy.default()
+        self.config = config or ClientConfig.from_env()
+        self._semaphore = None
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+        self._client = httpx.AsyncClient(
+            limits=limits,
+            timeout=self.timeout_for(),
+            http2=self.config.http2,
+            **kwargs,
+        )
+
+    def timeout_for(self, operation: str = None) -> "httpx.Timeout":
+        connect, read = self.config.timeouts.for_operation(operation)
+        return httpx.Timeout(read, connect=connect)
+
+    async def __aenter__(self) -> "AsyncHTTPClient":
+        return self
+
+    async def __aexit__(self, *args):
+        await self.aclose()
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so that it's bound to the running loop.
+        if self._semaphore is None and self.max_concurrency:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def _send_once(self, method: str, url: str, **kwargs):
+        if self.semaphore is None:
+            return await self._client.request(method, url, **kwargs)
+        async with self.semaphore:
+            return await self._client.request(method, url, **kwargs)
+
+    async def _send(
+        self, method: str, url: str, headers, retry: bool = True, **kwargs
+    ):
+        policy = self.retry_policy if retry else RetryPolicy.disabled()
+        policy.record_request()
+        attempt = 0
+        while True:
+            try:
+                response = await self._send_once(
+                    method, url, headers=headers, **kwargs
+                )
+            except httpx.TransportError as error:
+                delay = policy.retry_delay(
+                    method,
+                    headers,
+                    attempt,
+                    maybe_processed=not isinstance(
+                        error, (httpx.ConnectError, httpx.ConnectTimeout)
+                    ),
+                )
+                if delay is None:
+                    raise
+            else:
+                if not response.is_error:
+                    return response
+                delay = policy.retry_delay(
+                    method,
+                    headers,
+                    attempt,
+                    status_code=response.status_code,
+                    retry_after=response.headers.get("Retry-After"),
+                )
+                if delay is None:
+                    return response
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def _encode_body(self, headers: Dict[str, str], kwargs: Dict[str, Any]):
+        """Encode the json body with the codec, compress it if big enough."""
+        if kwargs.get("json") is not None:
+            kwargs["content"] = codec.dumps(kwargs.pop("json"))
+            headers.setdefault("Content-Type", "application/json")
+        if self.config.compression and isinstance(
+            kwargs.get("content"), bytes
+        ):
+            kwargs["content"], compression_headers = compress_body(
+                kwargs["content"],
+                self.config.compression,
+                self.config.compression_level,
+                self.config.compression_threshold,
+            )
+            headers.update(compression_headers)
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        auth: bool = True,
+        retry: bool = True,
+        **kwargs,
+    ):
+        """Send the request, `retry=False` sends it once, whatever the
+        RetryPolicy."""
+        headers = dict(kwargs.pop("headers", None) or {})
+        self._encode_body(headers, kwargs)
+        if auth and self.auth:
+            headers["Authorization"] = f"Bearer {self.auth.get_token()}"
+        response = await self._send(
+            method, url, headers=headers, retry=retry, **kwargs
+        )
+        if response.is_error:
+            raise AdacordApiError(
+                codec.loads(response.content), status_code=response.status_code
+            )
+        return response
+
+    async def get(self, url: str, **kwargs):
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs):
+        return await self.request("POST", url, **kwargs)
+
+    async def delete(self, url: str, **kwargs):
+        return await self.request("DELETE", url, **kwargs)
+
+    @classmethod
+    def with_token(cls, token: str, **kwargs) -> "AsyncHTTPClient":
+        return cls(auth=AccessTokenAuth(token_getter=lambda: token), **kwargs)
+
+
+class AsyncUser(ApiClient):
+    async def create(self, email: str, password: str):
+        data = {"email": email, "password": password}
+        url = self.url_for("/users")
+        await self.client.post(url, json=data, auth=False)
+
+    async def login(self, email: str, password: str) -> Dict[str, Any]:
+        data = {"email": email, "password": password}
+        url = self.url_for("/users/token")
+        response = await self.client.post(url, json=data, auth=False)
+        return codec.loads(response.content)
+
+    async def request_password_reset(self, email: str) -> Dict[str, Any]:
+        data = {"email": email}
+        url = self.url_for("/users/password_reset")
+        response = await self.client.post(url, json=data, auth=False)
+        return codec.loads(response.content)
+
+    async def request_verification_email(
+        self, email: str, password: str
+    ) -> Dict[str, Any]:
+        data = {"email": email, "password": password}
+        url = self.url_for("/users/verification_email")
+        response = await self.client.post(url, json=data, auth=False)
+        return codec.loads(response.content)
+
+
+class AsyncChunkedUploader:
+    """The asyncio version of ChunkedUploader.
+
+    At most `concurrency` chunks are in flight, a failed chunk is retried
+    on its own, within the budget, and PushError is raised if it still
+    fails.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[Chunk], Any],
+        on_progress: Callable[[Chunk, PushSummary], None] = None,
+        concurrency: int = 1,
+        retries: int = DEFAULT_RETRIES,
+        backoff: float = RETRY_BACKOFF,
+        budget: RetryBudget = None,
+    ):
+        self.send = send
+        self.on_progress = on_progress
+        self.concurrency = max(1, concurrency)
+        self.retries = retries
+        self.backoff = backoff
+        self.budget = budget
+
+    async def send_chunk(self, chunk: Chunk, summary: PushSummary) -> Any:
+        if self.budget:
+            self.budget.record_request()
+        attempt = 0
+        while True:
+            try:
+                return await self.send(chunk)
+            except Exception as error:
+                if not should_retry(error, attempt, self.retries, self.budget):
+                    raise
+                await asyncio.sleep(self.backoff * 2**attempt)
+                summary.add_retry()
+                attempt += 1
+
+    def _collect(
+        self,
+        done: Set[asyncio.Future],
+        in_flight: Dict[asyncio.Future, Chunk],
+        summary: PushSummary,
+    ):
+        for task in done:
+            chunk = in_flight.pop(task)
+            error = task.exception()
+            if error is not None:
+                summary.add_failure(chunk, error)
+                continue
+            summary.add(chunk)
+            if self.on_progress:
+                self.on_progress(chunk, summary)
+
+    async def push(self, chunks: Iterable[Chunk]) -> PushSummary:
+        summary = PushSummary()
+        in_flight: Dict[asyncio.Future, Chunk] = {}
+        for chunk in chunks:
+            if len(in_flight) >= self.concurrency:
+                done, _ = await asyncio.wait(
+                    in_flight, return_when=asyncio.FIRST_COMPLETED
+                )
+                self._collect(done, in_flight, summary)
+            if not summary.ok:
+                break
+            task = asyncio.ensure_future(self.send_chunk(chunk, summary))
+            in_flight[task] = chunk
+        if in_flight:
+            done, _ = await asyncio.wait(in_flight)
+            self._collect(done, in_flight, summary)
+
+        summary.finish()
+        if not summary.ok:
+            raise PushError(summary, summary.failed[-1][1])
+        return summary
+
+
+class AsyncBuckets(ApiClient):
+    def _bucket_from_payload(
+        self, bucket_payload: Dict[str, Any]
+    ) -> "AsyncBucket":
+        bucket_args = BucketArgs(**bucket_payload)
+        return AsyncBucket(bucket_args, buckets_router=self)
+
+    async def create(
+        self,
+        description: str = "",
+        schemaless: bool = False,
+        enabled_google_pubsub_sa: str = None,
+    ) -> "AsyncBucket":
+        data = {
+            "description": description,
+            "schemaless": schemaless,
+            "enabled_google_pubsub_sa": enabled_google_pubsub_sa,
+        }
+        url = self.url_for("/buckets")
+        response = await self.client.post(url, json=data)
+        return self._bucket_from_payload(codec.loads(response.content))
+
+    async def list(self) -> List["AsyncBucket"]:
+        url = self.url_for("/buckets")
+        response = await self.client.get(url)
+        return [
+            self._bucket_from_payload(item)
+            for item in codec.loads(response.content)
+        ]
+
+    async def get(self, bucket: str) -> "AsyncBucket":
+        """Return a Bucket.
+        Args:
+            bucket: the name or the uuid of the bucket.
+        """
+        url = self.url_for(f"/buckets/{bucket}")
+        response = await self.client.get(url)
+        return self._bucket_from_payload(codec.loads(response.content))
+
+    async def delete(self, bucket: str) -> Dict[str, Any]:
+        url = self.url_for(f"/buckets/{bucket}")
+        response = await self.client.delete(url)
+        return codec.loads(response.content)
+
+    async def create_token(self, bucket: str, description: str = None):
+        data = {"description": description}
+        url = self.url_for(f"/buckets/{bucket}/tokens")
+        response = await self.client.post(url, json=data)
+        return codec.loads(response.content)
+
+    async def get_tokens(self, bucket: str):
+        url = self.url_for(f"/buckets/{bucket}/tokens")
+        response = await self.client.get(url)
+        return codec.loads(response.content)
+
+    async def delete_token(self, bucket: str, token_uuid: str):
+        url = self.url_for(f"/buckets/{bucket}/tokens/{token_uuid}")
+        response = await self.client.delete(url)
+        return codec.loads(response.content)
+
+    async def query(self, query: str) -> List[Dict[str, Any]]:
+        data = {"query": query}
+        url = self.url_for("/buckets/query")
+        timeout = self.client.timeout_for(QUERY)
+        response = await self.client.post(url, json=data, timeout=timeout)
+        return codec.loads(response.content)
+
+    async def push_data(
+        self,
+        bucket: str,
+        rows: Iterable[Dict[str, Any]],
+        batch_size: int = None,
+        max_batch_bytes: int = None,
+        on_progress: Callable[[Chunk, PushSummary], None] = None,
+        concurrency: int = None,
+        retries: int = DEFAULT_RETRIES,
+    ) -> Union[Dict[str, Any], PushSummary]:
+        """Push rows into the bucket, see Buckets.push_data."""
+        chunked = (batch_size, max_batch_bytes, concurrency) != (None,) * 3
+        if not chunked:
+            data = {"data": rows}
+            url = self.url_for(f"/buckets/{bucket}/data")
+            timeout = self.client.timeout_for(PUSH)
+            response = await self.client.post(url, json=data, timeout=timeout)
+            return codec.loads(response.content)
+
+        if batch_size is None and max_batch_bytes is None:
+            batch_size = DEFAULT_BATCH_SIZE
+            max_batch_bytes = DEFAULT_MAX_BATCH_BYTES
+        chunks = iter_chunks(
+            rows, batch_size, max_batch_bytes, key_prefix=uuid.uuid4().hex
+        )
+        uploader = AsyncChunkedUploader(
+            send=lambda chunk: self.push_chunk(bucket, chunk),
+            on_progress=on_progress,
+            concurrency=concurrency or 1,
+            retries=retries,
+            budget=self.client.retry_policy.budget,
+        )
+        return await uploader.push(chunks)
+
+    async def push_chunk(self, bucket: str, chunk: Chunk) -> Dict[str, Any]:
+        """Send the chunk once, the AsyncChunkedUploader retries it."""
+        response = await self.client.post(
+            self.url_for(f"/buckets/{bucket}/data"),
+            content=chunk.payload,
+            headers=chunk.headers,
+            timeout=self.client.timeout_for(PUSH),
+            retry=False,
+        )
+        return codec.loads(response.content)
+
+    async def get_data(self, bucket: str) -> List[Dict[str, Any]]:
+        url = self.url_for(f"/buckets/{bucket}/data")
+        timeout = self.client.timeout_for(GET_DATA)
+        response = await self.client.get(url, timeout=timeout)
+        return codec.loads(response.content)
+
+
+class AsyncApiTokens(ApiClient):
+    async def create(self, description: str = None):
+        data = {"description": description}
+        url = self.url_for("/api_tokens")
+        response = await self.client.post(url, json=data)
+        return codec.loads(response.content)
+
+    async def list(self):
+        url = self.url_for("/api_tokens")
+        response = await self.client.get(url)
+        return codec.loads(response.content)
+
+    async def delete(self, token_uuid: str):
+        url = self.url_for(f"/api_tokens/{token_uuid}")
+        response = await self.client.delete(url)
+        return codec.loads(response.content)
+
+
+class AsyncBucket:
+    def __init__(
+        self,
+        bucket_payload: BucketArgs,
+        buckets_router: "AsyncBuckets",
+    ):
+        self.uuid = bucket_payload.uuid
+        self.name = bucket_payload.name
+        self.description = bucket_payload.description
+        self.url = bucket_payload.url
+        self.schemaless = bucket_payload.schemaless
+        self._buckets_router = buckets_router
+
+    def __repr__(self):
+        return f"AsyncBucket<{self.name}>"
+
+    async def delete(self) -> Dict[str, Any]:
+        return await self._buckets_router.delete(self.uuid)
+
+    async def create_token(self, description: str = None) -> Dict[str, Any]:
+        return await self._buckets_router.create_token(self.uuid, description)
+
+    async def get_tokens(self) -> List[Dict[str, Any]]:
+        return await self._buckets_router.get_tokens(self.uuid)
+
+    async def delete_token(self, token_uuid: str) -> Dict[str, Any]:
+        return await self._buckets_router.delete_token(self.uuid, token_uuid)
+
+    async def push_data(
+        self,
+        rows: Iterable[Dict[str, Any]],
+        batch_size: int = None,
+        max_batch_bytes: int = None,
+        on_progress: Callable[[Chunk, PushSummary], None] = None,
+        concurrency: int = None,
+        retries: int = DEFAULT_RETRIES,
+    ) -> Union[Dict[str, Any], PushSummary]:
+        return await self._buckets_router.push_data(
+            self.uuid,
+            rows,
+            batch_size=batch_size,
+            max_batch_bytes=max_batch_bytes,
+            on_progress=on_progress,
+            concurrency=concurrency,
+            retries=retries,
+        )
+
+    async def get_data(self) -> List[Dict[str, Any]]:
+        return await self._buckets_router.get_data(self.uuid)
+
+
+class AsyncAdacordApi:
+    """An asyncio facade to the Adacord API.
+
+    The client must be closed when done, either with `await api.aclose()`
+    or using the api as an async context manager.
+    """
+
+    def __init__(self, client: AsyncHTTPClient = None):
+        self.client = client or AsyncHTTPClient(
+            auth=AccessTokenAuth(get_token)
+        )
+
+    async def __aenter__(self) -> "AsyncAdacordApi":
+        return self
+
+    async def __aexit__(self, *args):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    @property
+    def User(self) -> AsyncUser:
+        return AsyncUser(self.client)
+
+    @property
+    def Buckets(self) -> AsyncBuckets:
+        return AsyncBuckets(self.client)
+
+    @property
+    def ApiTokens(self) -> AsyncApiTokens:
+        return AsyncApiTokens(self.client)
+
+    async def Bucket(self, bucket: str) -> AsyncBucket:
+        return await self.Buckets.get(bucket)
+
+    @classmethod
+    def Client(
+        cls, with_auth: bool = True, token: str = None, **kwargs
+    ) -> "AsyncAdacordApi":
+        """Create the api, `kwargs` are passed to AsyncHTTPClient."""
+        if token:
+            client = AsyncHTTPClient.with_token(token, **kwargs)
+        elif with_auth:
+            client = AsyncHTTPClient(auth=AccessTokenAuth(get_token), **kwargs)
+        else:
+            client = AsyncHTTPClient(**kwargs)
+        return cls(client)
+
+    async def create_bucket(
+        self, description: str, schemaless: bool
+    ) -> AsyncBucket:
+        return await self.Buckets.create(description, schemaless)
+
+    async def get_bucket(self, bucket: str) -> AsyncBucket:
+        return await self.Buckets.get(bucket)
@@ -1,12 +1,18 @@
 import typer
 
 from . import commons
-from .api import create_api
 from .exceptions import cli_wrapper
 
 user = typer.Typer()
 
 
+def create_api(*args, **kwargs):
+    # Imported here, `adacord logout` doesn't need requests.
+    from .api import create_api
+
+    return create_api(*args, **kwargs)
+
+
 @user.command()
 @cli_wrapper
 def create():
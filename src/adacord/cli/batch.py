@@ -0,0 +1,398 @@
+import re
+import json
+import time
+import inspect
+from typing import Any, Dict, List, Callable
+from pathlib import Path
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from . import codec
+from .exceptions import AdacordApiError
+
+try:
+    import yaml
+except ImportError:  # pragma: no cover
+    yaml = None
+
+DEFAULT_CONCURRENCY = 8
+
+# ${id} is the result of the operation `id`, ${id.uuid} one of its fields.
+REFERENCE = re.compile(r"\$\{([\w-]+)((?:\.[\w-]+)*)\}")
+
+
+def create_bucket(
+    api,
+    description: str = "",
+    schemaless: bool = False,
+    enabled_google_pubsub_sa: str = None,
+):
+    bucket = api.Buckets.create(
+        description, schemaless, enabled_google_pubsub_sa
+    )
+    return bucket.to_dict()
+
+
+def get_bucket(api, bucket: str):
+    return api.Buckets.get(bucket).to_dict()
+
+
+def delete_bucket(api, bucket: str):
+    return api.Buckets.delete(bucket)
+
+
+def create_bucket_token(api, bucket: str, description: str = ""):
+    return api.Buckets.reference(bucket).create_token(description)
+
+
+def list_bucket_tokens(api, bucket: str):
+    return api.Buckets.reference(bucket).get_tokens()
+
+
+def delete_bucket_token(api, bucket: str, token_uuid: str):
+    return api.Buckets.reference(bucket).delete_token(token_uuid)
+
+
+def create_api_token(api, description: str = ""):
+    return api.ApiTokens.create(description)
+
+
+def list_api_tokens(api):
+    return api.ApiTokens.list()
+
+
+def delete_api_token(api, token_uuid: str):
+    return api.ApiTokens.delete(token_uuid)
+
+
+# The operations of a batch file, the arguments are the keyword arguments
+# of the functions.
+OPERATIONS: Dict[str, Callable] = {
+    "bucket.create": create_bucket,
+    "bucket.get": get_bucket,
+    "bucket.delete": delete_bucket,
+    "bucket.token.create": create_bucket_token,
+    "bucket.token.list": list_bucket_tokens,
+    "bucket.token.delete": delete_bucket_token,
+    "api_token.create": create_api_token,
+    "api_token.list": list_api_tokens,
+    "api_token.delete": delete_api_token,
+}
+
+
+def find_references(value: Any) -> List[str]:
+    """Return the ids of the operations referenced by the arguments."""
+    if isinstance(value, str):
+        return [match.group(1) for match in REFERENCE.finditer(value)]
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, list):
+        return [id for item in value for id in find_references(item)]
+    return []
+
+
+def resolve_references(value: Any, results: Dict[str, Any]) -> Any:
+    """Replace the references with the results of the operations. A string
+    that is a single reference is replaced by the value itself."""
+    if isinstance(value, dict):
+        return {
+            key: resolve_references(item, results)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [resolve_references(item, results) for item in value]
+    if not isinstance(value, str):
+        return value
+
+    def lookup(match) -> Any:
+        result = results[match.group(1)]
+        for field in filter(None, match.group(2).split(".")):
+            result = result[field]
+        return result
+
+    match = REFERENCE.fullmatch(value)
+    if match:
+        return lookup(match)
+    return REFERENCE.sub(lambda match: str(lookup(match)), value)
+
+
+class Operation:
+    """An operation of a batch file.
+
+    Args:
+        id: the name the other operations reference it by.
+        op: the operation, one of OPERATIONS.
+        args: the arguments, with ${id} or ${id.field} references to the
+            results of other operations.
+        after: the ids of the operations it waits for, besides the
+            referenced ones.
+    """
+
+    def __init__(
+        self,
+        id: str,
+        op: str,
+        args: Dict[str, Any] = None,
+        after: List[str] = None,
+    ):
+        self.id = str(id)
+        self.op = op
+        self.args = args or {}
+        self.after = [str(id) for id in after or []]
+
+    def __repr__(self):
+        return f"Operation<{self.id}: {self.op}>"
+
+    @property
+    def depends_on(self) -> List[str]:
+        return list(dict.fromkeys(self.after + find_references(self.args)))
+
+    def validate(self):
+        if self.op not in OPERATIONS:
+            raise ValueError(f"{self.id}: unknown operation {self.op!r}.")
+        try:
+            inspect.signature(OPERATIONS[self.op]).bind(None, **self.args)
+        except TypeError as error:
+            raise ValueError(f"{self.id}: {self.op}, {error}.") from None
+
+    def run(self, api, results: Dict[str, Any]) -> Any:
+        args = resolve_references(self.args, results)
+        return OPERATIONS[self.op](api, **args)
+
+
+def parse_operations(items: List[Dict[str, Any]]) -> List[Operation]:
+    """Build and check the operations: known, with valid arguments,
+    unique ids and no dependency cycles."""
+    if not isinstance(items, list):
+        raise ValueError("A batch file is a list of operations.")
+    operations = []
+    for index, item in enumerate(items, 1):
+        if not isinstance(item, dict) or "op" not in item:
+            raise ValueError(f"Operation {index} has no `op`.")
+        item = dict(item)
+        try:
+            operations.append(Operation(item.pop("id", index), **item))
+        except TypeError as error:
+            raise ValueError(f"Operation {index}: {error}.") from None
+
+    by_id = {operation.id: operation for operation in operations}
+    if len(by_id) != len(operations):
+        raise ValueError("The ids of the operations must be unique.")
+    for operation in operations:
+        operation.validate()
+        for id in operation.depends_on:
+            if id not in by_id:
+                raise ValueError(f"{operation.id}: unknown operation {id!r}.")
+    check_cycles(by_id)
+    return operations
+
+
+def check_cycles(by_id: Dict[str, Operation]):
+    done = set()
+
+    def visit(operation: Operation, path: List[str]):
+        if operation.id in path:
+            cycle = " -> ".join(path + [operation.id])
+            raise ValueError(f"Dependency cycle: {cycle}.")
+        if operation.id in done:
+            return
+        for id in operation.depends_on:
+            visit(by_id[id], path + [operation.id])
+        done.add(operation.id)
+
+    for operation in by_id.values():
+        visit(operation, [])
+
+
+def load_operations(path: Path) -> List[Operation]:
+    """Read a batch file: JSON-lines (an operation per line), JSON or
+    YAML (a list of operations, it needs `pip install adacord[yaml]`)."""
+    path = Path(path)
+    suffix = path.suffix.lower()
+    with open(path, "rb") as f:
+        if suffix in (".jsonl", ".jsonlines", ".ndjson"):
+            items = [codec.loads(line) for line in f if line.strip()]
+        elif suffix in (".yaml", ".yml"):
+            if yaml is None:
+                raise ImportError(
+                    "YAML batch files need pyyaml, "
+                    "install it with `pip install adacord[yaml]`."
+                )
+            items = yaml.safe_load(f)
+        else:
+            items = codec.loads(f.read())
+    return parse_operations(items)
+
+
+class OperationResult:
+    OK = "ok"
+    FAILED = "failed"
+    SKIPPED = "skipped"
+
+    def __init__(
+        self,
+        operation: Operation,
+        status: str,
+        result: Any = None,
+        error: str = None,
+        status_code: int = None,
+        elapsed: float = 0.0,
+    ):
+        self.operation = operation
+        self.status = status
+        self.result = result
+        self.error = error
+        self.status_code = status_code
+        self.elapsed = elapsed
+
+    def __repr__(self):
+        return f"OperationResult<{self.operation.id}: {self.status}>"
+
+    @property
+    def ok(self) -> bool:
+        return self.status == self.OK
+
+    def to_dict(self) -> Dict[str, Any]:
+        report = {
+            "id": self.operation.id,
+            "op": self.operation.op,
+            "status": self.status,
+            "elapsed": round(self.elapsed, 3),
+        }
+        if self.ok:
+            report["result"] = self.result
+        else:
+            report["error"] = self.error
+            if self.status_code is not None:
+                report["status_code"] = self.status_code
+        return report
+
+
+class BatchReport:
+    def __init__(self, results: List[OperationResult], elapsed: float):
+        self.results = results
+        self.elapsed = elapsed
+
+    def __repr__(self):
+        return f"BatchReport<{len(self.results)} operations>"
+
+    @property
+    def failed(self) -> List[OperationResult]:
+        return [result for result in self.results if not result.ok]
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "ok": self.ok,
+            "elapsed": round(self.elapsed, 3),
+            "operations": [result.to_dict() for result in self.results],
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2, default=str)
+
+
+def run_operation(
+    api, operation: Operation, results: Dict[str, Any]
+) -> OperationResult:
+    started = time.monotonic()
+    try:
+        result = operation.run(api, results)
+    except AdacordApiError as error:
+        return OperationResult(
+            operation,
+            OperationResult.FAILED,
+            error=str(error.message),
+            status_code=error.status_code,
+            elapsed=time.monotonic() - started,
+        )
+    except Exception as error:
+        return OperationResult(
+            operation,
+            OperationResult.FAILED,
+            error=f"{type(error).__name__}: {error}",
+            elapsed=time.monotonic() - started,
+        )
+    return OperationResult(
+        operation,
+        OperationResult.OK,
+        result=result,
+        elapsed=time.monotonic() - started,
+    )
+
+
+def run_batch(
+    api,
+    operations: List[Operation],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    on_result: Callable[[OperationResult], None] = None,
+) -> BatchReport:
+    """Run the operations, `concurrency` at a time, each one once the
+    operations it depends on are done. The operations depending on a
+    failed one are skipped.
+
+    Args:
+        api: the AdacordApi, its pool should have `concurrency`
+            connections.
+        operations: see load_operations.
+        concurrency: the max number of operations running at once.
+        on_result: called with the result of every operation, once done.
+    """
+    started = time.monotonic()
+    pending = {operation.id: operation for operation in operations}
+    results: Dict[str, OperationResult] = {}
+    values: Dict[str, Any] = {}
+
+    def finish(result: OperationResult):
+        results[result.operation.id] = result
+        values[result.operation.id] = result.result
+        if on_result:
+            on_result(result)
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        running = {}
+        while pending or running:
+            for operation in _ready(pending, results, finish):
+                future = executor.submit(
+                    run_operation, api, operation, dict(values)
+                )
+                running[future] = operation
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                del running[future]
+                finish(future.result())
+
+    ordered = [results[operation.id] for operation in operations]
+    return BatchReport(ordered, time.monotonic() - started)
+
+
+def _ready(
+    pending: Dict[str, Operation],
+    results: Dict[str, OperationResult],
+    finish: Callable[[OperationResult], None],
+) -> List[Operation]:
+    """Pop the operations whose dependencies are done. Those depending on
+    a failed operation are skipped, which can make others ready."""
+    ready: List[Operation] = []
+    progress = True
+    while progress:
+        progress = False
+        for operation in list(pending.values()):
+            depends_on = operation.depends_on
+            if not all(id in results for id in depends_on):
+                continue
+            del pending[operation.id]
+            progress = True
+            failed = [id for id in depends_on if not results[id].ok]
+            if failed:
+                error = f"Skipped, {', '.join(failed)} didn't succeed."
+                finish(
+                    OperationResult(
+                        operation, OperationResult.SKIPPED, error=error
+                    )
+                )
+            else:
+                ready.append(operation)
+    return ready
@@ -0,0 +1,73 @@
+from pathlib import Path
+
+import typer
+
+from .api import create_api
+from .batch import (
+    DEFAULT_CONCURRENCY,
+    OperationResult,
+    run_batch,
+    load_operations,
+)
+from .config import ClientConfig
+from .exceptions import cli_wrapper
+
+STATUS_COLORS = {
+    OperationResult.OK: typer.colors.GREEN,
+    OperationResult.FAILED: typer.colors.RED,
+    OperationResult.SKIPPED: typer.colors.YELLOW,
+}
+
+
+def echo_result(result: OperationResult):
+    operation = result.operation
+    line = f"{result.status:>7} {operation.id} ({operation.op})"
+    if result.error:
+        line = f"{line}: {result.error}"
+    typer.echo(typer.style(line, fg=STATUS_COLORS[result.status]), err=True)
+
+
+@cli_wrapper
+def run_batch_file(
+    file: Path = typer.Argument(
+        ...,
+        exists=True,
+        dir_okay=False,
+        help="The operations: a YAML, JSON or JSON-lines file.",
+    ),
+    concurrency: int = typer.Option(
+        DEFAULT_CONCURRENCY,
+        min=1,
+        help="The max number of operations running at the same time.",
+    ),
+    report: Path = typer.Option(
+        None,
+        "--report",
+        help="Write the JSON report to a file instead of stdout.",
+    ),
+):
+    """
+    Run many bucket and token operations, concurrently.
+    """
+    try:
+        operations = load_operations(file)
+    except (ValueError, ImportError) as error:
+        raise typer.BadParameter(str(error), param_hint="FILE")
+
+    config = ClientConfig.from_env()
+    config.pool_maxsize = max(config.pool_maxsize, concurrency)
+    api = create_api(config=config)
+    batch = run_batch(
+        api, operations, concurrency=concurrency, on_result=echo_result
+    )
+    if report is None:
+        typer.echo(batch.to_json())
+    else:
+        report.write_text(batch.to_json())
+    typer.echo(
+        f"{len(batch.results) - len(batch.failed)}/{len(batch.results)} "
+        f"operations succeeded in {batch.elapsed:.1f}s.",
+        err=True,
+    )
+    if not batch.ok:
+        raise typer.Exit(1)
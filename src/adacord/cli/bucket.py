@@ -1,11 +1,33 @@
-from enum import Enum
+from typing import Any, Dict, List, Iterator
 from pathlib import Path
 
 import typer
 from tabulate import tabulate
 
 from .api import create_api
-from .commons import parse_csv, parse_json, parse_jsonlines
+from .cache import QueryCache
+from .config import ClientConfig
+from .export import (
+    DEFAULT_PAGE_SIZE,
+    DEFAULT_CONCURRENCY,
+    ExportFormat,
+    UnorderedExportError,
+    export_query,
+)
+from .follow import follow_file
+from .ingest import (
+    DataFileFormat,
+    push_files,
+    read_stdin,
+    detect_format,
+    find_data_files,
+)
+from .output import OutputFormat, write_rows, output_option
+from .uploads import (
+    DEFAULT_RETRIES,
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_MAX_BATCH_BYTES,
+)
 from .exceptions import cli_wrapper
 
 app = typer.Typer()
@@ -58,15 +80,14 @@ def create_bucket(
 
 @app.command("list")
 @cli_wrapper
-def list_buckets():
+def list_buckets(output: OutputFormat = output_option()):
     """
     Get a list of your buckets.
     """
     api = create_api()
     payload = api.Buckets.list()
-    first_row = ("uuid", "name", "description", "url")
 
-    if not payload:
+    if not payload and output == OutputFormat.table:
         typer.echo(
             typer.style(
                 "Ohhhh... no buckets :)", fg=typer.colors.MAGENTA, bold=True
@@ -74,14 +95,11 @@ def list_buckets():
         )
         return
 
-    rows = []
-    for index, row in enumerate(payload, 1):
-        rows.append([index, *[getattr(row, entry) for entry in first_row]])
-
-    first_row = ("ID", "Name", "Description", "URL", "Schemaless")
-    first_row = ("", *first_row)
-    typer.echo(
-        tabulate([first_row, *rows], headers="firstrow", tablefmt="fancy_grid")
+    write_rows(
+        (bucket.to_dict() for bucket in payload),
+        output,
+        columns=("uuid", "name", "description", "url", "schemaless"),
+        headers=("ID", "Name", "Description", "URL", "Schemaless"),
     )
 
 
@@ -104,14 +122,116 @@ def delete_bucket(
 
 @app.command("query")
 @cli_wrapper
-def query_bucket(query: str = typer.Argument(...)):
+def query_bucket(
+    query: str = typer.Argument(...),
+    cache_ttl: float = typer.Option(
+        None,
+        min=0,
+        help="Reuse the result of the same query for these seconds.",
+        show_default=False,
+    ),
+    no_cache: bool = typer.Option(
+        False, "--no-cache", help="Don't use the query cache."
+    ),
+    output: OutputFormat = output_option(OutputFormat.jsonl),
+):
     """
     Query a bucket using a SQL query.
+    The query cache is enabled with --cache-ttl, or in the config file.
     """
+    cache = None
+    if not no_cache:
+        cache = QueryCache.from_config()
+        if cache_ttl is not None:
+            cache = cache or QueryCache()
+            cache.ttl = cache_ttl
     api = create_api()
-    payload = api.Buckets.query(query)
-    for row in payload:
-        typer.echo(row)
+    if cache is None:
+        # Streamed, the rows are written as they are parsed.
+        rows = api.Buckets.iter_query(query)
+    else:
+        rows = api.Buckets.query(query, cache=cache)
+    write_rows(rows, output)
+
+
+@app.command("export")
+@cli_wrapper
+def export_bucket(
+    bucket: str = typer.Argument(..., help="The bucket uuid or name."),
+    out: Path = typer.Option(
+        ...,
+        help="The path of the output file.",
+        dir_okay=False,
+        writable=True,
+        resolve_path=True,
+    ),
+    format: ExportFormat = typer.Option(
+        ExportFormat.jsonl,
+        help="The format of the output file.",
+        case_sensitive=False,
+    ),
+    query: str = typer.Option(
+        None, help="Export the result of this query, not the whole bucket."
+    ),
+    order_by: str = typer.Option(
+        None,
+        help=(
+            "Sort the bucket by this column, to keep the pages stable. "
+            "Needed when the bucket doesn't fit in a single page."
+        ),
+    ),
+    page_size: int = typer.Option(
+        DEFAULT_PAGE_SIZE, min=1, help="The number of rows per request."
+    ),
+    concurrency: int = typer.Option(
+        DEFAULT_CONCURRENCY, min=1, help="The pages fetched in parallel."
+    ),
+    resume: bool = typer.Option(
+        True,
+        "--resume/--no-resume",
+        help="Continue an interrupted export of the same query.",
+    ),
+):
+    """
+    Export the content of a bucket (or the result of a query) to a file.
+    The file can be JSON-lines, CSV or Parquet.
+    """
+    config = ClientConfig.from_env()
+    config.pool_maxsize = max(config.pool_maxsize, concurrency)
+    api = create_api(config=config)
+    param_hint = "--query" if query else "--order-by"
+    if query is None:
+        name = api.Bucket(bucket).name
+        query = f"SELECT * FROM `{name}`"
+        if order_by:
+            query = f"{query} ORDER BY {order_by}"
+
+    def echo_page_progress(page, rows, checkpoint):
+        typer.echo(
+            f"Page {page + 1}: {rows} rows, "
+            f"{checkpoint.rows} rows exported so far."
+        )
+
+    try:
+        checkpoint = export_query(
+            api.Buckets,
+            query,
+            out,
+            format=format,
+            page_size=page_size,
+            concurrency=concurrency,
+            resume=resume,
+            on_page=echo_page_progress,
+        )
+    except UnorderedExportError as error:
+        raise typer.BadParameter(str(error), param_hint=param_hint)
+    typer.echo(
+        typer.style(
+            f"{checkpoint.rows} rows exported to {out} 🚀.",
+            fg=typer.colors.WHITE,
+            bold=True,
+        )
+    )
 
 
 @token_app.command("create")
@@ -126,7 +246,7 @@ def create_token(
     Create a new API Token.
     """
     api = create_api()
-    client = api.Bucket(bucket)
+    client = api.Buckets.reference(bucket)
     payload = client.create_token(description)
     typer.echo(
         typer.style(
@@ -155,16 +275,16 @@ def create_token(
 @token_app.command("list")
 @cli_wrapper
 def list_tokens(
-    bucket: str = typer.Argument(..., help="The bucket uuid or name.")
+    bucket: str = typer.Argument(..., help="The bucket uuid or name."),
+    output: OutputFormat = output_option(),
 ):
     """
     Get your tokens.
     """
     api = create_api()
-    client = api.Bucket(bucket)
+    client = api.Buckets.reference(bucket)
     tokens = client.get_tokens()
-    first_row = ("uuid", "token", "description", "created_on")
-    if not tokens:
+    if not tokens and output == OutputFormat.table:
         typer.echo(
             typer.style(
                 f"No tokens for Bucket({bucket}).",
@@ -174,14 +294,11 @@ def list_tokens(
         )
         return
 
-    rows = []
-    for index, row in enumerate(tokens, 1):
-        rows.append([index, *[row[entry] for entry in first_row]])
-
-    first_row = ("ID", "Token", "Description", "Created on")
-    first_row = ("", *first_row)
-    typer.echo(
-        tabulate([first_row, *rows], headers="firstrow", tablefmt="fancy_grid")
+    write_rows(
+        tokens,
+        output,
+        columns=("uuid", "token", "description", "created_on"),
+        headers=("ID", "Token", "Description", "Created on"),
     )
 
 
@@ -195,7 +312,7 @@ def delete_token(
     Delete an API Token.
     """
     api = create_api()
-    client = api.Bucket(bucket)
+    client = api.Buckets.reference(bucket)
     client.delete_token(token_uuid=token_uuid)
     typer.echo(
         typer.style(
@@ -206,48 +323,268 @@ def delete_token(
     )
 
 
-class DataFileFormat(str, Enum):
-    csv = "csv"
-    json = "json"
-    jsonlines = "jsonlines"
+def resolve_data_files(paths: List[str], format: DataFileFormat) -> List[Path]:
+    try:
+        files = find_data_files(paths)
+        if format is None:
+            for path in files:
+                detect_format(path)
+    except (ValueError, FileNotFoundError) as error:
+        raise typer.BadParameter(str(error), param_hint="--file")
+    if not files:
+        raise typer.BadParameter("No data files found.", param_hint="--file")
+    return files
+
+
+def echo_file_result(result):
+    if not result.ok:
+        return
+    summary = result.summary
+    resumed = ""
+    if result.resumed_rows:
+        resumed = f", resumed after {result.resumed_rows} rows"
+    typer.echo(
+        f"{result.file}: {summary.rows} rows in {summary.chunks} chunks "
+        f"({summary.elapsed:.1f}s, {summary.rows_per_second:.0f} "
+        f"rows/s{resumed})."
+    )
+
+
+def echo_chunk_progress(chunk, summary):
+    typer.echo(
+        f"Chunk {chunk.index + 1}: {chunk.rows} rows ({chunk.size} bytes) "
+        f"pushed, {summary.rows} rows so far."
+    )
+
+
+def push_stream(
+    bucket: str,
+    rows: Iterator[Dict[str, Any]],
+    batch_size: int,
+    max_batch_bytes: int,
+    linger: float,
+    concurrency: int,
+    retries: int,
+):
+    api = create_api()
+    summary = api.Buckets.reference(bucket).push_data(
+        rows=rows,
+        batch_size=batch_size,
+        max_batch_bytes=max_batch_bytes,
+        concurrency=concurrency,
+        retries=retries,
+        linger=linger,
+    )
+    typer.echo(
+        typer.style(
+            f"The stream has been loaded 🚀. {summary.rows} rows "
+            f"in {summary.chunks} chunks ({summary.elapsed:.1f}s).",
+            fg=typer.colors.WHITE,
+            bold=True,
+        ),
+        err=True,
+    )
+
+
+def follow_data_file(
+    bucket: str,
+    files: List[Path],
+    format: DataFileFormat,
+    batch_size: int,
+    max_batch_bytes: int,
+    linger: float,
+    retries: int,
+):
+    if len(files) != 1:
+        raise typer.BadParameter(
+            "--follow needs a single file.", param_hint="--file"
+        )
+    if (format or detect_format(files[0])) != DataFileFormat.jsonlines:
+        raise typer.BadParameter(
+            "--follow needs a JSON-lines file.", param_hint="--format"
+        )
+
+    def echo_push(rows, summary):
+        typer.echo(f"{rows} rows pushed ({summary.elapsed:.1f}s).")
+
+    def echo_skipped_line(line, error):
+        typer.echo(f"Skipped a line that isn't valid JSON: {error}", err=True)
+
+    api = create_api()
+    typer.echo(f"Following {files[0]}, press Ctrl+C to stop.")
+    try:
+        follow_file(
+            api.Buckets.reference(bucket),
+            files[0],
+            batch_size=batch_size,
+            max_batch_bytes=max_batch_bytes,
+            linger=linger,
+            on_push=echo_push,
+            on_error=echo_skipped_line,
+            retries=retries,
+        )
+    except KeyboardInterrupt:
+        typer.echo("Stopped, the lines not pushed yet will be sent next time.")
 
 
 @app.command("push")
 @cli_wrapper
 def push_data(
     bucket: str = typer.Argument(..., help="The bucket uuid or name."),
-    file: Path = typer.Option(
+    file: List[str] = typer.Option(
         ...,
-        help="The path to the data file",
-        exists=True,
-        file_okay=True,
-        dir_okay=False,
-        writable=False,
-        readable=True,
-        resolve_path=True,
+        help="A data file, a directory or a glob pattern, can be repeated. "
+        "Use - to stream the rows written to stdin.",
     ),
     format: DataFileFormat = typer.Option(
-        ..., help="The format of the data file", case_sensitive=False
+        None,
+        help="The format of the data files, detected from the extension "
+        "by default.",
+        case_sensitive=False,
+        show_default=False,
+    ),
+    batch_size: int = typer.Option(
+        DEFAULT_BATCH_SIZE,
+        min=1,
+        help="The max number of rows sent in a single request.",
+    ),
+    max_batch_bytes: int = typer.Option(
+        DEFAULT_MAX_BATCH_BYTES,
+        min=1,
+        help="The max size in bytes of a single request.",
+    ),
+    concurrency: int = typer.Option(
+        1, min=1, help="The number of chunks uploaded in parallel."
+    ),
+    retries: int = typer.Option(
+        DEFAULT_RETRIES,
+        min=0,
+        help="How many times a failed chunk is retried.",
+    ),
+    delimiter: str = typer.Option(",", help="The CSV field delimiter."),
+    quotechar: str = typer.Option('"', help="The CSV quote character."),
+    encoding: str = typer.Option("utf-8", help="The encoding of the file."),
+    infer_types: bool = typer.Option(
+        False,
+        "--infer-types",
+        help="Send CSV numbers and booleans as such, instead of strings.",
+    ),
+    workers: int = typer.Option(
+        1,
+        min=0,
+        help="The processes decoding a JSON-lines file, 0 for all the cores.",
+    ),
+    resume: bool = typer.Option(
+        False,
+        "--resume",
+        help="Skip the chunks already pushed by a failed push of the file.",
+    ),
+    file_workers: int = typer.Option(
+        1, min=1, help="The number of files pushed in parallel."
+    ),
+    linger: float = typer.Option(
+        1.0,
+        min=0,
+        help="With --file - or --follow, the max seconds a row waits "
+        "before being sent.",
+    ),
+    follow: bool = typer.Option(
+        False,
+        "--follow",
+        help="Keep pushing the lines appended to a JSON-lines file, "
+        "like tail -F.",
     ),
 ):
     """
-    Push the content of a data file into the bucket.
-    The file can be CSV, JSON, or JSON-lines.
+    Push the content of data files into the bucket.
+    The files can be CSV, JSON, or JSON-lines, the format is detected
+    from the extension. Directories and glob patterns push all the
+    matching files, `--file-workers` of them at a time.
+    Every file is streamed to the bucket in chunks, a failed push can be
+    resumed with --resume.
+    With `--file -` the rows written to stdin (JSON-lines by default) are
+    pushed as they come, e.g. `producer | adacord bucket push my-bucket
+    --file -`.
+    With --follow the lines appended to a JSON-lines file are pushed as
+    they come, across log rotations, until interrupted. The position in
+    the file is saved, a restart doesn't push the same lines again.
     """
-    if format == DataFileFormat.csv:
-        rows = parse_csv(file)
-    elif format == DataFileFormat.json:
-        rows = parse_json(file)
-    elif format == DataFileFormat.csv:
-        rows = parse_jsonlines(file)
+    if file == ["-"]:
+        csv_options = {"delimiter": delimiter, "quotechar": quotechar}
+        rows = read_stdin(
+            format or DataFileFormat.jsonlines,
+            encoding=encoding,
+            infer_types=infer_types,
+            **csv_options,
+        )
+        push_stream(
+            bucket,
+            rows,
+            batch_size,
+            max_batch_bytes,
+            linger,
+            concurrency,
+            retries,
+        )
+        return
+
+    files = resolve_data_files(file, format)
+    if follow:
+        follow_data_file(
+            bucket, files, format, batch_size, max_batch_bytes, linger, retries
+        )
+        return
+
+    config = ClientConfig.from_env()
+    config.pool_maxsize = max(
+        config.pool_maxsize, concurrency * min(file_workers, len(files))
+    )
+    api = create_api(config=config)
+    bucket = api.Buckets.reference(bucket)
+    single_file = len(files) == 1
+
+    ingest = push_files(
+        bucket,
+        files,
+        format=format,
+        file_workers=file_workers,
+        resume=resume,
+        on_file=echo_file_result,
+        batch_size=batch_size,
+        max_batch_bytes=max_batch_bytes,
+        concurrency=concurrency,
+        retries=retries,
+        on_progress=echo_chunk_progress if single_file else None,
+        workers=workers,
+        delimiter=delimiter,
+        quotechar=quotechar,
+        encoding=encoding,
+        infer_types=infer_types,
+    )
+    if single_file and not ingest.ok:
+        raise ingest.failed[0].error
 
-    api = create_api()
-    bucket = api.Bucket(bucket)
-    bucket.push_data(rows=rows)
     typer.echo(
         typer.style(
-            "The data has been loaded 🚀.",
+            f"The data has been loaded 🚀. {ingest.rows} rows from "
+            f"{ingest.files} file(s) in {ingest.chunks} chunks "
+            f"({ingest.elapsed:.1f}s, {ingest.rows_per_second:.0f} rows/s).",
             fg=typer.colors.WHITE,
             bold=True,
         )
     )
+    if not ingest.ok:
+        for result in ingest.failed:
+            error = getattr(result.error, "message", result.error)
+            typer.echo(
+                typer.style(f"{result.file}: {error}", fg=typer.colors.RED)
+            )
+        typer.echo(
+            typer.style(
+                f"Error: {len(ingest.failed)} file(s) could not be pushed, "
+                "run the same command with --resume to retry them.",
+                fg=typer.colors.RED,
+                bold=True,
+            )
+        )
+        raise typer.Exit(code=1)
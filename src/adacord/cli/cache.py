@@ -0,0 +1,262 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Any, Dict, Tuple, Mapping, Optional
+from pathlib import Path
+
+from .config import ENV_PREFIX, read_config
+from .commons import CONFIG_FOLDER_PATH
+
+DEFAULT_TTL = 60
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+DEFAULT_BUCKET_TTL = 300
+
+
+class CacheEntry:
+    def __init__(self, body: bytes, etag: str = None, fresh: bool = True):
+        self.body = body
+        self.etag = etag
+        self.fresh = fresh
+
+
+class QueryCache:
+    """An on-disk cache of the query results.
+
+    Every result is a file, named after the hash of the query and of the
+    credentials, whose modification time tracks the last access: when
+    the cache grows over `max_bytes` the least recently used results are
+    deleted. Expired results with an ETag are kept, to be revalidated.
+
+    Args:
+        path: the folder of the cache.
+        ttl: the seconds a result is fresh.
+        max_bytes: the max size of the cache.
+    """
+
+    def __init__(
+        self,
+        path: Path = CONFIG_FOLDER_PATH / "cache" / "queries",
+        ttl: float = DEFAULT_TTL,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+    @classmethod
+    def from_config(
+        cls,
+        environ: Mapping[str, str] = os.environ,
+        base_path: Path = CONFIG_FOLDER_PATH,
+    ) -> Optional["QueryCache"]:
+        """Return the cache set in the config file or in the environment
+        variables (ADACORD_QUERY_CACHE_TTL, ADACORD_QUERY_CACHE_MAX_BYTES),
+        None if the cache is not enabled.
+
+        The config file looks like:
+            {"query_cache": {"ttl": 60, "max_bytes": 10000000}}
+        """
+        settings = read_config(base_path).get("query_cache", {})
+        ttl = environ.get(f"{ENV_PREFIX}QUERY_CACHE_TTL", settings.get("ttl"))
+        if ttl is None:
+            return None
+        max_bytes = environ.get(
+            f"{ENV_PREFIX}QUERY_CACHE_MAX_BYTES",
+            settings.get("max_bytes", DEFAULT_MAX_BYTES),
+        )
+        return cls(
+            Path(base_path) / "cache" / "queries",
+            ttl=float(ttl),
+            max_bytes=int(max_bytes),
+        )
+
+    @staticmethod
+    def key(*parts: str) -> str:
+        return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+    def _file(self, key: str) -> Path:
+        return self.path / key
+
+    def _read(self, key: str) -> Tuple[dict, bytes]:
+        with open(self._file(key), "rb") as f:
+            header = json.loads(f.readline())
+            return header, f.read()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Return the cached result, it may be stale if it has an ETag."""
+        try:
+            header, body = self._read(key)
+        except (OSError, ValueError):
+            return None
+        fresh = time.time() - header["created"] < self.ttl
+        if not fresh and not header.get("etag"):
+            self.delete(key)
+            return None
+        os.utime(self._file(key))
+        return CacheEntry(body, header.get("etag"), fresh)
+
+    def set(self, key: str, body: bytes, etag: str = None):
+        self.path.mkdir(parents=True, exist_ok=True)
+        header = json.dumps({"created": time.time(), "etag": etag})
+        tmp_file = self._file(f"{key}.{os.getpid()}.tmp")
+        with open(tmp_file, "wb") as f:
+            f.write(header.encode("utf-8") + b"\n")
+            f.write(body)
+        os.replace(tmp_file, self._file(key))
+        self.evict()
+
+    def refresh(self, key: str):
+        """Mark a revalidated result as fresh again."""
+        try:
+            header, body = self._read(key)
+        except (OSError, ValueError):
+            return
+        self.set(key, body, header.get("etag"))
+
+    def delete(self, key: str):
+        try:
+            self._file(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def evict(self):
+        """Delete the least recently used results over `max_bytes`."""
+        files = []
+        for entry in os.scandir(self.path):
+            if entry.name.endswith(".tmp"):
+                continue
+            stat = entry.stat()
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+        size = sum(file_size for _, file_size, _ in files)
+        for _, file_size, path in sorted(files):
+            if size <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            size -= file_size
+
+    def clear(self):
+        if self.path.exists():
+            for entry in os.scandir(self.path):
+                os.unlink(entry.path)
+
+
+class BucketCache:
+    """A cache of the bucket metadata, so that looking a bucket up by its
+    uuid or its name doesn't cost a request every time.
+
+    The entries live in memory and, when `path` is set, in a JSON file
+    shared by the processes (the CLI commands). They are keyed by the
+    hash of the credentials and of the uuid or name: a payload is cached
+    under both, and `invalidate` removes both.
+
+    Args:
+        ttl: the seconds an entry is fresh, 0 disables the cache.
+        path: the JSON file of the cache, memory only if None.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_BUCKET_TTL, path: Path = None):
+        self.ttl = ttl
+        self.path = Path(path) if path is not None else None
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        # The (mtime, size) of the file when it was last read.
+        self._version = None
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"BucketCache<{self.path or 'memory'}, ttl={self.ttl}>"
+
+    @classmethod
+    def from_config(
+        cls,
+        environ: Mapping[str, str] = os.environ,
+        base_path: Path = CONFIG_FOLDER_PATH,
+    ) -> "BucketCache":
+        """Return the on-disk cache of the CLI, its TTL is set in the
+        config file or in ADACORD_BUCKET_CACHE_TTL.
+
+        The config file looks like:
+            {"bucket_cache": {"ttl": 300}}
+        """
+        settings = read_config(base_path).get("bucket_cache", {})
+        ttl = environ.get(
+            f"{ENV_PREFIX}BUCKET_CACHE_TTL",
+            settings.get("ttl", DEFAULT_BUCKET_TTL),
+        )
+        return cls(float(ttl), Path(base_path) / "cache" / "buckets.json")
+
+    def _load(self):
+        """Read the file again if another process changed it."""
+        if self.path is None:
+            return
+        try:
+            stat = self.path.stat()
+            version = (stat.st_mtime_ns, stat.st_size)
+            if version == self._version:
+                return
+            with open(self.path) as f:
+                self._entries = json.load(f)
+        except (OSError, ValueError):
+            self._entries, version = {}, None
+        self._version = version
+
+    def _save(self):
+        now = time.time()
+        self._entries = {
+            key: entry
+            for key, entry in self._entries.items()
+            if entry["expires"] > now
+        }
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, self.path)
+        stat = self.path.stat()
+        self._version = (stat.st_mtime_ns, stat.st_size)
+
+    def get(self, scope: str, bucket: str) -> Optional[Dict[str, Any]]:
+        """Return the payload of a bucket, None if not cached or stale."""
+        if self.ttl <= 0:
+            return None
+        with self._lock:
+            self._load()
+            entry = self._entries.get(QueryCache.key(scope, bucket))
+        if entry is None or entry["expires"] <= time.time():
+            return None
+        return entry["payload"]
+
+    def set(self, scope: str, *payloads: Dict[str, Any]):
+        if self.ttl <= 0:
+            return
+        expires = time.time() + self.ttl
+        with self._lock:
+            self._load()
+            for payload in payloads:
+                entry = {"expires": expires, "payload": payload}
+                for name in (payload.get("uuid"), payload.get("name")):
+                    if name:
+                        self._entries[QueryCache.key(scope, name)] = entry
+            self._save()
+
+    def invalidate(self, scope: str, bucket: str):
+        """Forget a bucket, by its uuid or its name."""
+        with self._lock:
+            self._load()
+            entry = self._entries.get(QueryCache.key(scope, bucket), {})
+            payload = entry.get("payload", {})
+            names = {bucket, payload.get("uuid"), payload.get("name")}
+            for name in names - {None}:
+                self._entries.pop(QueryCache.key(scope, name), None)
+            self._save()
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+            self._save()
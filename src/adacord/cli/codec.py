@@ -0,0 +1,120 @@
+import os
+import json
+import importlib.util
+from typing import Any, Union, Callable
+
+Buffer = Union[bytes, bytearray, memoryview, str]
+
+PREFERRED_CODECS = ("orjson", "msgspec", "ujson", "json")
+
+
+class Codec:
+    """A JSON codec that encodes to bytes and decodes from any buffer.
+
+    Decoding errors are raised as json.JSONDecodeError, whatever the
+    library, so callers handle a single exception.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        dumps: Callable[[Any], bytes],
+        loads: Callable[[Buffer], Any],
+    ):
+        self.name = name
+        self._dumps = dumps
+        self._loads = loads
+
+    def __repr__(self):
+        return f"Codec<{self.name}>"
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._dumps(obj)
+
+    def loads(self, data: Buffer) -> Any:
+        try:
+            return self._loads(data)
+        except json.JSONDecodeError:
+            raise
+        except ValueError as error:
+            raise json.JSONDecodeError(str(error), "", 0) from error
+
+
+def _stdlib_codec() -> Codec:
+    encoder = json.JSONEncoder(separators=(",", ":"), allow_nan=False)
+
+    def loads(data: Buffer) -> Any:
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        return json.loads(data)
+
+    return Codec(
+        "json", lambda obj: encoder.encode(obj).encode("utf-8"), loads
+    )
+
+
+def _orjson_codec() -> Codec:
+    import orjson
+
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+    return Codec("orjson", dumps, orjson.loads)
+
+
+def _msgspec_codec() -> Codec:
+    import msgspec
+
+    return Codec("msgspec", msgspec.json.encode, msgspec.json.decode)
+
+
+def _ujson_codec() -> Codec:
+    import ujson
+
+    def loads(data: Buffer) -> Any:
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        return ujson.loads(data)
+
+    return Codec(
+        "ujson",
+        lambda obj: ujson.dumps(obj, ensure_ascii=False).encode("utf-8"),
+        loads,
+    )
+
+
+CODECS = {
+    "json": _stdlib_codec,
+    "orjson": _orjson_codec,
+    "msgspec": _msgspec_codec,
+    "ujson": _ujson_codec,
+}
+
+
+def get_codec(name: str = None) -> Codec:
+    """Return the codec called `name`, or the fastest one installed.
+
+    The ADACORD_JSON_CODEC environment variable picks the default codec.
+    """
+    name = name or os.environ.get("ADACORD_JSON_CODEC")
+    if name:
+        if name not in CODECS:
+            raise ValueError(
+                f"Unknown JSON codec {name!r}, "
+                f"choose one of {', '.join(CODECS)}"
+            )
+        return CODECS[name]()
+    for name in PREFERRED_CODECS:
+        if name == "json" or importlib.util.find_spec(name):
+            return CODECS[name]()
+
+
+default_codec = get_codec()
+
+
+def dumps(obj: Any) -> bytes:
+    return default_codec.dumps(obj)
+
+
+def loads(data: Buffer) -> Any:
+    return default_codec.loads(data)
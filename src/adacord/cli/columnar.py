@@ -0,0 +1,118 @@
+from typing import Any, Dict, List, Iterable
+
+BOOL = "bool"
+INT = "int64"
+FLOAT = "float64"
+STRING = "string"
+OBJECT = "object"
+
+
+def to_columns(rows: Iterable[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """Build a list of values per column, consuming the rows one by one.
+
+    A key missing from a row is a None value, in any column.
+    """
+    columns: Dict[str, List[Any]] = {}
+    count = 0
+    for row in rows:
+        if row.keys() != columns.keys():
+            for key in row.keys() - columns.keys():
+                columns[key] = [None] * count
+        for key, column in columns.items():
+            column.append(row.get(key))
+        count += 1
+    return columns
+
+
+def infer_dtype(values: List[Any]) -> str:
+    """Return the narrowest dtype of the values, ignoring the Nones."""
+    types = {type(value) for value in values if value is not None}
+    if not types:
+        return OBJECT
+    if types == {bool}:
+        return BOOL
+    if types == {int}:
+        return INT
+    if types <= {int, float}:
+        return FLOAT
+    if types == {str}:
+        return STRING
+    return OBJECT
+
+
+def _import(module: str, extra: str):
+    try:
+        return __import__(module)
+    except ImportError:
+        raise ImportError(
+            f"This output needs {module}, "
+            f"install it with `pip install adacord[{extra}]`."
+        )
+
+
+def to_numpy(
+    rows: Iterable[Dict[str, Any]], dtypes: Dict[str, str] = None
+) -> Dict[str, Any]:
+    """Return a numpy array per column.
+
+    Integer and boolean columns with missing values become float64 (NaN)
+    and object columns respectively, since numpy has no nulls.
+    """
+    numpy = _import("numpy", "numpy")
+    dtypes = dtypes or {}
+    arrays = {}
+    for name, values in to_columns(rows).items():
+        dtype = dtypes.get(name) or infer_dtype(values)
+        has_nulls = any(value is None for value in values)
+        if dtype == FLOAT or (dtype == INT and has_nulls):
+            values = [
+                numpy.nan if value is None else value for value in values
+            ]
+            dtype = FLOAT
+        elif dtype == STRING or (dtype == BOOL and has_nulls):
+            dtype = OBJECT
+        arrays[name] = numpy.array(values, dtype=dtype)
+    return arrays
+
+
+def to_arrow(rows: Iterable[Dict[str, Any]], dtypes: Dict[str, str] = None):
+    """Return a pyarrow.Table, nulls are kept as such in every column."""
+    pyarrow = _import("pyarrow", "arrow")
+    dtypes = dtypes or {}
+    arrays = {}
+    for name, values in to_columns(rows).items():
+        dtype = dtypes.get(name) or infer_dtype(values)
+        arrow_type = None if dtype == OBJECT else pyarrow.type_for_alias(dtype)
+        arrays[name] = pyarrow.array(values, type=arrow_type)
+    return pyarrow.table(arrays)
+
+
+PANDAS_DTYPES = {BOOL: "boolean", INT: "Int64", FLOAT: "float64"}
+
+
+def to_pandas(rows: Iterable[Dict[str, Any]], dtypes: Dict[str, str] = None):
+    """Return a pandas.DataFrame, using the nullable dtypes of pandas."""
+    pandas = _import("pandas", "pandas")
+    dtypes = dtypes or {}
+    series = {}
+    for name, values in to_columns(rows).items():
+        dtype = dtypes.get(name) or infer_dtype(values)
+        series[name] = pandas.Series(
+            values, dtype=PANDAS_DTYPES.get(dtype, dtype)
+        )
+    return pandas.DataFrame(series)
+
+
+MATERIALIZERS = {"numpy": to_numpy, "arrow": to_arrow, "pandas": to_pandas}
+
+
+def materialize(
+    rows: Iterable[Dict[str, Any]], as_: str, dtypes: Dict[str, str] = None
+):
+    try:
+        materializer = MATERIALIZERS[as_]
+    except KeyError:
+        raise ValueError(
+            f"Unknown output {as_!r}, use one of: {', '.join(MATERIALIZERS)}"
+        )
+    return materializer(rows, dtypes)
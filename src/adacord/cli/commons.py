@@ -1,7 +1,15 @@
+import re
 import csv
 import json
-from typing import Any, Dict, List
+import math
+import itertools
+from typing import IO, Any, Dict, List, Union, Callable, Iterator, Optional
 from pathlib import Path
+from functools import partial
+
+from . import codec
+from .jsonstream import READ_SIZE, iter_batches, iter_json_array
+from .compression import open_data_file
 
 CONFIG_FOLDER_PATH = Path.home() / ".adacord"
 
@@ -26,28 +34,188 @@ def get_token(base_path=CONFIG_FOLDER_PATH):
     return auth["token"]
 
 
+def parse_bool(value: str) -> bool:
+    lowered = value.lower()
+    if lowered in ("true", "false"):
+        return lowered == "true"
+    raise ValueError(f"{value!r} is not a boolean")
+
+
+# Plain decimal numbers only: int() and float() also take "1_000", "NaN"
+# or "inf", and leading zeros are meaningful, e.g. in zip codes.
+INT_PATTERN = re.compile(r"[+-]?(?:0|[1-9][0-9]*)")
+FLOAT_PATTERN = re.compile(
+    r"[+-]?(?:(?:0|[1-9][0-9]*)(?:\.[0-9]*)?|\.[0-9]+)(?:[eE][+-]?[0-9]+)?"
+)
+
+
+def parse_int(value: str) -> int:
+    if not INT_PATTERN.fullmatch(value):
+        raise ValueError(f"{value!r} is not an integer")
+    return int(value)
+
+
+def parse_float(value: str) -> float:
+    if not FLOAT_PATTERN.fullmatch(value):
+        raise ValueError(f"{value!r} is not a number")
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f"{value!r} is out of range")
+    return number
+
+
+CSV_CONVERTERS = (parse_int, parse_float, parse_bool)
+
+Converter = Optional[Callable[[str], Any]]
+
+
+def infer_converter(values: List[str]) -> Converter:
+    """Return the first converter that parses all the non empty values,
+    None if the values are strings."""
+    values = [value for value in values if value != ""]
+    if not values:
+        return None
+    for converter in CSV_CONVERTERS:
+        try:
+            for value in values:
+                converter(value)
+        except ValueError:
+            continue
+        return converter
+    return None
+
+
+def convert(converter: Converter, value: str) -> Any:
+    """Convert the value, keep it as is if it doesn't match the type."""
+    if converter is None:
+        return value
+    if value == "":
+        return None
+    try:
+        return converter(value)
+    except ValueError:
+        return value
+
+
+def iter_csv(
+    filepath: Path,
+    delimiter: str = ",",
+    quotechar: str = '"',
+    encoding: str = "utf-8",
+    infer_types: bool = False,
+    sample_size: int = 1000,
+) -> Iterator[Dict[str, Any]]:
+    """Yield the rows of a CSV file, the values are strings.
+    Args:
+        filepath: the path of the CSV file, the first row is the header,
+            it can be compressed (.gz, .bz2, .xz, .zst).
+        delimiter: the character separating the fields.
+        quotechar: the character quoting the fields.
+        encoding: the encoding of the file.
+        infer_types: convert the values to int, float, bool or None
+            (empty values), per column, looking at the first rows.
+        sample_size: the number of rows used to infer the types.
+    """
+    with open_data_file(filepath, encoding=encoding, newline="") as csvf:
+        yield from iter_csv_stream(
+            csvf,
+            delimiter=delimiter,
+            quotechar=quotechar,
+            infer_types=infer_types,
+            sample_size=sample_size,
+        )
+
+
+def iter_csv_stream(
+    csvf: IO[str],
+    delimiter: str = ",",
+    quotechar: str = '"',
+    infer_types: bool = False,
+    sample_size: int = 1000,
+) -> Iterator[Dict[str, Any]]:
+    """Yield the rows of CSV text read from an open file, see iter_csv."""
+    reader = csv.reader(csvf, delimiter=delimiter, quotechar=quotechar)
+    header = next(reader, None)
+    if header is None:
+        return
+    fieldnames = [clean_field(field) for field in header]
+
+    # Blank lines are skipped, like csv.DictReader does.
+    reader = filter(None, reader)
+    if not infer_types:
+        for values in reader:
+            yield dict(zip(fieldnames, values))
+        return
+
+    sample = list(itertools.islice(reader, sample_size))
+    converters = [
+        infer_converter([row[index] for row in sample if index < len(row)])
+        for index in range(len(fieldnames))
+    ]
+    for values in itertools.chain(sample, reader):
+        yield {
+            field: convert(converter, value)
+            for field, converter, value in zip(fieldnames, converters, values)
+        }
+
+
+def iter_csv_batches(
+    filepath: Path, batch_size: int = 1000, columnar: bool = False, **options
+) -> Iterator[Union[List[Dict[str, Any]], Dict[str, List[Any]]]]:
+    """Yield the rows of a CSV file in batches of `batch_size` rows.
+    Args:
+        filepath: the path of the CSV file.
+        batch_size: the number of rows per batch.
+        columnar: yield a list of values per column instead of rows.
+        **options: see iter_csv.
+    """
+    rows = iter_csv(filepath, **options)
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            return
+        if columnar:
+            yield {
+                field: [row.get(field) for row in batch] for field in batch[0]
+            }
+        else:
+            yield batch
+
+
+def iter_json(filepath: Path) -> Iterator[Dict[str, Any]]:
+    """Yield the elements of the top-level array of a JSON file, or the
+    top-level object. The file is parsed incrementally, so only one row at
+    a time is kept in memory."""
+    with open_data_file(filepath, binary=True) as f:
+        yield from iter_json_array(iter(partial(f.read, READ_SIZE), b""))
+
+
+def iter_json_batches(
+    filepath: Path, batch_size: int = 1000
+) -> Iterator[List[Dict[str, Any]]]:
+    """Yield the rows of a JSON file in batches of `batch_size` rows."""
+    yield from iter_batches(iter_json(filepath), batch_size)
+
+
+def iter_jsonlines(filepath: Path) -> Iterator[Dict[str, Any]]:
+    with open_data_file(filepath, binary=True) as f:
+        yield from iter_jsonlines_stream(f)
+
+
+def iter_jsonlines_stream(f: IO[bytes]) -> Iterator[Dict[str, Any]]:
+    """Yield the rows of JSON-lines read from an open binary file."""
+    for line in f:
+        if line.strip():
+            yield codec.loads(line)
+
+
 def parse_csv(filepath: Path) -> List[Dict[str, Any]]:
-    rows = []
-    with filepath.open(encoding="utf-8") as csvf:
-        csvReader = csv.DictReader(csvf)
-        csvReader.fieldnames = [
-            clean_field(field) for field in csvReader.fieldnames
-        ]
-        rows = [row for row in csvReader]
-    return rows
+    return list(iter_csv(filepath))
 
 
 def parse_json(filepath: Path) -> List[Dict[str, Any]]:
-    with open(filepath) as f:
-        rows = json.load(f)
-    if isinstance(rows, dict):
-        rows = [rows]
-    return rows
+    return list(iter_json(filepath))
 
 
 def parse_jsonlines(filepath: Path) -> List[Dict[str, Any]]:
-    rows = []
-    with filepath.open("r") as f:
-        for line in f:
-            rows.append(json.loads(line))
-    return rows
+    return list(iter_jsonlines(filepath))
@@ -0,0 +1,92 @@
+import io
+import bz2
+import gzip
+import lzma
+from typing import IO, Dict, Tuple
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+GZIP = "gzip"
+ZSTD = "zstd"
+DEFAULT_COMPRESSION_THRESHOLD = 1024
+
+COMPRESSED_SUFFIXES = (".gz", ".bz2", ".xz", ".zst")
+
+
+def _require_zstandard():
+    if zstandard is None:
+        raise ImportError(
+            "zstd compression needs zstandard, "
+            "install it with `pip install adacord[zstd]`."
+        )
+
+
+def compress(data: bytes, encoding: str, level: int = None) -> bytes:
+    if encoding == GZIP:
+        return gzip.compress(data, compresslevel=6 if level is None else level)
+    if encoding == ZSTD:
+        _require_zstandard()
+        compressor = zstandard.ZstdCompressor(
+            level=3 if level is None else level
+        )
+        return compressor.compress(data)
+    raise ValueError(f"Unknown compression {encoding!r}, use gzip or zstd")
+
+
+def compress_body(
+    body: bytes,
+    encoding: str = None,
+    level: int = None,
+    threshold: int = DEFAULT_COMPRESSION_THRESHOLD,
+) -> Tuple[bytes, Dict[str, str]]:
+    """Compress a request body bigger than `threshold` bytes.
+
+    Return the body to send and the headers to add to the request.
+    """
+    if not encoding or len(body) < threshold:
+        return body, {}
+    return compress(body, encoding, level), {"Content-Encoding": encoding}
+
+
+def strip_compression_suffix(path: Path) -> Path:
+    """data.csv.gz -> data.csv"""
+    if path.suffix in COMPRESSED_SUFFIXES:
+        return path.with_suffix("")
+    return path
+
+
+def open_data_file(
+    path: Path, encoding: str = "utf-8", newline: str = None, binary=False
+) -> IO:
+    """Open a file for reading, decompressing it on the fly if its
+    extension is .gz, .bz2, .xz or .zst.
+
+    Args:
+        path: the path of the file.
+        encoding: the encoding of the text.
+        newline: see `open`.
+        binary: return a binary file, ignoring encoding and newline.
+    """
+    path = Path(path)
+    text_options = {"encoding": encoding, "newline": newline}
+    mode = "rb" if binary else "rt"
+    if binary:
+        text_options = {}
+
+    opener = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}.get(
+        path.suffix
+    )
+    if opener is not None:
+        return opener(path, mode, **text_options)
+    if path.suffix == ".zst":
+        _require_zstandard()
+        reader = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"))
+        reader = io.BufferedReader(reader)
+        if binary:
+            return reader
+        return io.TextIOWrapper(reader, **text_options)
+    return open(path, mode, **text_options)
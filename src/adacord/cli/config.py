@@ -0,0 +1,179 @@
+import os
+import json
+from typing import Dict, Tuple, Union, Mapping, Optional
+from pathlib import Path
+
+from .commons import CONFIG_FOLDER_PATH
+from .compression import DEFAULT_COMPRESSION_THRESHOLD
+
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 10.0
+
+# The operations that move a lot of data get longer read timeouts.
+QUERY = "query"
+PUSH = "push"
+GET_DATA = "get_data"
+DEFAULT_OPERATION_TIMEOUTS = {QUERY: 60.0, PUSH: 60.0, GET_DATA: 120.0}
+
+ENV_PREFIX = "ADACORD_"
+
+Timeout = Union[float, Tuple[float, float]]
+
+
+class Timeouts:
+    """The (connect, read) timeouts of the requests, per operation.
+
+    Args:
+        connect: the seconds to wait for the connection to be established.
+        read: the seconds to wait for the server to send a response.
+        operations: the read timeout, or (connect, read) timeouts,
+            of some operations (e.g. "query").
+    """
+
+    def __init__(
+        self,
+        connect: float = DEFAULT_CONNECT_TIMEOUT,
+        read: float = DEFAULT_READ_TIMEOUT,
+        operations: Dict[str, Timeout] = None,
+    ):
+        self.connect = connect
+        self.read = read
+        self.operations = dict(DEFAULT_OPERATION_TIMEOUTS)
+        self.operations.update(operations or {})
+
+    def __repr__(self):
+        return f"Timeouts<connect={self.connect}, read={self.read}>"
+
+    @property
+    def default(self) -> Tuple[float, float]:
+        return (self.connect, self.read)
+
+    def for_operation(self, operation: str = None) -> Tuple[float, float]:
+        timeout = self.operations.get(operation)
+        if timeout is None:
+            return self.default
+        if isinstance(timeout, (tuple, list)):
+            return tuple(timeout)
+        return (self.connect, timeout)
+
+
+class ClientConfig:
+    """The configuration of the HTTP clients.
+
+    Args:
+        pool_connections: the number of connection pools to cache.
+        pool_maxsize: the max number of connections kept alive per host,
+            it should be at least the concurrency of the pushes.
+        pool_block: wait for a free connection instead of opening a new
+            one when the pool is full.
+        timeouts: the connect and read timeouts.
+        http2: use HTTP/2, only the async client supports it (it needs
+            `pip install httpx[http2]`).
+        compression: compress the request bodies, "gzip" or "zstd".
+        compression_level: the compression level, the codec's default
+            if None.
+        compression_threshold: the min size of the compressed bodies.
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+        pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+        pool_block: bool = False,
+        timeouts: Timeouts = None,
+        http2: bool = False,
+        compression: str = None,
+        compression_level: int = None,
+        compression_threshold: int = DEFAULT_COMPRESSION_THRESHOLD,
+    ):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.timeouts = timeouts or Timeouts()
+        self.http2 = http2
+        self.compression = compression
+        self.compression_level = compression_level
+        self.compression_threshold = compression_threshold
+
+    @classmethod
+    def from_env(
+        cls,
+        environ: Mapping[str, str] = os.environ,
+        base_path: Path = CONFIG_FOLDER_PATH,
+    ) -> "ClientConfig":
+        """Read the config from `~/.adacord/config.json`, if any, and
+        from the `ADACORD_*` environment variables, which take precedence.
+
+        The config file looks like:
+            {"http": {"pool_maxsize": 20, "read_timeout": 30,
+                      "timeouts": {"query": 120}}}
+        and the matching environment variables are ADACORD_POOL_MAXSIZE,
+        ADACORD_READ_TIMEOUT and ADACORD_QUERY_TIMEOUT.
+        """
+        settings = read_config(base_path).get("http", {})
+        for key in (
+            "pool_connections",
+            "pool_maxsize",
+            "pool_block",
+            "connect_timeout",
+            "read_timeout",
+            "http2",
+            "compression",
+            "compression_level",
+            "compression_threshold",
+        ):
+            value = environ.get(ENV_PREFIX + key.upper())
+            if value is not None:
+                settings[key] = value
+
+        operations = dict(settings.get("timeouts", {}))
+        for operation in DEFAULT_OPERATION_TIMEOUTS:
+            value = environ.get(f"{ENV_PREFIX}{operation.upper()}_TIMEOUT")
+            if value is not None:
+                operations[operation] = float(value)
+
+        timeouts = Timeouts(
+            connect=float(
+                settings.get("connect_timeout", DEFAULT_CONNECT_TIMEOUT)
+            ),
+            read=float(settings.get("read_timeout", DEFAULT_READ_TIMEOUT)),
+            operations=operations,
+        )
+        return cls(
+            pool_connections=int(
+                settings.get("pool_connections", DEFAULT_POOL_CONNECTIONS)
+            ),
+            pool_maxsize=int(
+                settings.get("pool_maxsize", DEFAULT_POOL_MAXSIZE)
+            ),
+            pool_block=to_bool(settings.get("pool_block", False)),
+            timeouts=timeouts,
+            http2=to_bool(settings.get("http2", False)),
+            compression=settings.get("compression") or None,
+            compression_level=to_int(settings.get("compression_level")),
+            compression_threshold=int(
+                settings.get(
+                    "compression_threshold", DEFAULT_COMPRESSION_THRESHOLD
+                )
+            ),
+        )
+
+
+def to_bool(value: Union[str, bool]) -> bool:
+    if isinstance(value, bool):
+        return value
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def to_int(value: Union[str, int, None]) -> Optional[int]:
+    return None if value is None else int(value)
+
+
+def read_config(base_path: Path = CONFIG_FOLDER_PATH) -> Dict:
+    try:
+        with open(Path(base_path) / "config.json") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
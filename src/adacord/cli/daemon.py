@@ -0,0 +1,352 @@
+import os
+import sys
+import json
+import time
+import socket
+import threading
+import subprocess
+import socketserver
+from typing import IO, Any, Dict, Tuple, Mapping, Optional
+from pathlib import Path
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from .api import HTTPClient, CustomHTTPAdapter
+from .config import ENV_PREFIX, ClientConfig, to_bool
+from .commons import CONFIG_FOLDER_PATH
+
+DAEMON_SOCKET_PATH = CONFIG_FOLDER_PATH / "daemon.sock"
+RESPONSE_CHUNK_SIZE = 64 * 1024
+CONNECT_TIMEOUT = 1.0
+# The body is decoded by the daemon, the client gets the plain bytes.
+HOP_HEADERS = ("content-encoding", "content-length", "transfer-encoding")
+ERRORS = {
+    "ConnectTimeout": requests.ConnectTimeout,
+    "ReadTimeout": requests.ReadTimeout,
+    "ConnectionError": requests.ConnectionError,
+}
+
+
+def socket_path(environ: Mapping[str, str] = os.environ) -> Path:
+    return Path(environ.get(f"{ENV_PREFIX}DAEMON_SOCKET", DAEMON_SOCKET_PATH))
+
+
+def write_message(wfile: IO[bytes], message: Dict[str, Any]):
+    wfile.write(json.dumps(message).encode("utf-8") + b"\n")
+
+
+def read_message(rfile: IO[bytes]) -> Dict[str, Any]:
+    line = rfile.readline()
+    if not line.endswith(b"\n"):
+        raise ConnectionError("The connection was closed.")
+    return json.loads(line)
+
+
+def connect(path: Path, timeout: float = None) -> socket.socket:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(CONNECT_TIMEOUT)
+        sock.connect(str(path))
+        sock.settimeout(timeout)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def send_command(command: str, path: Path = None) -> Dict[str, Any]:
+    """Send a command ("status" or "stop") to the daemon, return its
+    answer. OSError is raised if the daemon is not running."""
+    with connect(path or socket_path(), CONNECT_TIMEOUT) as sock:
+        with sock.makefile("rwb") as f:
+            write_message(f, {"command": command})
+            f.flush()
+            return read_message(f)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    server: "DaemonServer"
+
+    def handle(self):
+        try:
+            message = read_message(self.rfile)
+        except (ConnectionError, ValueError):
+            return
+        if "command" in message:
+            write_message(self.wfile, self.server.run_command(message))
+            return
+        body = self.rfile.read(message.get("body_length", 0)) or None
+        self.server.forward(message, body, self.wfile)
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Forward the HTTP requests sent to a Unix socket by the CLI, through
+    a long-lived session: the connections to the API stay open between
+    two commands, there is no new TLS handshake for each of them.
+
+    A request is a JSON line (method, url, headers, timeout and body
+    length) followed by the body. The answer is a JSON line (status,
+    reason, headers, or the error) followed by the body, until the
+    connection is closed. The requests are forwarded as they are, with
+    the headers set by the client, its token included, and no retries:
+    the client retries.
+
+    Args:
+        path: the path of the socket, readable by the user only.
+        config: the config of the pool of connections.
+        idle_timeout: stop after this many seconds without requests.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        path: Path = None,
+        config: ClientConfig = None,
+        idle_timeout: float = None,
+    ):
+        self.path = Path(path or socket_path())
+        self.idle_timeout = idle_timeout
+        self.started = time.time()
+        self.last_request = time.monotonic()
+        self.requests = 0
+        config = config or ClientConfig.from_env()
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=config.pool_connections,
+            pool_maxsize=config.pool_maxsize,
+            pool_block=config.pool_block,
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._remove_stale_socket()
+        self.path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        # Created readable by the user only: a chmod after the bind would
+        # leave a window where other users can connect.
+        umask = os.umask(0o177)
+        try:
+            super().__init__(str(self.path), _RequestHandler)
+        finally:
+            os.umask(umask)
+
+    def __repr__(self):
+        return f"DaemonServer<{self.path}>"
+
+    def _remove_stale_socket(self):
+        if not self.path.exists():
+            return
+        try:
+            connect(self.path).close()
+        except OSError:
+            self.path.unlink()
+        else:
+            raise RuntimeError(f"A daemon is already running on {self.path}.")
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "pid": os.getpid(),
+            "socket": str(self.path),
+            "uptime": time.time() - self.started,
+            "requests": self.requests,
+        }
+
+    def run_command(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        command = message["command"]
+        if command == "stop":
+            # shutdown waits for serve_forever, which waits for this.
+            threading.Thread(target=self.shutdown).start()
+        elif command != "status":
+            return {"error": f"Unknown command {command!r}."}
+        return self.status()
+
+    def forward(
+        self, message: Dict[str, Any], body: Optional[bytes], wfile: IO
+    ):
+        self.requests += 1
+        self.last_request = time.monotonic()
+        timeout = message.get("timeout")
+        try:
+            response = self.session.request(
+                message["method"],
+                message["url"],
+                headers=message["headers"],
+                data=body,
+                timeout=tuple(timeout) if timeout else None,
+                stream=True,
+                allow_redirects=False,
+            )
+        except requests.RequestException as error:
+            name = next(
+                (
+                    name
+                    for name, cls in ERRORS.items()
+                    if isinstance(error, cls)
+                ),
+                "ConnectionError",
+            )
+            write_message(wfile, {"error": name, "message": str(error)})
+            return
+
+        with response:
+            headers = {
+                key: value
+                for key, value in response.headers.items()
+                if key.lower() not in HOP_HEADERS
+            }
+            write_message(
+                wfile,
+                {
+                    "status": response.status_code,
+                    "reason": response.reason,
+                    "headers": headers,
+                },
+            )
+            for part in response.iter_content(RESPONSE_CHUNK_SIZE):
+                wfile.write(part)
+
+    def _watch_idle(self):
+        while True:
+            idle = time.monotonic() - self.last_request
+            if idle >= self.idle_timeout:
+                self.shutdown()
+                return
+            time.sleep(max(0.1, self.idle_timeout - idle))
+
+    def serve(self):
+        """Serve until stopped, then remove the socket."""
+        if self.idle_timeout:
+            watcher = threading.Thread(target=self._watch_idle)
+            watcher.daemon = True
+            watcher.start()
+        try:
+            self.serve_forever()
+        finally:
+            self.server_close()
+            self.session.close()
+            try:
+                self.path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def start_in_background(
+    path: Path = None, idle_timeout: float = None
+) -> subprocess.Popen:
+    """Run the daemon in a new process, detached from the terminal."""
+    code = (
+        "from adacord.cli.daemon import DaemonServer\n"
+        f"DaemonServer({str(path) if path else None!r}, "
+        f"idle_timeout={idle_timeout!r}).serve()\n"
+    )
+    return subprocess.Popen(
+        [sys.executable, "-c", code],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+class DaemonAdapter(CustomHTTPAdapter):
+    """Send the requests through the daemon listening on `path`, with
+    the retries of CustomHTTPAdapter.
+
+    Streamed request bodies, and every request when the daemon is gone,
+    are sent directly.
+    """
+
+    def __init__(self, path: Path, *args, **kwargs):
+        self.path = Path(path)
+        super().__init__(*args, **kwargs)
+
+    def send_once(self, req, stream=False, timeout=None, **kwargs):
+        if not isinstance(req.body, (bytes, str, type(None))):
+            return super().send_once(req, stream, timeout, **kwargs)
+        try:
+            sock = connect(self.path, _read_timeout(timeout))
+        except OSError:
+            return super().send_once(req, stream, timeout, **kwargs)
+
+        body = (
+            req.body.encode("utf-8") if isinstance(req.body, str) else req.body
+        )
+        f = sock.makefile("rwb")
+        # The file keeps the connection open.
+        sock.close()
+        try:
+            write_message(
+                f,
+                {
+                    "method": req.method,
+                    "url": req.url,
+                    "headers": dict(req.headers),
+                    "timeout": _timeouts(timeout),
+                    "body_length": len(body or b""),
+                },
+            )
+            f.write(body or b"")
+            f.flush()
+            message = read_message(f)
+        except socket.timeout as error:
+            f.close()
+            raise requests.ReadTimeout(error, request=req)
+        except OSError as error:
+            f.close()
+            raise requests.ConnectionError(error, request=req)
+        if "error" in message:
+            f.close()
+            error_class = ERRORS.get(
+                message["error"], requests.ConnectionError
+            )
+            raise error_class(message["message"], request=req)
+        return self._build_response(req, message, f)
+
+    def _build_response(self, req, message: Dict[str, Any], f: IO[bytes]):
+        response = requests.Response()
+        response.status_code = message["status"]
+        response.reason = message["reason"]
+        response.headers = CaseInsensitiveDict(message["headers"])
+        response.encoding = requests.utils.get_encoding_from_headers(
+            response.headers
+        )
+        # The body is read from the socket until the daemon closes it.
+        response.raw = f
+        response.url = req.url
+        response.request = req
+        response.connection = self
+        return response
+
+
+def _timeouts(timeout) -> Optional[Tuple[float, float]]:
+    if timeout is None or isinstance(timeout, (tuple, list)):
+        return timeout
+    return (timeout, timeout)
+
+
+def _read_timeout(timeout) -> Optional[float]:
+    timeouts = _timeouts(timeout)
+    return None if timeouts is None else timeouts[1]
+
+
+def use_daemon(
+    client: HTTPClient, environ: Mapping[str, str] = os.environ
+) -> bool:
+    """Send the requests of the client through the daemon, if its socket
+    exists and ADACORD_DAEMON is not "0". Return whether it does."""
+    if not to_bool(environ.get(f"{ENV_PREFIX}DAEMON", "1")):
+        return False
+    path = socket_path(environ)
+    if not path.is_socket():
+        return False
+    current = client.get_adapter("https://")
+    adapter = DaemonAdapter(
+        path,
+        pool_connections=client.config.pool_connections,
+        pool_maxsize=client.config.pool_maxsize,
+        pool_block=client.config.pool_block,
+        retry_policy=current.retry_policy,
+    )
+    client.mount("http://", adapter)
+    client.mount("https://", adapter)
+    return True
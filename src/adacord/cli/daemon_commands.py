@@ -0,0 +1,97 @@
+import time
+
+import typer
+
+from .daemon import (
+    DaemonServer,
+    socket_path,
+    send_command,
+    start_in_background,
+)
+from .exceptions import cli_wrapper
+
+app = typer.Typer()
+
+START_TIMEOUT = 5.0
+
+
+def echo_status(status):
+    typer.echo(
+        f"The daemon (pid {status['pid']}) is listening on "
+        f"{status['socket']}, it forwarded {status['requests']} requests "
+        f"in {status['uptime']:.0f}s."
+    )
+
+
+@app.command("start")
+@cli_wrapper
+def start_daemon(
+    background: bool = typer.Option(
+        False, "--background", help="Run the daemon in a new process."
+    ),
+    idle_timeout: float = typer.Option(
+        None,
+        min=1,
+        help="Stop after this many seconds without requests.",
+    ),
+):
+    """
+    Keep the connections to the API open for the next commands.
+    """
+    path = socket_path()
+    if not background:
+        server = DaemonServer(path, idle_timeout=idle_timeout)
+        typer.echo(f"Listening on {path}, Ctrl+C to stop.")
+        try:
+            server.serve()
+        except KeyboardInterrupt:
+            pass
+        return
+
+    start_in_background(path, idle_timeout)
+    deadline = time.monotonic() + START_TIMEOUT
+    while True:
+        try:
+            status = send_command("status", path)
+        except OSError:
+            if time.monotonic() > deadline:
+                typer.echo(
+                    typer.style(
+                        "The daemon didn't start.", fg=typer.colors.RED
+                    )
+                )
+                raise typer.Exit(1)
+            time.sleep(0.05)
+        else:
+            echo_status(status)
+            return
+
+
+@app.command("stop")
+@cli_wrapper
+def stop_daemon():
+    """
+    Stop the daemon.
+    """
+    try:
+        send_command("stop")
+    except OSError:
+        typer.echo("The daemon is not running.")
+        return
+    typer.echo(
+        typer.style("The daemon is stopped.", fg=typer.colors.WHITE, bold=True)
+    )
+
+
+@app.command("status")
+@cli_wrapper
+def daemon_status():
+    """
+    Tell whether the daemon is running.
+    """
+    try:
+        status = send_command("status")
+    except OSError:
+        typer.echo("The daemon is not running.")
+        raise typer.Exit(1)
+    echo_status(status)
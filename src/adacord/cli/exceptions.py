@@ -14,6 +14,20 @@ class AdacordApiError(Exception):
         self.status_code = status_code
 
 
+class PushError(AdacordApiError):
+    """Raised when some chunks of a push could not be uploaded."""
+
+    def __init__(self, summary, error: Exception):
+        failed = ", ".join(str(chunk.index) for chunk, _ in summary.failed)
+        message = (
+            f"{len(summary.failed)} chunk(s) could not be pushed "
+            f"({failed}), {summary.rows} rows were pushed. Last error: "
+            f"{getattr(error, 'message', error)}"
+        )
+        super().__init__(message, getattr(error, "status_code", None))
+        self.summary = summary
+
+
 def cli_wrapper(func):
     """Catch execpetions and return cli printable errors."""
 
@@ -27,6 +41,9 @@ def cli_wrapper(func):
                     f"Error: {err.message}", fg=typer.colors.RED, bold=True
                 )
             )
+            if isinstance(err, PushError):
+                # Some rows are missing, scripts have to know.
+                raise typer.Exit(code=1)
         except json.JSONDecodeError:
             typer.echo(
                 typer.style(
@@ -0,0 +1,281 @@
+import io
+import os
+import re
+import csv
+import json
+from enum import Enum
+from typing import Any, Dict, List, Callable, Optional
+from pathlib import Path
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from .api import Buckets, paginate_query
+from .uploads import encode_row
+
+DEFAULT_PAGE_SIZE = 10000
+DEFAULT_CONCURRENCY = 4
+
+ORDER_BY = re.compile(r"\border\s+by\b", re.IGNORECASE)
+
+
+class UnorderedExportError(ValueError):
+    """Raised when a query without ORDER BY spans more than one page."""
+
+
+class ExportFormat(str, Enum):
+    jsonl = "jsonl"
+    csv = "csv"
+    parquet = "parquet"
+
+
+class Checkpoint:
+    """The progress of an export, saved next to the output file.
+
+    It records the next page to fetch and the size of the output file
+    once that page was written, so an interrupted export can truncate
+    the file and carry on from there. It's deleted once the export is done.
+    """
+
+    def __init__(
+        self,
+        query: str,
+        format: str,
+        page_size: int,
+        next_page: int = 0,
+        rows: int = 0,
+        offset: int = 0,
+        fieldnames: List[str] = None,
+        done: bool = False,
+        **kwargs,
+    ):
+        self.query = query
+        self.format = format
+        self.page_size = page_size
+        self.next_page = next_page
+        self.rows = rows
+        self.offset = offset
+        self.fieldnames = fieldnames
+        self.done = done
+
+    @staticmethod
+    def path_for(out: Path) -> Path:
+        return out.with_name(out.name + ".checkpoint")
+
+    def matches(self, other: "Checkpoint") -> bool:
+        return (self.query, self.format, self.page_size) == (
+            other.query,
+            other.format,
+            other.page_size,
+        )
+
+    @classmethod
+    def load(cls, out: Path) -> Optional["Checkpoint"]:
+        try:
+            with open(cls.path_for(out)) as f:
+                return cls(**json.load(f))
+        except FileNotFoundError:
+            return None
+
+    def delete(self, out: Path):
+        try:
+            self.path_for(out).unlink()
+        except FileNotFoundError:
+            pass
+
+    def save(self, out: Path):
+        path = self.path_for(out)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(vars(self), f)
+        os.replace(tmp_path, path)
+
+
+class JsonlWriter:
+    resumable = True
+
+    def __init__(self, out: Path, checkpoint: Checkpoint):
+        self._file = open(out, "r+b" if checkpoint.offset else "wb")
+        self._file.truncate(checkpoint.offset)
+        self._file.seek(checkpoint.offset)
+
+    def _encode(self, rows: List[Dict[str, Any]]) -> bytes:
+        return b"".join(encode_row(row) + b"\n" for row in rows)
+
+    def write(self, rows: List[Dict[str, Any]]):
+        self._file.write(self._encode(rows))
+
+    def tell(self) -> int:
+        self._file.flush()
+        return self._file.tell()
+
+    def close(self):
+        self._file.close()
+
+
+class CsvWriter(JsonlWriter):
+    """Write the rows as CSV, the columns are the keys of the first page."""
+
+    def __init__(self, out: Path, checkpoint: Checkpoint):
+        super().__init__(out, checkpoint)
+        self._checkpoint = checkpoint
+
+    def _encode(self, rows: List[Dict[str, Any]]) -> bytes:
+        buffer = io.StringIO()
+        fieldnames = self._checkpoint.fieldnames
+        if not fieldnames:
+            fieldnames = list(
+                dict.fromkeys(key for row in rows for key in row)
+            )
+            self._checkpoint.fieldnames = fieldnames
+            csv.writer(buffer).writerow(fieldnames)
+        writer = csv.DictWriter(
+            buffer, fieldnames=fieldnames, extrasaction="ignore"
+        )
+        writer.writerows(rows)
+        return buffer.getvalue().encode("utf-8")
+
+
+class ParquetWriter:
+    """Write every page as a row group, the schema is the first page's one.
+
+    A parquet file can't be appended to, so these exports start over.
+    """
+
+    resumable = False
+
+    def __init__(self, out: Path, checkpoint: Checkpoint):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError(
+                "Exporting to parquet needs pyarrow, "
+                "install it with `pip install adacord[arrow]`."
+            )
+        self._pyarrow = pyarrow
+        self._parquet = pyarrow.parquet
+        self._out = out
+        self._writer = None
+
+    def write(self, rows: List[Dict[str, Any]]):
+        if self._writer is None:
+            table = self._pyarrow.Table.from_pylist(rows)
+            self._writer = self._parquet.ParquetWriter(self._out, table.schema)
+        else:
+            table = self._pyarrow.Table.from_pylist(
+                rows, schema=self._writer.schema
+            )
+        self._writer.write_table(table)
+
+    def tell(self) -> int:
+        return 0
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+WRITERS = {
+    ExportFormat.jsonl: JsonlWriter,
+    ExportFormat.csv: CsvWriter,
+    ExportFormat.parquet: ParquetWriter,
+}
+
+
+def fetch_page(
+    buckets: Buckets, query: str, page: int, page_size: int, ordered: bool
+) -> List[Dict[str, Any]]:
+    """Fetch a page of the results of the query.
+
+    Without a stable order LIMIT/OFFSET pages can overlap or miss rows,
+    so an unordered query must fit in a single page: its first page is
+    fetched with one more row to tell.
+    """
+    limit = page_size if ordered else page_size + 1
+    page_query = paginate_query(query, limit, page * page_size)
+    rows = list(buckets.iter_query(page_query))
+    if len(rows) > page_size:
+        raise UnorderedExportError(
+            "The query spans more than one page, it needs an ORDER BY "
+            "for the pages to be stable."
+        )
+    return rows
+
+
+def export_query(
+    buckets: Buckets,
+    query: str,
+    out: Path,
+    format: ExportFormat = ExportFormat.jsonl,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    resume: bool = True,
+    on_page: Callable[[int, int, Checkpoint], None] = None,
+) -> Checkpoint:
+    """Export the results of a query to a file, page by page.
+
+    Up to `concurrency` pages are fetched at the same time, and they are
+    written to the file in order as soon as they arrive. After every
+    page the checkpoint is saved, with `resume` an interrupted export of
+    the same query continues from the last page written.
+
+    The pages are consistent only if the query has a stable order: a
+    query without ORDER BY is exported only if it fits in a single page,
+    UnorderedExportError is raised otherwise.
+
+    Args:
+        buckets: the Buckets api.
+        query: the SQL query.
+        out: the output file.
+        format: the format of the output file.
+        page_size: the number of rows fetched per request.
+        concurrency: the number of pages fetched at the same time.
+        resume: continue from the checkpoint, if any.
+        on_page: called with the page number, its rows and the
+            checkpoint after every page is written.
+    """
+    format = ExportFormat(format)
+    writer_class = WRITERS[format]
+    checkpoint = Checkpoint(query, format.value, page_size)
+    previous = Checkpoint.load(out) if resume else None
+    if previous and previous.matches(checkpoint) and writer_class.resumable:
+        checkpoint = previous
+
+    ordered = ORDER_BY.search(query) is not None
+    if not ordered:
+        concurrency = 1
+
+    writer = writer_class(out, checkpoint)
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            pages: Dict[int, Future] = {}
+            next_to_fetch = checkpoint.next_page
+            while not checkpoint.done:
+                while len(pages) < concurrency:
+                    pages[next_to_fetch] = executor.submit(
+                        fetch_page,
+                        buckets,
+                        query,
+                        next_to_fetch,
+                        page_size,
+                        ordered,
+                    )
+                    next_to_fetch += 1
+
+                page = checkpoint.next_page
+                rows = pages.pop(page).result()
+                if rows:
+                    writer.write(rows)
+                checkpoint.next_page = page + 1
+                checkpoint.rows += len(rows)
+                checkpoint.offset = writer.tell()
+                checkpoint.done = not ordered or len(rows) < page_size
+                checkpoint.save(out)
+                if on_page:
+                    on_page(page, len(rows), checkpoint)
+
+            for future in pages.values():
+                future.cancel()
+    finally:
+        writer.close()
+    checkpoint.delete(out)
+    return checkpoint
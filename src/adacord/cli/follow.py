@@ -0,0 +1,224 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Any, Dict, List, Tuple, Callable, Optional
+from pathlib import Path
+
+from . import codec
+from .commons import CONFIG_FOLDER_PATH
+from .uploads import DEFAULT_BATCH_SIZE, DEFAULT_MAX_BATCH_BYTES
+
+FOLLOW_PATH = CONFIG_FOLDER_PATH / "follow"
+DEFAULT_LINGER = 1.0
+POLL_INTERVAL = 0.2
+READ_SIZE = 1024 * 1024
+
+
+class FollowState:
+    """The position of a followed file, saved in ~/.adacord/follow once
+    the rows before it are pushed, so a restart carries on from there.
+
+    The inode tells whether the file at `path` is still the one the
+    offset belongs to, or a new file after a rotation.
+    """
+
+    def __init__(self, path: Path, inode: int = None, offset: int = 0):
+        self.path = Path(path)
+        self.inode = inode
+        self.offset = offset
+
+    def __repr__(self):
+        return f"FollowState<{self.inode}: {self.offset}>"
+
+    @staticmethod
+    def path_for(bucket: str, file: Path, base_path: Path = None) -> Path:
+        key = f"{bucket}\n{Path(file).resolve()}".encode("utf-8")
+        name = hashlib.sha256(key).hexdigest() + ".json"
+        return Path(base_path or FOLLOW_PATH) / name
+
+    @classmethod
+    def load(
+        cls, bucket: str, file: Path, base_path: Path = None
+    ) -> "FollowState":
+        path = cls.path_for(bucket, file, base_path)
+        try:
+            with open(path) as f:
+                state = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return cls(path)
+        return cls(path, state.get("inode"), state.get("offset", 0))
+
+    def save(self, inode: int, offset: int):
+        self.inode, self.offset = inode, offset
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"inode": inode, "offset": offset}, f)
+        os.replace(tmp_path, self.path)
+
+
+class FileFollower:
+    """Read the lines appended to a file, like `tail -F`.
+
+    Only complete lines are returned, a partial line waits for its
+    newline. When the file is rotated (`path` is a new file) the old one
+    is read to its end before switching to the new one, from its start.
+    A truncated file is read again from its start.
+    """
+
+    def __init__(self, path: Path, inode: int = None, offset: int = 0):
+        self.path = Path(path)
+        self._file = None
+        self.inode = None
+        # The offset after the last complete line returned.
+        self.position = 0
+        self._partial = b""
+        self._open(inode, offset)
+
+    def _open(self, inode: int = None, offset: int = 0) -> bool:
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return False
+        stat = os.fstat(f.fileno())
+        if stat.st_ino != inode or stat.st_size < offset:
+            offset = 0
+        f.seek(offset)
+        self.close()
+        self._file = f
+        self.inode = stat.st_ino
+        self.position = offset
+        self._partial = b""
+        return True
+
+    def _rotated(self) -> bool:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        return stat.st_ino != self.inode
+
+    def _truncated(self) -> bool:
+        size = os.fstat(self._file.fileno()).st_size
+        return size < self.position + len(self._partial)
+
+    def read_lines(self) -> List[bytes]:
+        """Return the complete lines appended since the last call."""
+        if self._file is None:
+            self._open()
+            if self._file is None:
+                return []
+
+        data = self._file.read(READ_SIZE)
+        if not data:
+            # At the end of the file: switch to the new file, if any.
+            if self._rotated():
+                self._open()
+            elif self._truncated():
+                self._open(self.inode, 0)
+            return []
+
+        data = self._partial + data
+        end = data.rfind(b"\n") + 1
+        self._partial = data[end:]
+        self.position += end
+        return data[:end].splitlines()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def parse_lines(
+    lines: List[bytes], on_error: Callable[[bytes, Exception], None] = None
+) -> Tuple[List[Dict[str, Any]], int]:
+    """Decode the JSON lines, return the rows and the number of malformed
+    lines: those are skipped, and reported to `on_error`."""
+    rows, skipped = [], 0
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            rows.append(codec.loads(line))
+        except ValueError as error:
+            skipped += 1
+            if on_error:
+                on_error(line, error)
+    return rows, skipped
+
+
+def follow_file(
+    bucket,
+    file: Path,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_batch_bytes: int = DEFAULT_MAX_BATCH_BYTES,
+    linger: float = DEFAULT_LINGER,
+    on_push: Callable[[int, Any], None] = None,
+    on_error: Callable[[bytes, Exception], None] = None,
+    stop: threading.Event = None,
+    base_path: Path = None,
+    poll_interval: float = POLL_INTERVAL,
+    **push_options,
+):
+    """Push the JSON lines appended to a file, until `stop` is set.
+
+    The new lines are pushed with Bucket.push_data once `batch_size`
+    rows are waiting, or once the first of them has waited `linger`
+    seconds. The position in the file is saved after every push, so a
+    restart doesn't send the same lines again. The lines that aren't
+    valid JSON are skipped, the position moves past them too.
+
+    Args:
+        bucket: the Bucket the rows are pushed into.
+        file: the path of the JSON-lines file, it doesn't need to exist.
+        batch_size: the max number of rows sent in a single request.
+        max_batch_bytes: the max size in bytes of a single request.
+        linger: the max seconds a row waits before being pushed.
+        on_push: called with the number of rows and the PushSummary
+            after every push.
+        on_error: called with every malformed line and its error.
+        stop: set it to push the waiting rows and return.
+        base_path: the folder of the saved positions.
+        poll_interval: the seconds to wait when there is nothing new.
+        **push_options: passed to Bucket.push_data.
+    """
+    stop = stop or threading.Event()
+    state = FollowState.load(bucket.uuid, file, base_path)
+    follower = FileFollower(file, state.inode, state.offset)
+    rows: List[Dict[str, Any]] = []
+    deadline: Optional[float] = None
+
+    def push():
+        summary = bucket.push_data(
+            rows=rows,
+            batch_size=batch_size,
+            max_batch_bytes=max_batch_bytes,
+            **push_options,
+        )
+        state.save(follower.inode, follower.position)
+        if on_push:
+            on_push(len(rows), summary)
+
+    try:
+        while not stop.is_set():
+            lines = follower.read_lines()
+            new_rows, skipped = parse_lines(lines, on_error)
+            rows.extend(new_rows)
+            if skipped and not rows:
+                # Nothing waits to be pushed, don't read them again.
+                state.save(follower.inode, follower.position)
+            if rows and deadline is None:
+                deadline = time.monotonic() + linger
+            due = deadline is not None and time.monotonic() >= deadline
+            if rows and (len(rows) >= batch_size or due):
+                push()
+                rows, deadline = [], None
+            elif not lines:
+                stop.wait(poll_interval)
+        if rows:
+            push()
+    finally:
+        follower.close()
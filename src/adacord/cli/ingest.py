@@ -0,0 +1,275 @@
+import io
+import sys
+import glob
+import time
+from enum import Enum
+from typing import IO, Any, Dict, List, Callable, Iterable, Iterator, Optional
+from pathlib import Path
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .commons import (
+    iter_csv,
+    iter_json,
+    iter_jsonlines,
+    iter_csv_stream,
+    iter_jsonlines_stream,
+)
+from .journal import PushJournal
+from .uploads import DEFAULT_RETRIES, PushSummary
+from .parallel import iter_jsonlines_parallel
+from .jsonstream import READ_SIZE, iter_json_array
+from .compression import strip_compression_suffix
+
+
+class DataFileFormat(str, Enum):
+    csv = "csv"
+    json = "json"
+    jsonlines = "jsonlines"
+
+
+DATA_FILE_READERS = {
+    DataFileFormat.csv: iter_csv,
+    DataFileFormat.json: iter_json,
+    DataFileFormat.jsonlines: iter_jsonlines,
+}
+
+FORMAT_SUFFIXES = {
+    ".csv": DataFileFormat.csv,
+    ".json": DataFileFormat.json,
+    ".jsonl": DataFileFormat.jsonlines,
+    ".jsonlines": DataFileFormat.jsonlines,
+    ".ndjson": DataFileFormat.jsonlines,
+}
+
+
+def detect_format(path: Path) -> DataFileFormat:
+    """Guess the format from the extension, data.csv.gz is a CSV file."""
+    suffix = strip_compression_suffix(Path(path)).suffix.lower()
+    try:
+        return FORMAT_SUFFIXES[suffix]
+    except KeyError:
+        raise ValueError(
+            f"Can't detect the format of {path}, use --format."
+        ) from None
+
+
+def find_data_files(paths: Iterable[str]) -> List[Path]:
+    """Expand files, directories and glob patterns into a sorted list of
+    files. Directories are walked recursively, keeping only the files
+    with a known data extension.
+    """
+    files: Dict[Path, None] = {}
+    for pattern in paths:
+        path = Path(pattern)
+        if path.is_dir():
+            matches = [
+                match
+                for match in sorted(path.rglob("*"))
+                if match.is_file() and _is_data_file(match)
+            ]
+        elif glob.has_magic(pattern):
+            matches = [
+                Path(match)
+                for match in sorted(glob.glob(pattern, recursive=True))
+                if Path(match).is_file()
+            ]
+        elif path.is_file():
+            matches = [path]
+        else:
+            raise FileNotFoundError(f"No such file or directory: {pattern}")
+        for match in matches:
+            files[match.resolve()] = None
+    return list(files)
+
+
+def _is_data_file(path: Path) -> bool:
+    suffix = strip_compression_suffix(path).suffix.lower()
+    return suffix in FORMAT_SUFFIXES
+
+
+def read_data_file(
+    path: Path,
+    format: DataFileFormat = None,
+    workers: int = 1,
+    **csv_options,
+) -> Iterator[Dict[str, Any]]:
+    """Yield the rows of a data file.
+    Args:
+        path: the path of the file.
+        format: the format of the file, detected from the extension
+            by default.
+        workers: the processes decoding a JSON-lines file.
+        **csv_options: see iter_csv.
+    """
+    format = format or detect_format(path)
+    if format == DataFileFormat.csv:
+        return iter_csv(path, **csv_options)
+    if format == DataFileFormat.jsonlines and workers != 1:
+        return iter_jsonlines_parallel(path, workers=workers or None)
+    return DATA_FILE_READERS[format](path)
+
+
+def read_stdin(
+    format: DataFileFormat = DataFileFormat.jsonlines,
+    stream: IO[bytes] = None,
+    encoding: str = "utf-8",
+    **csv_options,
+) -> Iterator[Dict[str, Any]]:
+    """Yield the rows written to stdin (or `stream`) as they come.
+    Args:
+        format: the format of the stream, JSON-lines by default.
+        stream: a binary stream, stdin by default.
+        encoding: the encoding of a CSV stream.
+        **csv_options: see iter_csv.
+    """
+    stream = stream or sys.stdin.buffer
+    if format == DataFileFormat.csv:
+        text = io.TextIOWrapper(stream, encoding=encoding, newline="")
+        return iter_csv_stream(text, **csv_options)
+    if format == DataFileFormat.json:
+        # read1 returns what is available, without waiting for a full read.
+        return iter_json_array(iter(partial(stream.read1, READ_SIZE), b""))
+    return iter_jsonlines_stream(stream)
+
+
+class FileResult:
+    """The outcome of the push of a single file."""
+
+    def __init__(
+        self,
+        file: Path,
+        summary: PushSummary = None,
+        error: Exception = None,
+        resumed_rows: int = 0,
+    ):
+        self.file = file
+        self.summary = summary
+        self.error = error
+        self.resumed_rows = resumed_rows
+
+    def __repr__(self):
+        return f"FileResult<{self.file}: {self.summary or self.error}>"
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class IngestSummary:
+    """Aggregated statistics of the push of many files."""
+
+    def __init__(self):
+        self.results: List[FileResult] = []
+        self._started = time.monotonic()
+        self._finished = None
+
+    def __repr__(self):
+        return f"IngestSummary<{self.rows} rows from {self.files} files>"
+
+    def add(self, result: FileResult):
+        self.results.append(result)
+
+    def finish(self):
+        self._finished = time.monotonic()
+
+    @property
+    def files(self) -> int:
+        return len(self.results)
+
+    @property
+    def failed(self) -> List[FileResult]:
+        return [result for result in self.results if not result.ok]
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+    def _total(self, name: str) -> int:
+        return sum(
+            getattr(result.summary, name)
+            for result in self.results
+            if result.summary is not None
+        )
+
+    @property
+    def rows(self) -> int:
+        return self._total("rows")
+
+    @property
+    def bytes(self) -> int:
+        return self._total("bytes")
+
+    @property
+    def chunks(self) -> int:
+        return self._total("chunks")
+
+    @property
+    def elapsed(self) -> float:
+        return (self._finished or time.monotonic()) - self._started
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+
+def push_files(
+    bucket,
+    files: List[Path],
+    format: Optional[DataFileFormat] = None,
+    file_workers: int = 1,
+    resume: bool = False,
+    on_file: Callable[[FileResult], None] = None,
+    batch_size: int = None,
+    max_batch_bytes: int = None,
+    concurrency: int = 1,
+    retries: int = DEFAULT_RETRIES,
+    on_progress: Callable = None,
+    workers: int = 1,
+    **csv_options,
+) -> IngestSummary:
+    """Push many files into a bucket, `file_workers` files at a time.
+
+    All the files share the client of the bucket, and so its connection
+    pool. A file that fails doesn't stop the others, its error is in
+    its FileResult.
+
+    Args:
+        bucket: the Bucket the files are pushed into.
+        files: the paths of the files, see find_data_files.
+        format: the format of all the files, detected per file by default.
+        file_workers: the number of files pushed at the same time.
+        resume: skip the chunks acknowledged by a failed push of a file.
+        on_file: called with the FileResult of every file, once done.
+        workers: the processes decoding a JSON-lines file.
+        See Bucket.push_data and iter_csv for the other arguments.
+    """
+
+    def push_file(file: Path) -> FileResult:
+        try:
+            rows = read_data_file(file, format, workers, **csv_options)
+            journal = PushJournal.open(
+                bucket.uuid, file, batch_size, max_batch_bytes, resume=resume
+            )
+            resumed_rows = journal.rows
+            summary = bucket.push_data(
+                rows=rows,
+                on_progress=on_progress,
+                concurrency=concurrency,
+                retries=retries,
+                journal=journal,
+            )
+        except Exception as error:
+            return FileResult(file, getattr(error, "summary", None), error)
+        return FileResult(file, summary, resumed_rows=resumed_rows)
+
+    ingest = IngestSummary()
+    with ThreadPoolExecutor(max_workers=max(1, file_workers)) as executor:
+        futures = [executor.submit(push_file, file) for file in files]
+        for future in as_completed(futures):
+            result = future.result()
+            ingest.add(result)
+            if on_file:
+                on_file(result)
+    ingest.finish()
+    return ingest
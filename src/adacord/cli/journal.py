@@ -0,0 +1,166 @@
+import os
+import json
+import uuid
+import hashlib
+import itertools
+import threading
+from typing import Any, Dict, Iterable, Iterator, Optional
+from pathlib import Path
+
+from .commons import CONFIG_FOLDER_PATH
+from .uploads import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_MAX_BATCH_BYTES,
+    Chunk,
+    iter_chunks,
+)
+
+JOURNAL_PATH = CONFIG_FOLDER_PATH / "journal"
+
+
+def file_identity(file: Path) -> Dict[str, Any]:
+    """What tells a file apart from an edited copy of itself."""
+    stat = os.stat(file)
+    return {
+        "path": str(Path(file).resolve()),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+    }
+
+
+class PushJournal:
+    """The progress of the push of a file, saved in ~/.adacord/journal.
+
+    It records the identity of the file, how the rows are split in chunks
+    and which chunks the server acknowledged: `rows` and `chunks` count
+    the acknowledged chunks at the start of the file, `acked` maps the
+    index of the ones acknowledged after a gap (with concurrency, chunks
+    complete out of order) to their row count.
+
+    A resumed push skips the first `rows` rows without encoding them,
+    then sends the chunks that are not acknowledged, with the same
+    idempotency keys as the first attempt. The journal is deleted once
+    the push is done.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        bucket: str,
+        file: Dict[str, Any],
+        batch_size: Optional[int],
+        max_batch_bytes: Optional[int],
+        push_id: str = None,
+        rows: int = 0,
+        chunks: int = 0,
+        acked: Dict[str, int] = None,
+        **kwargs,
+    ):
+        self.path = Path(path)
+        self.bucket = bucket
+        self.file = file
+        self.batch_size = batch_size
+        self.max_batch_bytes = max_batch_bytes
+        self.push_id = push_id or uuid.uuid4().hex
+        self.rows = rows
+        self.chunks = chunks
+        # JSON keys are strings.
+        self.acked = {
+            int(index): rows for index, rows in (acked or {}).items()
+        }
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"PushJournal<{self.file['path']}: {self.chunks} chunks>"
+
+    @staticmethod
+    def path_for(bucket: str, file: Path, base_path: Path = None) -> Path:
+        key = f"{bucket}\n{Path(file).resolve()}".encode("utf-8")
+        name = hashlib.sha256(key).hexdigest() + ".json"
+        return Path(base_path or JOURNAL_PATH) / name
+
+    @classmethod
+    def open(
+        cls,
+        bucket: str,
+        file: Path,
+        batch_size: int = None,
+        max_batch_bytes: int = None,
+        resume: bool = True,
+        base_path: Path = None,
+    ) -> "PushJournal":
+        """Return the journal of the push of `file` into `bucket`.
+
+        With `resume`, the journal of a previous push of the same file is
+        reused, along with its chunk sizes. A file that changed since
+        then is pushed from the start.
+        """
+        path = cls.path_for(bucket, file, base_path)
+        identity = file_identity(file)
+        if resume:
+            journal = cls.load(path)
+            if journal is not None and journal.file == identity:
+                return journal
+        if batch_size is None and max_batch_bytes is None:
+            batch_size = DEFAULT_BATCH_SIZE
+            max_batch_bytes = DEFAULT_MAX_BATCH_BYTES
+        return cls(path, bucket, identity, batch_size, max_batch_bytes)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["PushJournal"]:
+        try:
+            with open(path) as f:
+                return cls(path, **json.load(f))
+        except (FileNotFoundError, ValueError):
+            return None
+
+    @property
+    def resumed(self) -> bool:
+        return self.chunks > 0 or bool(self.acked)
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        state = {
+            "bucket": self.bucket,
+            "file": self.file,
+            "batch_size": self.batch_size,
+            "max_batch_bytes": self.max_batch_bytes,
+            "push_id": self.push_id,
+            "rows": self.rows,
+            "chunks": self.chunks,
+            "acked": self.acked,
+        }
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+
+    def delete(self):
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def ack(self, chunk: Chunk):
+        """Record an acknowledged chunk and save the journal."""
+        with self._lock:
+            self.acked[chunk.index] = chunk.rows
+            while self.chunks in self.acked:
+                self.rows += self.acked.pop(self.chunks)
+                self.chunks += 1
+            self.save()
+
+    def pending(self, rows: Iterable[Dict[str, Any]]) -> Iterator[Chunk]:
+        """Split the rows in chunks, like the first attempt did, and
+        yield the ones that are not acknowledged yet."""
+        rows = itertools.islice(rows, self.rows, None)
+        chunks = iter_chunks(
+            rows,
+            self.batch_size,
+            self.max_batch_bytes,
+            start=self.chunks,
+            key_prefix=self.push_id,
+        )
+        for chunk in chunks:
+            if chunk.index not in self.acked:
+                yield chunk
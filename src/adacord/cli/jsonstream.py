@@ -0,0 +1,128 @@
+import json
+import codecs
+from typing import Any, List, Union, Iterable, Iterator
+
+WHITESPACE = " \t\n\r"
+READ_SIZE = 64 * 1024
+# The longest token the end of a chunk can cut, a \uXXXX\uXXXX pair: an
+# error further from the end of the text isn't fixed by reading more.
+MAX_TOKEN = 12
+# The characters after which a number can go on, as in "1." or "1e-".
+NUMBER_TAIL = ".eE+-"
+
+_decoder = json.JSONDecoder()
+
+
+class _Buffer:
+    """Text decoded from a stream of bytes (or str) chunks, on demand."""
+
+    def __init__(self, chunks: Iterable[Union[bytes, str]]):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Read more text, return False at the end of the stream."""
+        if self.eof:
+            return False
+        # Drop what has been parsed, so the buffer stays small.
+        parsed, self.pos = self.pos, 0
+        self.text = self.text[parsed:]
+        for chunk in self._chunks:
+            if isinstance(chunk, bytes):
+                chunk = self._decoder.decode(chunk)
+            if chunk:
+                self.text += chunk
+                return True
+        self.text += self._decoder.decode(b"", final=True)
+        self.eof = True
+        return False
+
+    def peek(self) -> str:
+        """Return the next non whitespace character, "" at the end."""
+        while True:
+            while (
+                self.pos < len(self.text) and self.text[self.pos] in WHITESPACE
+            ):
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return ""
+
+    def is_truncated(self, error: json.JSONDecodeError) -> bool:
+        """Whether the error may come from a value cut by the end of the
+        text, rather than from invalid JSON."""
+        if error.msg.startswith("Unterminated string"):
+            return True
+        return len(self.text) - error.pos <= MAX_TOKEN
+
+    def decode_value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError as error:
+                if self.is_truncated(error) and self.fill():
+                    continue
+                raise
+            # A number could continue in the next chunk.
+            rest = self.text[end:]
+            cut = len(rest) <= 2 and not rest.strip(NUMBER_TAIL)
+            if cut and not self.eof and self.fill():
+                continue
+            self.pos = end
+            return value
+
+    def error(self, message: str) -> json.JSONDecodeError:
+        return json.JSONDecodeError(message, self.text, self.pos)
+
+
+def iter_json_array(chunks: Iterable[Union[bytes, str]]) -> Iterator[Any]:
+    """Parse a JSON document incrementally, yielding the array elements.
+
+    Only one element at a time is kept in memory, plus the text buffer.
+    A top-level value that is not an array (e.g. a single object) is
+    yielded as is.
+
+    Args:
+        chunks: the document, in chunks of bytes (utf-8) or str.
+    """
+    buffer = _Buffer(chunks)
+    first = buffer.peek()
+    if not first:
+        return
+    if first != "[":
+        yield buffer.decode_value()
+        if buffer.peek():
+            raise buffer.error("Extra data")
+        return
+
+    buffer.pos += 1
+    if buffer.peek() == "]":
+        buffer.pos += 1
+    else:
+        while True:
+            yield buffer.decode_value()
+            separator = buffer.peek()
+            if separator not in (",", "]"):
+                raise buffer.error("Expecting ',' delimiter")
+            buffer.pos += 1
+            if separator == "]":
+                break
+    if buffer.peek():
+        raise buffer.error("Extra data")
+
+
+def iter_batches(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Group the items in lists of `size` items."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -1,12 +1,91 @@
+import importlib
+from typing import Dict, Tuple
+
 import typer
 
-from . import auth, bucket, api_tokens
+try:
+    # typer >= 0.4 builds its commands on its own group class.
+    from typer.core import TyperGroup as BaseGroup
+except ImportError:  # pragma: no cover
+    from click import Group as BaseGroup
+
+# The commands are imported only when they are run: name ->
+# (module, Typer app or command function, short help). The short help is
+# here so that `adacord --help` doesn't import them either.
+COMMANDS: Dict[str, Tuple[str, str, str]] = {
+    "user": ("adacord.cli.auth", "user", "User related stuff"),
+    "login": (
+        "adacord.cli.auth",
+        "login_with_email_or_token",
+        "Use the cli to log-in (with email/password or api/bucket token).",
+    ),
+    "logout": ("adacord.cli.auth", "logout", "To Logout. For real."),
+    "bucket": ("adacord.cli.bucket", "app", "Manage your buckets"),
+    "api_tokens": ("adacord.cli.api_tokens", "app", "Manage your API tokens"),
+    "spool": (
+        "adacord.cli.spool_commands",
+        "app",
+        "Manage the local spool of rows",
+    ),
+    "batch": (
+        "adacord.cli.batch_commands",
+        "run_batch_file",
+        "Run many bucket and token operations from a file",
+    ),
+    "daemon": (
+        "adacord.cli.daemon_commands",
+        "app",
+        "Keep the connections to the API open between commands",
+    ),
+}
+
+
+def load_command(name: str):
+    """Import a command and turn it into a click command."""
+
+    module_name, attribute, help = COMMANDS[name]
+    target = getattr(importlib.import_module(module_name), attribute)
+    # Shell completion is handled by the top level group.
+    app = typer.Typer(add_completion=False)
+    if isinstance(target, typer.Typer):
+        app.add_typer(target, name=name, help=help)
+    else:
+        app.command(name)(target)
+    return typer.main.get_group(app).commands[name]
+
+
+class LazyGroup(BaseGroup):
+    """A group importing its commands on demand."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._loaded = {}
+
+    def list_commands(self, ctx):
+        return list(COMMANDS)
+
+    def get_command(self, ctx, name: str):
+        if name not in COMMANDS:
+            return None
+        if name not in self._loaded:
+            self._loaded[name] = load_command(name)
+        return self._loaded[name]
+
+    def format_help(self, ctx, formatter):
+        # The plain click help: the rich one would import every command.
+        self.format_usage(ctx, formatter)
+        self.format_help_text(ctx, formatter)
+        self.format_options(ctx, formatter)
+        self.format_epilog(ctx, formatter)
+
+    def format_commands(self, ctx, formatter):
+        rows = [(name, help) for name, (_, _, help) in COMMANDS.items()]
+        with formatter.section("Commands"):
+            formatter.write_dl(rows)
+
 
-app = typer.Typer()
-app.add_typer(auth.user, name="user", help="User related stuff")
-# TODO: Maybe there's a better way instead
-# of calling the decorator in this way?
-app.command("login")(auth.login_with_email_or_token)
-app.command("logout")(auth.logout)
-app.add_typer(bucket.app, name="bucket", help="Manage your buckets")
-app.add_typer(api_tokens.app, name="api_tokens", help="Manage your API tokens")
+# --install-completion and --show-completion, as typer adds them.
+app = LazyGroup(
+    name="adacord",
+    params=list(typer.main.get_install_completion_arguments()),
+)
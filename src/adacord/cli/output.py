@@ -0,0 +1,160 @@
+import io
+import os
+import csv
+import sys
+import json
+import itertools
+from enum import Enum
+from typing import IO, Any, Dict, List, Iterable, Iterator, Sequence
+
+import typer
+from tabulate import tabulate
+
+from . import codec
+
+# The rows are written to stdout in blocks of this size.
+BUFFER_SIZE = 64 * 1024
+
+
+class OutputFormat(str, Enum):
+    table = "table"
+    json = "json"
+    jsonl = "jsonl"
+    csv = "csv"
+
+
+def output_option(default: OutputFormat = OutputFormat.table):
+    return typer.Option(
+        default,
+        "--output",
+        "-o",
+        help="The output format, jsonl and csv are streamed row by row.",
+        case_sensitive=False,
+    )
+
+
+class BufferedOutput:
+    """Gather small writes into blocks of `buffer_size` bytes."""
+
+    def __init__(self, stream: IO[bytes], buffer_size: int = BUFFER_SIZE):
+        self.stream = stream
+        self.buffer_size = buffer_size
+        self._parts: List[bytes] = []
+        self._size = 0
+
+    def write(self, data: bytes):
+        self._parts.append(data)
+        self._size += len(data)
+        if self._size >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self._parts:
+            self.stream.write(b"".join(self._parts))
+            self._parts, self._size = [], 0
+        self.stream.flush()
+
+
+def _iter_jsonl(rows: Iterable[Any]) -> Iterator[bytes]:
+    for row in rows:
+        yield codec.dumps(row) + b"\n"
+
+
+def _iter_json(rows: Iterable[Any]) -> Iterator[bytes]:
+    separator = b"[\n"
+    for row in rows:
+        yield separator + codec.dumps(row)
+        separator = b",\n"
+    yield b"[]\n" if separator == b"[\n" else b"\n]\n"
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+
+def _iter_csv(
+    rows: Iterable[Dict[str, Any]], columns: Sequence[str] = None
+) -> Iterator[bytes]:
+    rows = iter(rows)
+    if columns is None:
+        # The columns of the first row.
+        first = next(rows, None)
+        if first is None:
+            return
+        columns = list(first)
+        rows = itertools.chain([first], rows)
+
+    text = io.StringIO()
+    writer = csv.writer(text)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([_csv_value(row.get(column)) for column in columns])
+        yield text.getvalue().encode("utf-8")
+        text.seek(0)
+        text.truncate()
+    yield text.getvalue().encode("utf-8")
+
+
+def echo_table(
+    rows: Iterable[Dict[str, Any]],
+    columns: Sequence[str],
+    headers: Sequence[str] = None,
+):
+    """Print the rows as a table, with an index column."""
+    table = [
+        [index, *[row.get(column) for column in columns]]
+        for index, row in enumerate(rows, 1)
+    ]
+    first_row = ("", *(headers or columns))
+    typer.echo(
+        tabulate(
+            [first_row, *table], headers="firstrow", tablefmt="fancy_grid"
+        )
+    )
+
+
+def write_rows(
+    rows: Iterable[Dict[str, Any]],
+    output: OutputFormat,
+    columns: Sequence[str] = None,
+    headers: Sequence[str] = None,
+    stream: IO[bytes] = None,
+):
+    """Write the rows to stdout in the output format.
+
+    The table needs all the rows in memory to measure the columns, the
+    other formats are written row by row, in buffered blocks, so they can
+    be piped into other programs.
+
+    Args:
+        rows: the rows, as dicts.
+        output: the format.
+        columns: the columns of the table and CSV formats, the keys of
+            the first row by default.
+        headers: the headers of the table, the columns by default.
+        stream: a binary stream, stdout by default.
+    """
+    if output == OutputFormat.table:
+        rows = list(rows)
+        echo_table(rows, columns or list(rows[0] if rows else []), headers)
+        return
+
+    if output == OutputFormat.csv:
+        chunks = _iter_csv(rows, columns)
+    elif output == OutputFormat.json:
+        chunks = _iter_json(rows)
+    else:
+        chunks = _iter_jsonl(rows)
+
+    out = BufferedOutput(stream or sys.stdout.buffer)
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+        out.flush()
+    except BrokenPipeError:
+        # The reader is gone (e.g. `| head`), stop quietly: the stdout
+        # redirection avoids another error when Python flushes it at exit.
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
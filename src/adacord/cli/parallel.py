@@ -0,0 +1,122 @@
+import os
+import mmap
+import itertools
+from typing import Any, Dict, List, Tuple, Iterator
+from pathlib import Path
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    wait,
+)
+
+from . import codec
+from .commons import iter_jsonlines
+from .jsonstream import iter_batches
+from .compression import COMPRESSED_SUFFIXES
+
+DEFAULT_RANGE_BYTES = 16 * 1024 * 1024
+FALLBACK_BATCH_SIZE = 10000
+
+Range = Tuple[int, int]
+Rows = List[Dict[str, Any]]
+
+
+def split_ranges(
+    filepath: Path, range_bytes: int = DEFAULT_RANGE_BYTES
+) -> List[Range]:
+    """Split a file in (start, end) byte ranges of about `range_bytes`
+    bytes, each range ends right after a newline (or at the end of the
+    file), so no line is split between two ranges."""
+    size = os.path.getsize(filepath)
+    if size == 0:
+        return []
+    ranges = []
+    with open(filepath, "rb") as f, mmap.mmap(
+        f.fileno(), 0, access=mmap.ACCESS_READ
+    ) as data:
+        start = 0
+        while start < size:
+            newline = data.find(b"\n", min(start + range_bytes, size) - 1)
+            end = size if newline == -1 else newline + 1
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def decode_range(filepath: Path, start: int, end: int) -> Rows:
+    """Decode the JSON lines between the `start` and `end` offsets."""
+    with open(filepath, "rb") as f, mmap.mmap(
+        f.fileno(), 0, access=mmap.ACCESS_READ
+    ) as data:
+        rows = []
+        position = start
+        while position < end:
+            newline = data.find(b"\n", position, end)
+            line_end = end if newline == -1 else newline
+            line = data[position:line_end]
+            if line.strip():
+                rows.append(codec.loads(line))
+            position = line_end + 1
+        return rows
+
+
+def iter_jsonlines_batches(
+    filepath: Path,
+    workers: int = None,
+    range_bytes: int = DEFAULT_RANGE_BYTES,
+    ordered: bool = True,
+) -> Iterator[Rows]:
+    """Yield the rows of a JSON-lines file in batches, decoding the file
+    on `workers` processes.
+
+    The file is memory-mapped and split at newlines in ranges of about
+    `range_bytes` bytes, every range is decoded by a worker and becomes a
+    batch. Compressed files can't be memory-mapped, they are decoded on
+    the current process.
+
+    Args:
+        filepath: the path of the JSON-lines file.
+        workers: the number of processes, all the cores by default.
+        range_bytes: the size of the byte range decoded by a worker.
+        ordered: yield the batches in file order, otherwise as soon as
+            they are decoded.
+    """
+    workers = workers or os.cpu_count() or 1
+    filepath = Path(filepath)
+    if workers == 1 or filepath.suffix in COMPRESSED_SUFFIXES:
+        yield from iter_batches(iter_jsonlines(filepath), FALLBACK_BATCH_SIZE)
+        return
+
+    ranges = iter(split_ranges(filepath, range_bytes))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Keep a couple of ranges per worker in flight, so the decoded
+        # rows waiting for the uploader stay bounded.
+        pending = []
+        for start, end in itertools.islice(ranges, workers * 2):
+            pending.append(executor.submit(decode_range, filepath, start, end))
+        while pending:
+            if ordered:
+                done = [pending[0]]
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.remove(future)
+                for start, end in itertools.islice(ranges, 1):
+                    pending.append(
+                        executor.submit(decode_range, filepath, start, end)
+                    )
+                batch = future.result()
+                if batch:
+                    yield batch
+
+
+def iter_jsonlines_parallel(
+    filepath: Path, workers: int = None, ordered: bool = True, **options
+) -> Iterator[Dict[str, Any]]:
+    """Yield the rows of a JSON-lines file decoded on `workers` processes,
+    see iter_jsonlines_batches."""
+    batches = iter_jsonlines_batches(
+        filepath, workers=workers, ordered=ordered, **options
+    )
+    for batch in batches:
+        yield from batch
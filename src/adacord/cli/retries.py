@@ -0,0 +1,150 @@
+import time
+import random
+import threading
+from typing import Mapping, Optional
+from email.utils import parsedate_to_datetime
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# The server didn't process the request, so it's safe to send it again.
+NOT_PROCESSED_STATUSES = frozenset({429, 503})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Return the seconds to wait from a Retry-After header."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, date.timestamp() - time.time())
+
+
+class RetryBudget:
+    """Cap the retries to a fraction of the requests.
+
+    Every request adds `ratio` tokens, up to `capacity`, and every retry
+    costs one token: when the API is down for good the clients stop
+    hammering it instead of multiplying the load by the retries.
+    """
+
+    def __init__(self, ratio: float = 0.2, capacity: float = 10):
+        self.ratio = ratio
+        self.capacity = capacity
+        self._tokens = capacity
+        self._lock = threading.Lock()
+
+    def record_request(self):
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + self.ratio)
+
+    def acquire(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class RetryPolicy:
+    """When and how long to wait before retrying a request.
+
+    Args:
+        retries: the max number of retries of a request.
+        backoff_factor: the delay of the first retry, doubled each time.
+        max_backoff: the max delay between two attempts.
+        jitter: randomize the delays to avoid synchronized clients.
+        statuses: the response statuses worth a retry.
+        max_retry_after: give up if the server asks to wait longer.
+        budget: shared by all the requests of a client, None to disable.
+
+    Requests that may have been processed by the server are retried only
+    if they are idempotent: safe methods or requests carrying an
+    Idempotency-Key header.
+    """
+
+    def __init__(
+        self,
+        retries: int = 3,
+        backoff_factor: float = 0.5,
+        max_backoff: float = 30,
+        jitter: bool = True,
+        statuses: frozenset = RETRY_STATUSES,
+        max_retry_after: float = 120,
+        budget: Optional[RetryBudget] = None,
+    ):
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.statuses = statuses
+        self.max_retry_after = max_retry_after
+        self.budget = budget
+
+    @classmethod
+    def default(cls) -> "RetryPolicy":
+        return cls(budget=RetryBudget())
+
+    @classmethod
+    def disabled(cls) -> "RetryPolicy":
+        return cls(retries=0)
+
+    def is_idempotent(self, method: str, headers: Mapping[str, str]) -> bool:
+        if IDEMPOTENCY_KEY_HEADER in headers:
+            return True
+        return method.upper() in IDEMPOTENT_METHODS
+
+    def backoff(self, attempt: int) -> float:
+        delay = min(self.max_backoff, self.backoff_factor * 2**attempt)
+        return random.uniform(0, delay) if self.jitter else delay
+
+    def record_request(self):
+        if self.budget:
+            self.budget.record_request()
+
+    def retry_delay(
+        self,
+        method: str,
+        headers: Mapping[str, str],
+        attempt: int,
+        status_code: int = None,
+        retry_after: str = None,
+        maybe_processed: bool = True,
+    ) -> Optional[float]:
+        """Return the seconds to wait before the next attempt.
+        Args:
+            method: the HTTP method of the request.
+            headers: the headers of the request.
+            attempt: how many times the request has been retried.
+            status_code: the status of the response, if any.
+            retry_after: the Retry-After header of the response, if any.
+            maybe_processed: without a response, if the request could
+                have reached the server (e.g. not a connect error).
+
+        None means the request shouldn't be retried.
+        """
+        if attempt >= self.retries:
+            return None
+        if status_code is not None:
+            if status_code not in self.statuses:
+                return None
+            maybe_processed = status_code not in NOT_PROCESSED_STATUSES
+        if maybe_processed and not self.is_idempotent(method, headers):
+            return None
+
+        delay = self.backoff(attempt)
+        wait = parse_retry_after(retry_after)
+        if wait is not None:
+            if wait > self.max_retry_after:
+                return None
+            delay = max(delay, wait)
+
+        if self.budget and not self.budget.acquire():
+            return None
+        return delay
@@ -0,0 +1,267 @@
+import os
+import json
+import uuid
+import threading
+from typing import Any, Dict, List, Tuple, Callable, Iterable, Iterator
+from pathlib import Path
+
+from . import codec
+from .commons import CONFIG_FOLDER_PATH
+from .uploads import (
+    DEFAULT_RETRIES,
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_MAX_BATCH_BYTES,
+    Chunk,
+    PushSummary,
+    ChunkBuilder,
+    ChunkedUploader,
+    encode_row,
+)
+from .exceptions import PushError
+
+SPOOL_PATH = CONFIG_FOLDER_PATH / "spool"
+DEFAULT_SEGMENT_BYTES = 64 * 1024 * 1024
+DRAIN_INTERVAL = 5.0
+SEGMENT_SUFFIX = ".jsonl"
+CURSOR_FILE = "cursor.json"
+
+# (segment, offset) in the spool.
+Position = Tuple[int, int]
+
+
+class Spool:
+    """An append-only, on-disk queue of rows waiting to be pushed into a
+    bucket, in ~/.adacord/spool/<bucket>.
+
+    The rows are appended as JSON lines to numbered segment files, a new
+    segment is started once the current one is `segment_bytes` big. The
+    cursor file records the position of the first row not pushed yet,
+    the segments before it are deleted.
+
+    `drain` pushes the rows in order, in chunks, and moves the cursor
+    after every pushed chunk. Every chunk has an idempotency key made of
+    its start and end positions, so pushing it again after a crash
+    doesn't duplicate it.
+    """
+
+    def __init__(self, path: Path, segment_bytes: int = DEFAULT_SEGMENT_BYTES):
+        self.path = Path(path)
+        self.segment_bytes = segment_bytes
+        self._lock = threading.Lock()
+        self._drain_lock = threading.Lock()
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.id, self.cursor = self._read_cursor()
+
+    def __repr__(self):
+        return f"Spool<{self.path}>"
+
+    @classmethod
+    def for_bucket(
+        cls, bucket: str, base_path: Path = None, **options
+    ) -> "Spool":
+        return cls(Path(base_path or SPOOL_PATH) / bucket, **options)
+
+    @classmethod
+    def list(cls, base_path: Path = None) -> Dict[str, "Spool"]:
+        """Return the spools on disk, by bucket."""
+        base_path = Path(base_path or SPOOL_PATH)
+        if not base_path.is_dir():
+            return {}
+        return {
+            path.name: cls(path)
+            for path in sorted(base_path.iterdir())
+            if path.is_dir()
+        }
+
+    def _read_cursor(self) -> Tuple[str, Position]:
+        try:
+            with open(self.path / CURSOR_FILE) as f:
+                state = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return uuid.uuid4().hex, (0, 0)
+        return state["id"], (state["segment"], state["offset"])
+
+    def _save_cursor(self, cursor: Position):
+        self.cursor = cursor
+        path = self.path / CURSOR_FILE
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {"id": self.id, "segment": cursor[0], "offset": cursor[1]}, f
+            )
+        os.replace(tmp_path, path)
+
+    def segments(self) -> List[int]:
+        return sorted(
+            int(path.stem)
+            for path in self.path.glob(f"*{SEGMENT_SUFFIX}")
+            if path.stem.isdigit()
+        )
+
+    def segment_path(self, segment: int) -> Path:
+        return self.path / f"{segment:020d}{SEGMENT_SUFFIX}"
+
+    def append(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """Append the rows, return their number."""
+        lines = [encode_row(row) + b"\n" for row in rows]
+        if not lines:
+            return 0
+        with self._lock:
+            segments = self.segments()
+            segment = segments[-1] if segments else max(1, self.cursor[0])
+            path = self.segment_path(segment)
+            if path.exists() and path.stat().st_size >= self.segment_bytes:
+                path = self.segment_path(segment + 1)
+            with open(path, "ab") as f:
+                f.write(b"".join(lines))
+        return len(lines)
+
+    def append_chunk(self, chunk: Chunk) -> int:
+        """Append the rows of a chunk that could not be pushed."""
+        return self.append(codec.loads(chunk.payload)["data"])
+
+    def pending_bytes(self) -> int:
+        segment, offset = self.cursor
+        pending = 0
+        for number in self.segments():
+            if number >= segment:
+                pending += self.segment_path(number).stat().st_size
+            if number == segment:
+                pending -= offset
+        return max(0, pending)
+
+    def status(self) -> Dict[str, Any]:
+        segments = self.segments()
+        return {
+            "path": str(self.path),
+            "segments": len(segments),
+            "pending_bytes": self.pending_bytes(),
+            "cursor": list(self.cursor),
+        }
+
+    def _iter_records(self) -> Iterator[Tuple[int, int, int, bytes]]:
+        """Yield (segment, start, end, line) from the cursor, only the
+        complete lines: the last one could be still being written."""
+        cursor_segment, cursor_offset = self.cursor
+        for segment in self.segments():
+            if segment < cursor_segment:
+                continue
+            offset = cursor_offset if segment == cursor_segment else 0
+            with open(self.segment_path(segment), "rb") as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        return
+                    yield segment, offset, offset + len(line), line[:-1]
+                    offset += len(line)
+
+    def _remove_drained_segments(self):
+        segments = self.segments()
+        # The last segment could still be appended to.
+        for segment in segments[:-1]:
+            if segment < self.cursor[0]:
+                self.segment_path(segment).unlink()
+
+    def drain(
+        self,
+        send: Callable[[Chunk], Any],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_batch_bytes: int = DEFAULT_MAX_BATCH_BYTES,
+        retries: int = DEFAULT_RETRIES,
+        on_progress: Callable[[Chunk, PushSummary], None] = None,
+    ) -> PushSummary:
+        """Push the spooled rows in order, in chunks, until the spool is
+        empty. PushError is raised if a chunk can't be pushed, the cursor
+        stays before it."""
+        with self._drain_lock:
+            return self._drain(
+                send, batch_size, max_batch_bytes, retries, on_progress
+            )
+
+    def _push(
+        self,
+        uploader: ChunkedUploader,
+        summary: PushSummary,
+        chunk: Chunk,
+        start: Position,
+        end: Position,
+    ):
+        # The end too: more rows could be appended to the last chunk
+        # before it is pushed again.
+        chunk.key = f"{self.id}-{start[0]}-{start[1]}-{end[0]}-{end[1]}"
+        try:
+            uploader.send_chunk(chunk, summary)
+        except Exception as error:
+            summary.add_failure(chunk, error)
+            summary.finish()
+            raise PushError(summary, error) from error
+        summary.add(chunk)
+        self._save_cursor(end)
+        self._remove_drained_segments()
+        if uploader.on_progress:
+            uploader.on_progress(chunk, summary)
+
+    def _drain(self, send, batch_size, max_batch_bytes, retries, on_progress):
+        uploader = ChunkedUploader(send, on_progress, retries=retries)
+        summary = PushSummary()
+        builder = ChunkBuilder(batch_size, max_batch_bytes)
+        start = end = self.cursor
+        for segment, offset, line_end, line in self._iter_records():
+            if line.strip():
+                chunk = builder.add_encoded(line)
+                if chunk is not None:
+                    self._push(uploader, summary, chunk, start, end)
+                    start = (segment, offset)
+            if not len(builder):
+                start = (segment, line_end)
+            end = (segment, line_end)
+
+        chunk = builder.flush()
+        if chunk is not None:
+            self._push(uploader, summary, chunk, start, end)
+        elif end != self.cursor:
+            self._save_cursor(end)
+        summary.finish()
+        return summary
+
+
+class SpoolDrainer:
+    """Drain a spool from a background thread, every `interval` seconds,
+    until stopped. A failed drain is tried again at the next interval."""
+
+    def __init__(
+        self,
+        spool: Spool,
+        send: Callable[[Chunk], Any],
+        interval: float = DRAIN_INTERVAL,
+        **options,
+    ):
+        self.spool = spool
+        self.send = send
+        self.interval = interval
+        self.options = options
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="adacord-spool-drainer"
+        )
+        self._thread.daemon = True
+
+    def start(self) -> "SpoolDrainer":
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = None):
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if not self.spool.pending_bytes():
+                continue
+            try:
+                self.spool.drain(self.send, **self.options)
+            except Exception as error:
+                self.last_error = error
+            else:
+                self.last_error = None
@@ -0,0 +1,77 @@
+import typer
+from tabulate import tabulate
+
+from .api import create_api
+from .spool import Spool
+from .uploads import DEFAULT_RETRIES, DEFAULT_BATCH_SIZE
+from .exceptions import cli_wrapper
+
+app = typer.Typer()
+
+
+@app.command("status")
+@cli_wrapper
+def spool_status():
+    """
+    Show the rows waiting in the local spool, per bucket.
+    """
+    spools = Spool.list()
+    if not spools:
+        typer.echo(
+            typer.style(
+                "The spool is empty.", fg=typer.colors.WHITE, bold=True
+            )
+        )
+        return
+
+    rows = []
+    for bucket, spool in spools.items():
+        status = spool.status()
+        rows.append(
+            [bucket, status["segments"], status["pending_bytes"], spool.path]
+        )
+    first_row = ("Bucket", "Segments", "Pending bytes", "Path")
+    typer.echo(
+        tabulate([first_row, *rows], headers="firstrow", tablefmt="fancy_grid")
+    )
+
+
+@app.command("drain")
+@cli_wrapper
+def drain_spool(
+    bucket: str = typer.Argument(
+        None, help="The bucket uuid, all the buckets by default."
+    ),
+    batch_size: int = typer.Option(
+        DEFAULT_BATCH_SIZE,
+        min=1,
+        help="The max number of rows sent in a single request.",
+    ),
+    retries: int = typer.Option(
+        DEFAULT_RETRIES,
+        min=0,
+        help="How many times a failed chunk is retried.",
+    ),
+):
+    """
+    Push the rows waiting in the local spool, in order.
+    """
+    spools = Spool.list()
+    if bucket is not None:
+        spools = {bucket: spools[bucket]} if bucket in spools else {}
+    api = create_api()
+    for uuid, spool in spools.items():
+        summary = spool.drain(
+            lambda chunk: api.Buckets.push_chunk(uuid, chunk),
+            batch_size=batch_size,
+            retries=retries,
+        )
+        typer.echo(
+            f"Bucket {uuid}: {summary.rows} rows pushed "
+            f"in {summary.chunks} chunks ({summary.elapsed:.1f}s)."
+        )
+    typer.echo(
+        typer.style(
+            "The spool is drained 🚀.", fg=typer.colors.WHITE, bold=True
+        )
+    )
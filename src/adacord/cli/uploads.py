@@ -0,0 +1,381 @@
+import time
+import threading
+from queue import Empty, Queue
+from typing import (
+    Any,
+    Set,
+    Dict,
+    List,
+    Tuple,
+    Callable,
+    Iterable,
+    Iterator,
+    Optional,
+)
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
+
+from . import codec
+from .retries import IDEMPOTENCY_KEY_HEADER, RetryBudget
+from .exceptions import PushError, AdacordApiError
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_MAX_BATCH_BYTES = 4 * 1024 * 1024
+DEFAULT_RETRIES = 3
+RETRY_BACKOFF = 0.5
+
+PAYLOAD_PREFIX = b'{"data":['
+PAYLOAD_SUFFIX = b"]}"
+
+
+def encode_row(row: Dict[str, Any]) -> bytes:
+    return codec.dumps(row)
+
+
+class Chunk:
+    """A batch of rows, already serialized as a `{"data": [...]}` payload.
+
+    The key, when set, is sent as the Idempotency-Key header, so the
+    server ignores the chunk if it already got it.
+    """
+
+    def __init__(self, index: int, payload: bytes, rows: int, key: str = None):
+        self.index = index
+        self.payload = payload
+        self.rows = rows
+        self.key = key
+
+    def __repr__(self):
+        return f"Chunk<{self.index}: {self.rows} rows, {self.size} bytes>"
+
+    @property
+    def size(self) -> int:
+        return len(self.payload)
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        headers = {"Content-Type": "application/json"}
+        if self.key:
+            headers[IDEMPOTENCY_KEY_HEADER] = self.key
+        return headers
+
+    @classmethod
+    def from_encoded_rows(
+        cls, index: int, rows: List[bytes], key_prefix: str = None
+    ) -> "Chunk":
+        payload = b"".join((PAYLOAD_PREFIX, b",".join(rows), PAYLOAD_SUFFIX))
+        key = f"{key_prefix}-{index}" if key_prefix else None
+        return cls(index, payload, len(rows), key=key)
+
+
+class ChunkBuilder:
+    """Accumulate encoded rows into chunks bounded by row count and
+    payload size, numbering them from `start`."""
+
+    def __init__(
+        self,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_batch_bytes: int = DEFAULT_MAX_BATCH_BYTES,
+        start: int = 0,
+        key_prefix: str = None,
+    ):
+        self.batch_size = batch_size
+        self.max_batch_bytes = max_batch_bytes
+        self.index = start
+        self.key_prefix = key_prefix
+        self._empty_size = len(PAYLOAD_PREFIX) + len(PAYLOAD_SUFFIX)
+        self._encoded: List[bytes] = []
+        self._size = self._empty_size
+
+    def __len__(self) -> int:
+        return len(self._encoded)
+
+    def add(self, row: Dict[str, Any]) -> Optional[Chunk]:
+        """Add a row, return the previous rows as a chunk if the row
+        doesn't fit in it."""
+        return self.add_encoded(encode_row(row))
+
+    def add_encoded(self, item: bytes) -> Optional[Chunk]:
+        """Like add, for a row already encoded as JSON."""
+        chunk = None
+        batch_size, max_batch_bytes = self.batch_size, self.max_batch_bytes
+        if self._encoded:
+            new_size = self._size + len(item) + 1
+            full = batch_size is not None and len(self._encoded) >= batch_size
+            too_big = (
+                max_batch_bytes is not None and new_size > max_batch_bytes
+            )
+            if full or too_big:
+                chunk = self.flush()
+        self._size += len(item) + (1 if self._encoded else 0)
+        self._encoded.append(item)
+        return chunk
+
+    def flush(self) -> Optional[Chunk]:
+        """Return the rows added so far as a chunk, None if empty."""
+        if not self._encoded:
+            return None
+        chunk = Chunk.from_encoded_rows(
+            self.index, self._encoded, self.key_prefix
+        )
+        self.index += 1
+        self._encoded = []
+        self._size = self._empty_size
+        return chunk
+
+
+def iter_chunks(
+    rows: Iterable[Dict[str, Any]],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_batch_bytes: int = DEFAULT_MAX_BATCH_BYTES,
+    start: int = 0,
+    key_prefix: str = None,
+) -> Iterator[Chunk]:
+    """Group the rows into chunks bounded by row count and payload size.
+
+    Every row is serialized exactly once, so only the chunk being built
+    is kept in memory. A row bigger than `max_batch_bytes` is sent alone.
+
+    The chunks are numbered from `start`. With a `key_prefix`, every
+    chunk gets the `<key_prefix>-<index>` idempotency key.
+    """
+    builder = ChunkBuilder(batch_size, max_batch_bytes, start, key_prefix)
+    for row in rows:
+        chunk = builder.add(row)
+        if chunk is not None:
+            yield chunk
+    chunk = builder.flush()
+    if chunk is not None:
+        yield chunk
+
+
+class _EndOfRows:
+    def __init__(self, error: Exception = None):
+        self.error = error
+
+
+def _read_rows(rows: Iterable[Dict[str, Any]], queue: Queue):
+    try:
+        for row in rows:
+            queue.put(row)
+    except Exception as error:
+        queue.put(_EndOfRows(error))
+    else:
+        queue.put(_EndOfRows())
+
+
+def iter_lingering_chunks(
+    rows: Iterable[Dict[str, Any]],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_batch_bytes: int = DEFAULT_MAX_BATCH_BYTES,
+    linger: float = 1.0,
+    key_prefix: str = None,
+) -> Iterator[Chunk]:
+    """Like iter_chunks, for endless streams (e.g. stdin): a chunk is also
+    sent once its first row has waited `linger` seconds, so slow streams
+    are pushed with low latency.
+
+    The rows are read on a background thread, through a bounded queue,
+    since reading a stream blocks until the next row comes.
+    """
+    queue: Queue = Queue(maxsize=batch_size or DEFAULT_BATCH_SIZE)
+    reader = threading.Thread(target=_read_rows, args=(rows, queue))
+    reader.daemon = True
+    reader.start()
+
+    builder = ChunkBuilder(batch_size, max_batch_bytes, key_prefix=key_prefix)
+    deadline = None
+    while True:
+        timeout = None
+        if deadline is not None:
+            timeout = max(0.0, deadline - time.monotonic())
+        try:
+            item = queue.get(timeout=timeout)
+        except Empty:
+            yield builder.flush()
+            deadline = None
+            continue
+
+        if isinstance(item, _EndOfRows):
+            chunk = builder.flush()
+            if chunk is not None:
+                yield chunk
+            if item.error is not None:
+                raise item.error
+            return
+
+        chunk = builder.add(item)
+        if chunk is not None:
+            yield chunk
+            deadline = None
+        if deadline is None:
+            deadline = time.monotonic() + linger
+
+
+def is_retryable(error: Exception) -> bool:
+    """Client errors will fail again, anything else is worth a retry."""
+    if isinstance(error, AdacordApiError):
+        status_code = error.status_code or 0
+        return status_code == 429 or status_code >= 500
+    return True
+
+
+def should_retry(
+    error: Exception, attempt: int, retries: int, budget: RetryBudget = None
+) -> bool:
+    """Whether to send a chunk again after `attempt` retries, the budget
+    pays for the retry."""
+    if attempt >= retries or not is_retryable(error):
+        return False
+    return budget is None or budget.acquire()
+
+
+class PushSummary:
+    """Aggregated statistics of a chunked push."""
+
+    def __init__(self):
+        self.chunks = 0
+        self.rows = 0
+        self.bytes = 0
+        self.retries = 0
+        self.failed: List[Tuple[Chunk, Exception]] = []
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._finished = None
+
+    def __repr__(self):
+        return f"PushSummary<{self.rows} rows in {self.chunks} chunks>"
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+    def add(self, chunk: Chunk):
+        self.chunks += 1
+        self.rows += chunk.rows
+        self.bytes += chunk.size
+
+    def add_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def add_failure(self, chunk: Chunk, error: Exception):
+        self.failed.append((chunk, error))
+
+    def finish(self):
+        self._finished = time.monotonic()
+
+    @property
+    def elapsed(self) -> float:
+        return (self._finished or time.monotonic()) - self._started
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "chunks": self.chunks,
+            "rows": self.rows,
+            "bytes": self.bytes,
+            "retries": self.retries,
+            "failed_chunks": [chunk.index for chunk, _ in self.failed],
+            "elapsed": self.elapsed,
+        }
+
+
+class ChunkedUploader:
+    """Send chunks with a bounded pool of workers, reporting the progress.
+
+    At most `concurrency` chunks are in flight, the next chunk is read
+    only when one of them is done, so memory usage stays bounded.
+    A failed chunk is retried on its own, up to `retries` times and as
+    long as the budget allows it: the uploader is the only one retrying
+    the chunks, `send` should make a single attempt. If a chunk still
+    fails, no new chunks are sent and PushError is raised once the in
+    flight ones are done: its summary holds the failed chunks.
+
+    Args:
+        send: the function that uploads a single chunk.
+        on_progress: called with the chunk and the summary so far after
+            every acknowledged chunk.
+        concurrency: the number of chunks uploaded at the same time.
+        retries: how many times a failed chunk is sent again.
+        backoff: the seconds to wait before the first retry, doubled
+            at every attempt.
+        budget: caps the retries to a fraction of the chunks, usually
+            the budget of the client's RetryPolicy.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[Chunk], Any],
+        on_progress: Callable[[Chunk, PushSummary], None] = None,
+        concurrency: int = 1,
+        retries: int = DEFAULT_RETRIES,
+        backoff: float = RETRY_BACKOFF,
+        budget: RetryBudget = None,
+    ):
+        self.send = send
+        self.on_progress = on_progress
+        self.concurrency = max(1, concurrency)
+        self.retries = retries
+        self.backoff = backoff
+        self.budget = budget
+
+    def send_chunk(self, chunk: Chunk, summary: PushSummary) -> Any:
+        """Send a single chunk, retrying it, for the callers that build
+        the chunks one at a time (e.g. the BucketWriter). The retries are
+        counted in the summary, adding the chunk is up to the caller."""
+        if self.budget:
+            self.budget.record_request()
+        attempt = 0
+        while True:
+            try:
+                return self.send(chunk)
+            except Exception as error:
+                if not should_retry(error, attempt, self.retries, self.budget):
+                    raise
+                time.sleep(self.backoff * 2**attempt)
+                summary.add_retry()
+                attempt += 1
+
+    def _collect(
+        self,
+        done: Set[Future],
+        in_flight: Dict[Future, Chunk],
+        summary: PushSummary,
+    ):
+        for future in done:
+            chunk = in_flight.pop(future)
+            error = future.exception()
+            if error is not None:
+                summary.add_failure(chunk, error)
+                continue
+            summary.add(chunk)
+            if self.on_progress:
+                self.on_progress(chunk, summary)
+
+    def push(self, chunks: Iterable[Chunk]) -> PushSummary:
+        summary = PushSummary()
+        in_flight: Dict[Future, Chunk] = {}
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for chunk in chunks:
+                if len(in_flight) >= self.concurrency:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    self._collect(done, in_flight, summary)
+                if not summary.ok:
+                    break
+                future = executor.submit(self.send_chunk, chunk, summary)
+                in_flight[future] = chunk
+            done, _ = wait(in_flight)
+            self._collect(done, in_flight, summary)
+
+        summary.finish()
+        if not summary.ok:
+            raise PushError(summary, summary.failed[-1][1])
+        return summary
@@ -0,0 +1,266 @@
+import time
+import uuid
+import threading
+from queue import Full, Empty, Queue
+from typing import Any, Dict, Callable, Optional
+
+from .spool import DRAIN_INTERVAL, Spool
+from .uploads import (
+    DEFAULT_RETRIES,
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_MAX_BATCH_BYTES,
+    Chunk,
+    PushSummary,
+    ChunkBuilder,
+    ChunkedUploader,
+    is_retryable,
+)
+
+DEFAULT_LINGER = 0.5
+DEFAULT_MAX_QUEUED_ROWS = 100000
+
+
+class _Flush:
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class _Close(_Flush):
+    pass
+
+
+class BucketWriter:
+    """Buffer rows written one at a time and push them in chunks from a
+    background thread.
+
+    `write` only puts the row in a queue, the rows are encoded and sent
+    by the background thread. A chunk is sent once it has `batch_size`
+    rows or `max_batch_bytes` bytes, or once its first row has waited
+    `linger` seconds. When `max_queued_rows` rows are waiting, `write`
+    blocks until there is room again, so a producer faster than the
+    network slows down instead of using all the memory.
+
+    A chunk that can't be pushed after `retries` attempts makes the
+    writer fail: the error is raised by the next `write`, `flush` or
+    `close`.
+
+    With a `spool`, the writer doesn't block nor fail when the API is
+    slow or down: the rows that don't fit in the queue, and the chunks
+    that still fail with a server or network error after their retries,
+    are appended to the spool on disk. Until the spool is empty again
+    the new rows are appended after them, and the background thread
+    drains it every `drain_interval` seconds once the rows queued before
+    are pushed: the rows are pushed in the order they were written.
+
+        with bucket.writer(linger=1) as writer:
+            for event in events:
+                writer.write(event)
+
+    Args:
+        send: the function that pushes a single chunk.
+        batch_size: the max number of rows sent in a single request.
+        max_batch_bytes: the max size in bytes of a single request.
+        linger: the max seconds a row waits before being sent.
+        max_queued_rows: the max number of rows waiting to be sent.
+        retries: how many times a failed chunk is sent again.
+        on_progress: called with the chunk and the summary so far after
+            every pushed chunk, from the background thread.
+        spool: the Spool the rows are spilled to.
+        drain_interval: the seconds between two drains of the spool.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[Chunk], Any],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_batch_bytes: int = DEFAULT_MAX_BATCH_BYTES,
+        linger: float = DEFAULT_LINGER,
+        max_queued_rows: int = DEFAULT_MAX_QUEUED_ROWS,
+        retries: int = DEFAULT_RETRIES,
+        on_progress: Callable[[Chunk, PushSummary], None] = None,
+        spool: Spool = None,
+        drain_interval: float = DRAIN_INTERVAL,
+    ):
+        self.linger = linger
+        self.spool = spool
+        # The rows appended to the spool.
+        self.spooled = 0
+        self.summary = PushSummary()
+        self.drain_interval = drain_interval
+        self._drain_options = {
+            "batch_size": batch_size,
+            "max_batch_bytes": max_batch_bytes,
+            "retries": retries,
+        }
+        # Whether the new rows go to the spool, behind the ones in it.
+        self._spilling = spool is not None and spool.pending_bytes() > 0
+        self._spill_lock = threading.Lock()
+        self._uploader = ChunkedUploader(send, retries=retries)
+        self._on_progress = on_progress
+        self._builder = ChunkBuilder(
+            batch_size, max_batch_bytes, key_prefix=uuid.uuid4().hex
+        )
+        self._queue: Queue = Queue(maxsize=max_queued_rows)
+        self._error: Optional[Exception] = None
+        self._closed = False
+        self._closing = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="adacord-bucket-writer"
+        )
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __repr__(self):
+        return (
+            f"BucketWriter<{self.summary.rows} rows pushed, "
+            f"{self.spooled} spooled>"
+        )
+
+    def __enter__(self) -> "BucketWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _check(self):
+        if self._error is not None:
+            raise self._error
+        if self._closed:
+            raise ValueError("The writer is closed.")
+
+    def write(self, row: Dict[str, Any], timeout: float = None):
+        """Queue a row, waiting up to `timeout` seconds (forever by
+        default) if the queue is full. queue.Full is raised when the
+        timeout expires."""
+        self._check()
+        if self.spool is None:
+            self._queue.put(row, timeout=timeout)
+            return
+        with self._spill_lock:
+            if not self._spilling:
+                try:
+                    self._queue.put_nowait(row)
+                    return
+                except Full:
+                    self._spilling = True
+            self.spooled += self.spool.append([row])
+
+    def flush(self, timeout: float = None):
+        """Send the rows written so far and wait until they are pushed."""
+        self._check()
+        self._wait(_Flush(), timeout)
+        self._check()
+
+    def close(self, timeout: float = None):
+        """Send the rows written so far and stop the background thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._closing.set()
+        self._wait(_Close(), timeout)
+        self._thread.join(timeout)
+        if self._error is not None:
+            raise self._error
+
+    def _wait(self, marker: _Flush, timeout: float = None):
+        self._queue.put(marker, timeout=timeout)
+        if not marker.done.wait(timeout):
+            raise Full("The rows could not be pushed in time.")
+
+    def _send(self, chunk: Optional[Chunk]):
+        if chunk is None or self._error is not None:
+            return
+        while True:
+            try:
+                self._uploader.send_chunk(chunk, self.summary)
+            except Exception as error:
+                retry = self.spool is not None and is_retryable(error)
+                if retry and self._spill(chunk):
+                    return
+                # The spool holds rows written after the chunk, it's sent
+                # again later rather than out of order.
+                if retry and not self._closing.wait(self.drain_interval):
+                    continue
+                self.summary.add_failure(chunk, error)
+                self._error = error
+                return
+            break
+        self.summary.add(chunk)
+        if self._on_progress:
+            self._on_progress(chunk, self.summary)
+
+    def _spill(self, chunk: Chunk) -> bool:
+        """Append a chunk that can't be pushed to the spool, followed by
+        the rows written after it. Return False if the spool isn't empty:
+        its rows were written after the chunk."""
+        with self._spill_lock:
+            if self._spilling:
+                return False
+            self._spilling = True
+            self.spooled += self.spool.append_chunk(chunk)
+            rest = self._builder.flush()
+            if rest is not None:
+                self.spooled += self.spool.append_chunk(rest)
+            rows, markers = [], []
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except Empty:
+                    break
+                (markers if isinstance(item, _Flush) else rows).append(item)
+            self.spooled += self.spool.append(rows)
+            for marker in markers:
+                self._queue.put_nowait(marker)
+            return True
+
+    def _drain(self):
+        """Push the spooled rows, once the rows written before them are."""
+        try:
+            self.spool.drain(self._uploader.send, **self._drain_options)
+        except Exception:
+            # Tried again at the next interval.
+            return
+        with self._spill_lock:
+            if not self.spool.pending_bytes():
+                self._spilling = False
+
+    def _timeout(self, deadline: Optional[float]) -> Optional[float]:
+        """How long to wait for the next row: until the chunk's linger
+        deadline, or the next drain of the spool."""
+        if deadline is not None:
+            return max(0.0, deadline - time.monotonic())
+        if self._spilling and self._error is None:
+            return self.drain_interval
+        return None
+
+    def _run(self):
+        deadline = None
+        while True:
+            try:
+                item = self._queue.get(timeout=self._timeout(deadline))
+            except Empty:
+                if deadline is None:
+                    self._drain()
+                    continue
+                self._send(self._builder.flush())
+                deadline = None
+                continue
+
+            if isinstance(item, _Flush):
+                self._send(self._builder.flush())
+                deadline = None
+                item.done.set()
+                if isinstance(item, _Close):
+                    self.summary.finish()
+                    return
+                continue
+
+            if self._error is not None:
+                # Drop the rows, the writer is failed.
+                continue
+            chunk = self._builder.add(item)
+            if chunk is not None:
+                self._send(chunk)
+                deadline = None
+            if deadline is None:
+                deadline = time.monotonic() + self.linger
@@ -1,3 +1,4 @@
+import gzip
 import json
 
 import pytest
@@ -14,7 +15,13 @@ from adacord.cli.api import (
     AccessTokenAuth,
     CustomHTTPAdapter,
 )
-from adacord.cli.exceptions import AdacordApiError
+from adacord.cli.cache import QueryCache
+from adacord.cli.config import Timeouts, ClientConfig
+from adacord.cli.journal import PushJournal
+from adacord.cli.retries import RetryBudget, RetryPolicy
+from adacord.cli.exceptions import PushError, AdacordApiError
+
+ROWS = [{"id": index} for index in range(25)]
 
 
 class TestAccessTokenAuth:
@@ -35,11 +42,81 @@ class TestAccessTokenAuth:
         assert fake_request.headers["Authorization"] == "Bearer test"
 
 
+def make_response(status_code, json_data=None, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    response._content = json.dumps(json_data or {}).encode()
+    response._content_consumed = True
+    return response
+
+
+@pytest.fixture
+def fake_send(monkeypatch):
+    """Replace the transport with a list of responses to return."""
+    responses = []
+    requests_sent = []
+
+    def send(self, request, *args, **kwargs):
+        requests_sent.append(request)
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    monkeypatch.setattr(requests.adapters.HTTPAdapter, "send", send)
+    monkeypatch.setattr("time.sleep", lambda seconds: None)
+    return responses, requests_sent
+
+
 class TestCustomHTTPAdapter:
     def test_init(self):
         adapter = CustomHTTPAdapter()
         assert adapter
         assert isinstance(adapter, requests.adapters.HTTPAdapter)
+        assert adapter.retry_policy.retries
+
+    def test_send_retries(self, fake_send):
+        responses, sent = fake_send
+        responses.extend(
+            [
+                make_response(503, headers={"Retry-After": "1"}),
+                make_response(502),
+                make_response(200, {"hello": "world"}),
+            ]
+        )
+        adapter = CustomHTTPAdapter()
+        request = Request("GET", "https://tururu.com").prepare()
+        response = adapter.send(request)
+        assert response.json() == {"hello": "world"}
+        assert len(sent) == 3
+
+    def test_send_raises_after_retries(self, fake_send):
+        responses, sent = fake_send
+        responses.extend([make_response(500, {"message": "boom"})] * 4)
+        adapter = CustomHTTPAdapter(retry_policy=RetryPolicy(retries=3))
+        request = Request("GET", "https://tururu.com").prepare()
+        with pytest.raises(AdacordApiError) as error:
+            adapter.send(request)
+        assert error.value.status_code == 500
+        assert len(sent) == 4
+
+    def test_send_does_not_retry_post(self, fake_send):
+        responses, sent = fake_send
+        responses.extend([make_response(502), make_response(200)])
+        adapter = CustomHTTPAdapter()
+        request = Request("POST", "https://tururu.com", json={}).prepare()
+        with pytest.raises(AdacordApiError):
+            adapter.send(request)
+        assert len(sent) == 1
+
+    def test_send_retries_connection_errors(self, fake_send):
+        responses, sent = fake_send
+        responses.extend([requests.ConnectTimeout(), make_response(200)])
+        adapter = CustomHTTPAdapter()
+        request = Request("POST", "https://tururu.com", json={}).prepare()
+        assert adapter.send(request).ok
+        assert len(sent) == 2
 
 
 class TestHTTPClient:
@@ -74,6 +151,39 @@ class TestHTTPClient:
             with pytest.raises(AdacordApiError):
                 http_client.request("GET", "https://tururu.com")
 
+    def test_init_with_config(self):
+        config = ClientConfig(pool_maxsize=32, timeouts=Timeouts(1, 2))
+        http_client = HTTPClient(config=config)
+        adapter = http_client.get_adapter("https://api.adacord.com")
+        assert adapter._pool_maxsize == 32
+        assert http_client.timeout_for() == (1, 2)
+
+    def test_request_timeouts(self):
+        config = ClientConfig(timeouts=Timeouts(1, 2, {"query": 30}))
+        api = AdacordApi(client=HTTPClient(config=config))
+        with requests_mock.Mocker() as mock:
+            mock.get("https://api.adacord.com/v0/api_tokens", json=[])
+            mock.post("https://api.adacord.com/v0/buckets/query", json=[])
+            api.ApiTokens.list()
+            api.Buckets.query("select 1")
+            assert mock.request_history[0].timeout == (1, 2)
+            assert mock.request_history[1].timeout == (1, 30)
+
+    def test_request_compression(self):
+        config = ClientConfig(compression="gzip", compression_threshold=10)
+        http_client = HTTPClient(config=config)
+        data = {"data": [{"id": index} for index in range(10)]}
+        with requests_mock.Mocker() as mock:
+            mock.post("https://tururu.com", json={})
+            http_client.post("https://tururu.com", json=data)
+            http_client.post("https://tururu.com", json={})
+            big, small = mock.request_history
+        assert big.headers["Content-Encoding"] == "gzip"
+        assert big.headers["Content-Type"] == "application/json"
+        assert json.loads(gzip.decompress(big.body)) == data
+        assert "Content-Encoding" not in small.headers
+        assert small.json() == {}
+
     def test_request_headers(self, http_client):
         def callback(request, context):
             assert "Authorization" in request.headers
@@ -197,6 +307,55 @@ class TestBuckets:
             response = api.Buckets.delete("123")
             assert response
 
+    def test_buckets__get_cached(self, api, fake_bucket_data):
+        with requests_mock.Mocker() as mock:
+            mock.get(
+                "https://api.adacord.com/v0/buckets/123", json=fake_bucket_data
+            )
+            api.Buckets.get("123")
+            bucket = api.Buckets.get("123")
+            # Cached by name too.
+            assert api.Buckets.get("buckety").uuid == "123"
+            assert bucket.name == fake_bucket_data["name"]
+            assert mock.call_count == 1
+
+    def test_buckets__list_fills_the_cache(self, api, fake_bucket_data):
+        with requests_mock.Mocker() as mock:
+            mock.get(
+                "https://api.adacord.com/v0/buckets", json=[fake_bucket_data]
+            )
+            api.Buckets.list()
+            assert api.Bucket("buckety").uuid == "123"
+            assert mock.call_count == 1
+
+    def test_buckets__delete_invalidates_the_cache(
+        self, api, fake_bucket_data
+    ):
+        with requests_mock.Mocker() as mock:
+            url = "https://api.adacord.com/v0/buckets/123"
+            mock.get(url, json=fake_bucket_data)
+            mock.delete(url, json=fake_bucket_data)
+            api.Buckets.get("123")
+            api.Buckets.delete("123")
+            assert api.bucket_cache.get("test", "buckety") is None
+            api.Buckets.get("123")
+            assert mock.call_count == 3
+
+    def test_buckets__reference(self, api, fake_bucket_data):
+        bucket_uuid = "5f3c1b8e-2a4d-4c6e-9f10-1a2b3c4d5e6f"
+        with requests_mock.Mocker() as mock:
+            mock.get(
+                "https://api.adacord.com/v0/buckets/buckety",
+                json=fake_bucket_data,
+            )
+            bucket = api.Buckets.reference(bucket_uuid)
+            assert bucket.uuid == bucket_uuid
+            assert bucket.name is None
+            assert mock.call_count == 0
+            # A name has to be resolved.
+            assert api.Buckets.reference("buckety").uuid == "123"
+            assert mock.call_count == 1
+
     def test_buckets__create_token(self, api, fake_token_data):
         with requests_mock.Mocker() as mock:
             mock.post(
@@ -233,6 +392,87 @@ class TestBuckets:
             response = api.Buckets.query("select * from my-bucket")
             assert response == data
 
+    def test_buckets__query_as_numpy(self, api):
+        pytest.importorskip("numpy")
+        data = [{"id": 1, "name": "a"}, {"id": 2, "name": "b"}]
+        with requests_mock.Mocker() as mock:
+            mock.post("https://api.adacord.com/v0/buckets/query", json=data)
+            arrays = api.Buckets.query("select * from my-bucket", as_="numpy")
+        assert arrays["id"].tolist() == [1, 2]
+        assert arrays["name"].tolist() == ["a", "b"]
+
+    def test_buckets__query_cache(self, api, tmp_path):
+        cache = QueryCache(tmp_path, ttl=60)
+        data = [{"id": 1}]
+        url = "https://api.adacord.com/v0/buckets/query"
+        with requests_mock.Mocker() as mock:
+            mock.post(url, json=data, headers={"ETag": '"v1"'})
+            assert api.Buckets.query("select 1", cache=cache) == data
+            assert api.Buckets.query("select 1", cache=cache) == data
+            assert mock.call_count == 1
+
+            cache.ttl = 0
+            mock.post(url, status_code=304)
+            assert api.Buckets.query("select 1", cache=cache) == data
+            assert mock.call_count == 2
+            assert mock.last_request.headers["If-None-Match"] == '"v1"'
+
+    def test_buckets__query_cache_disabled(self, api, tmp_path):
+        cache = QueryCache(tmp_path, ttl=0)
+        with requests_mock.Mocker() as mock:
+            mock.post(
+                "https://api.adacord.com/v0/buckets/query",
+                json=[{"id": 1}],
+                headers={"ETag": '"v1"'},
+            )
+            api.Buckets.query("select 1", cache=cache)
+            api.Buckets.query("select 1", cache=cache)
+            assert mock.call_count == 2
+            assert "If-None-Match" not in mock.last_request.headers
+        assert list(tmp_path.iterdir()) == []
+
+    def test_buckets__iter_query(self, api):
+        data = [{"id": index} for index in range(5)]
+        with requests_mock.Mocker() as mock:
+            mock.post("https://api.adacord.com/v0/buckets/query", json=data)
+            rows = api.Buckets.iter_query("select * from my-bucket")
+            assert not isinstance(rows, list)
+            assert list(rows) == data
+            assert mock.last_request.json() == {
+                "query": "select * from my-bucket"
+            }
+
+    def test_buckets__iter_query_pages(self, api):
+        pages = [[{"id": 1}, {"id": 2}], [{"id": 3}, {"id": 4}], [{"id": 5}]]
+        with requests_mock.Mocker() as mock:
+            mock.post(
+                "https://api.adacord.com/v0/buckets/query",
+                [{"json": page} for page in pages],
+            )
+            batches = api.Buckets.iter_query(
+                "select * from bucket;", batch_size=2, page_size=2
+            )
+            assert list(batches) == pages
+            queries = [
+                request.json()["query"] for request in mock.request_history
+            ]
+        assert queries == [
+            f"SELECT * FROM (select * from bucket) LIMIT 2 OFFSET {offset}"
+            for offset in (0, 2, 4)
+        ]
+
+    def test_buckets__iter_data_follows_links(self, api):
+        url = "https://api.adacord.com/v0/buckets/123/data"
+        with requests_mock.Mocker() as mock:
+            mock.get(
+                url,
+                json=[{"id": 1}],
+                headers={"Link": f'<{url}?cursor=abc>; rel="next"'},
+            )
+            mock.get(f"{url}?cursor=abc", json=[{"id": 2}])
+            rows = list(api.Buckets.iter_data("123"))
+        assert rows == [{"id": 1}, {"id": 2}]
+
     def test_buckets__push_data(self, api):
         rows = {"timestamp": "42", "data": []}
         data = {"result": []}
@@ -241,6 +481,121 @@ class TestBuckets:
             response = api.Buckets.push_data("123", rows)
             assert response == data
 
+    def test_buckets__push_data_in_chunks(self, api):
+        rows = ({"id": index} for index in range(25))
+        progress = []
+        with requests_mock.Mocker() as mock:
+            mock.post("https://api.adacord.com/v0/buckets/123/data", json={})
+            summary = api.Buckets.push_data(
+                "123",
+                rows,
+                batch_size=10,
+                on_progress=lambda chunk, summary: progress.append(chunk),
+            )
+            assert mock.call_count == 3
+            assert mock.request_history[0].json() == {
+                "data": [{"id": index} for index in range(10)]
+            }
+        assert summary.rows == 25
+        assert summary.chunks == 3
+        assert len(progress) == 3
+
+    def test_buckets__push_data_concurrently(self, api):
+        rows = ({"id": index} for index in range(100))
+        with requests_mock.Mocker() as mock:
+            mock.post("https://api.adacord.com/v0/buckets/123/data", json={})
+            summary = api.Buckets.push_data(
+                "123", rows, batch_size=10, concurrency=4
+            )
+            assert mock.call_count == 10
+            pushed = [
+                row
+                for request in mock.request_history
+                for row in request.json()["data"]
+            ]
+        assert sorted(row["id"] for row in pushed) == list(range(100))
+        assert summary.rows == 100
+
+    def test_buckets__push_data_stream(self, api):
+        rows = ({"id": index} for index in range(25))
+        with requests_mock.Mocker() as mock:
+            mock.post("https://api.adacord.com/v0/buckets/123/data", json={})
+            summary = api.Buckets.push_data(
+                "123", rows, batch_size=10, linger=0.01
+            )
+            assert mock.call_count == 3
+        assert summary.rows == 25
+
+    def test_buckets__push_data_idempotency_keys(self, api):
+        rows = ({"id": index} for index in range(20))
+        with requests_mock.Mocker() as mock:
+            mock.post("https://api.adacord.com/v0/buckets/123/data", json={})
+            api.Buckets.push_data("123", rows, batch_size=10)
+            keys = [
+                request.headers["Idempotency-Key"]
+                for request in mock.request_history
+            ]
+        assert keys[0].endswith("-0")
+        assert keys[1].endswith("-1")
+        assert keys[0][:-2] == keys[1][:-2]
+
+    def test_buckets__push_data_resume(self, api, tmp_path):
+        filepath = tmp_path / "data.jsonl"
+        filepath.write_text("{}")
+        url = "https://api.adacord.com/v0/buckets/123/data"
+        journal = PushJournal.open(
+            "123", filepath, batch_size=10, base_path=tmp_path
+        )
+        with requests_mock.Mocker() as mock:
+            mock.post(
+                url,
+                [
+                    {"json": {}},
+                    {"json": {}},
+                    {"json": {"detail": "Bad request"}, "status_code": 400},
+                ],
+            )
+            with pytest.raises(PushError):
+                api.Buckets.push_data(
+                    "123", iter(ROWS), retries=0, journal=journal
+                )
+            first_keys = [
+                request.headers["Idempotency-Key"]
+                for request in mock.request_history
+            ]
+
+        journal = PushJournal.open("123", filepath, base_path=tmp_path)
+        assert journal.rows == 20
+        with requests_mock.Mocker() as mock:
+            mock.post(url, json={})
+            summary = api.Buckets.push_data("123", iter(ROWS), journal=journal)
+            assert mock.call_count == 1
+            assert mock.request_history[0].json() == {"data": ROWS[20:]}
+            key = mock.request_history[0].headers["Idempotency-Key"]
+        assert key == first_keys[2]
+        assert summary.rows == 5
+        assert not journal.path.exists()
+
+    def test_buckets__push_data_single_retry_layer(self, api, fake_send):
+        responses, sent = fake_send
+        responses.extend([make_response(503)] * 3)
+        with pytest.raises(PushError):
+            api.Buckets.push_data(
+                "123", iter(ROWS[:5]), batch_size=5, retries=2
+            )
+        # The uploader retries, the adapter sends every attempt once.
+        assert len(sent) == 3
+
+    def test_buckets__push_data_retry_budget(self, fake_send):
+        responses, sent = fake_send
+        responses.extend([make_response(503)] * 2)
+        policy = RetryPolicy(budget=RetryBudget(ratio=0, capacity=1))
+        api = AdacordApi(client=HTTPClient.with_token("test", policy))
+        with pytest.raises(PushError) as error:
+            api.Buckets.push_data("123", iter(ROWS[:5]), batch_size=5)
+        assert len(sent) == 2
+        assert error.value.summary.retries == 1
+
     def test_buckets__get_data(self, api):
         data = {"result": []}
         with requests_mock.Mocker() as mock:
@@ -306,6 +661,16 @@ class TestBucket:
             response = bucket_client.push_data(rows)
             assert response == data
 
+    def test_bucket__writer(self, bucket_client):
+        with requests_mock.Mocker() as mock:
+            mock.post("https://api.adacord.com/v0/buckets/123/data", json={})
+            with bucket_client.writer(batch_size=2, linger=60) as writer:
+                for row in ROWS[:3]:
+                    writer.write(row)
+            assert mock.call_count == 2
+            assert "Idempotency-Key" in mock.request_history[0].headers
+        assert writer.summary.rows == 3
+
     def test_bucket__get_data(self, bucket_client):
         data = {"result": []}
         with requests_mock.Mocker() as mock:
@@ -0,0 +1,135 @@
+import json
+import asyncio
+
+import pytest
+
+from adacord.cli.exceptions import PushError, AdacordApiError
+
+httpx = pytest.importorskip("httpx")
+
+from adacord.cli.async_api import (  # noqa: E402
+    AsyncBucket,
+    AsyncAdacordApi,
+    AsyncHTTPClient,
+)
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def make_api(handler, **kwargs) -> AsyncAdacordApi:
+    return AsyncAdacordApi.Client(
+        token="1234", transport=httpx.MockTransport(handler), **kwargs
+    )
+
+
+def test_request_headers(fake_bucket_data):
+    def handler(request):
+        assert request.headers["Authorization"] == "Bearer 1234"
+        assert request.url == "https://api.adacord.com/v0/buckets"
+        return httpx.Response(200, json=[fake_bucket_data])
+
+    async def main():
+        async with make_api(handler) as api:
+            return await api.Buckets.list()
+
+    buckets = run(main())
+    assert isinstance(buckets[0], AsyncBucket)
+    assert buckets[0].uuid == fake_bucket_data["uuid"]
+
+
+def test_request_without_auth():
+    def handler(request):
+        assert "Authorization" not in request.headers
+        return httpx.Response(200, json={"message": "ok"})
+
+    async def main():
+        async with make_api(handler) as api:
+            return await api.User.request_password_reset("email")
+
+    assert run(main()) == {"message": "ok"}
+
+
+def test_request_raises():
+    def handler(request):
+        return httpx.Response(404, json={"message": "not found"})
+
+    async def main():
+        async with make_api(handler) as api:
+            await api.Bucket("123")
+
+    with pytest.raises(AdacordApiError) as error:
+        run(main())
+    assert error.value.status_code == 404
+    assert error.value.message == "not found"
+
+
+def test_bucket(fake_bucket_data, fake_token_data):
+    def handler(request):
+        if request.url.path.endswith("/tokens"):
+            return httpx.Response(200, json=[fake_token_data])
+        return httpx.Response(200, json=fake_bucket_data)
+
+    async def main():
+        async with make_api(handler) as api:
+            bucket = await api.Bucket("123")
+            return await bucket.get_tokens()
+
+    assert run(main()) == [fake_token_data]
+
+
+def test_push_data_concurrently():
+    pushed = []
+    in_flight = []
+    max_in_flight = []
+
+    async def handler(request):
+        in_flight.append(request)
+        max_in_flight.append(len(in_flight))
+        await asyncio.sleep(0)
+        in_flight.remove(request)
+        pushed.extend(json.loads(request.content)["data"])
+        return httpx.Response(200, json={})
+
+    async def main():
+        async with make_api(handler, max_concurrency=2) as api:
+            return await api.Buckets.push_data(
+                "123",
+                ({"id": index} for index in range(100)),
+                batch_size=10,
+                concurrency=4,
+            )
+
+    summary = run(main())
+    assert summary.chunks == 10
+    assert sorted(row["id"] for row in pushed) == list(range(100))
+    assert max(max_in_flight) <= 2
+
+
+def test_push_data_single_retry_layer():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(503, json={"message": "unavailable"})
+
+    async def main():
+        async with make_api(handler) as api:
+            return await api.Buckets.push_data(
+                "123", [{"id": 1}], batch_size=10, retries=1
+            )
+
+    with pytest.raises(PushError):
+        run(main())
+    assert len(requests) == 2
+
+
+def test_http_client_with_token():
+    client = AsyncHTTPClient.with_token("1234")
+    assert client.auth.get_token() == "1234"
+    run(client.aclose())
@@ -0,0 +1,140 @@
+import json
+
+import pytest
+import requests_mock
+
+from adacord.cli.batch import (
+    run_batch,
+    load_operations,
+    parse_operations,
+    resolve_references,
+)
+
+OPERATIONS = [
+    {"id": "logs", "op": "bucket.create", "args": {"description": "logs"}},
+    {
+        "id": "token",
+        "op": "bucket.token.create",
+        "args": {"bucket": "${logs.uuid}", "description": "ingest"},
+    },
+    {"op": "api_token.create", "args": {"description": "ci"}},
+]
+
+
+def test_resolve_references():
+    results = {"logs": {"uuid": "123", "tags": ["a"]}}
+    assert resolve_references("${logs.uuid}", results) == "123"
+    assert resolve_references("${logs}", results) == results["logs"]
+    assert resolve_references("id-${logs.uuid}", results) == "id-123"
+    assert resolve_references({"a": ["${logs.tags}"]}, results) == {
+        "a": [["a"]]
+    }
+
+
+def test_parse_operations():
+    operations = parse_operations(OPERATIONS)
+    assert [operation.id for operation in operations] == ["logs", "token", "3"]
+    assert operations[1].depends_on == ["logs"]
+
+
+@pytest.mark.parametrize(
+    "items, message",
+    [
+        ({"op": "bucket.create"}, "list"),
+        ([{"args": {}}], "no `op`"),
+        ([{"op": "bucket.drop"}], "unknown operation"),
+        ([{"op": "api_token.list", "args": {"nope": 1}}], "nope"),
+        ([{"op": "api_token.list", "when": "now"}], "when"),
+        ([{"id": "a", "op": "api_token.list"}] * 2, "unique"),
+        ([{"op": "api_token.list", "after": ["missing"]}], "missing"),
+        (
+            [
+                {"id": "a", "op": "api_token.list", "after": ["b"]},
+                {"id": "b", "op": "api_token.list", "after": ["a"]},
+            ],
+            "cycle",
+        ),
+    ],
+)
+def test_parse_operations_errors(items, message):
+    with pytest.raises(ValueError, match=message):
+        parse_operations(items)
+
+
+def test_load_operations(tmp_path):
+    jsonl = tmp_path / "ops.jsonl"
+    jsonl.write_text("\n".join(json.dumps(item) for item in OPERATIONS))
+    assert len(load_operations(jsonl)) == 3
+
+    yaml_file = tmp_path / "ops.yaml"
+    yaml_file.write_text(
+        "- id: logs\n"
+        "  op: bucket.create\n"
+        "  args: {description: logs}\n"
+        "- op: bucket.token.create\n"
+        "  args: {bucket: '${logs.uuid}'}\n"
+    )
+    pytest.importorskip("yaml")
+    operations = load_operations(yaml_file)
+    assert operations[1].depends_on == ["logs"]
+
+
+def test_run_batch(api, fake_bucket_data, fake_token_data):
+    results = []
+    with requests_mock.Mocker() as mock:
+        mock.post("https://api.adacord.com/v0/buckets", json=fake_bucket_data)
+        mock.post(
+            "https://api.adacord.com/v0/buckets/123/tokens",
+            json=fake_token_data,
+        )
+        mock.post(
+            "https://api.adacord.com/v0/api_tokens", json=fake_token_data
+        )
+        report = run_batch(
+            api, parse_operations(OPERATIONS), on_result=results.append
+        )
+
+    assert report.ok
+    assert len(results) == 3
+    operations = report.to_dict()["operations"]
+    assert [operation["id"] for operation in operations] == [
+        "logs",
+        "token",
+        "3",
+    ]
+    assert operations[0]["result"]["uuid"] == "123"
+    assert operations[1]["result"] == fake_token_data
+    token_request = [
+        request
+        for request in mock.request_history
+        if request.path.endswith("/tokens")
+    ][0]
+    assert token_request.json() == {"description": "ingest"}
+
+
+def test_run_batch_skips_dependents_of_failures(api, fake_token_data):
+    operations = [
+        *OPERATIONS,
+        {
+            "op": "bucket.token.list",
+            "args": {"bucket": "123"},
+            "after": ["token"],
+        },
+    ]
+    with requests_mock.Mocker() as mock:
+        mock.post(
+            "https://api.adacord.com/v0/buckets",
+            status_code=400,
+            json={"message": "Bad bucket"},
+        )
+        mock.post(
+            "https://api.adacord.com/v0/api_tokens", json=fake_token_data
+        )
+        report = run_batch(api, parse_operations(operations))
+
+    statuses = [result.status for result in report.results]
+    assert statuses == ["failed", "skipped", "ok", "skipped"]
+    failed = report.to_dict()["operations"][0]
+    assert failed["error"] == "Bad bucket"
+    assert failed["status_code"] == 400
+    assert not report.ok
@@ -0,0 +1,116 @@
+import os
+import time
+
+import pytest
+
+from adacord.cli.cache import QueryCache, BucketCache
+
+
+@pytest.fixture
+def cache(tmp_path) -> QueryCache:
+    return QueryCache(tmp_path / "queries", ttl=60, max_bytes=1100)
+
+
+def test_get_set(cache):
+    key = cache.key("url", "token", "select 1")
+    assert cache.get(key) is None
+    cache.set(key, b'[{"a": 1}]', etag='"v1"')
+    entry = cache.get(key)
+    assert entry.fresh
+    assert entry.body == b'[{"a": 1}]'
+    assert entry.etag == '"v1"'
+
+
+def test_key():
+    assert QueryCache.key("url", "token", "q") == QueryCache.key(
+        "url", "token", "q"
+    )
+    assert QueryCache.key("url", "token", "q") != QueryCache.key(
+        "url", "other-token", "q"
+    )
+
+
+def test_expired(cache):
+    cache.ttl = 0
+    cache.set("with-etag", b"[]", etag='"v1"')
+    cache.set("without-etag", b"[]")
+
+    entry = cache.get("with-etag")
+    assert not entry.fresh
+    assert cache.get("without-etag") is None
+    assert not (cache.path / "without-etag").exists()
+
+    cache.ttl = 60
+    cache.refresh("with-etag")
+    assert cache.get("with-etag").fresh
+
+
+def test_evict_least_recently_used(cache):
+    body = b"x" * 300
+    for index, key in enumerate(["a", "b", "c"]):
+        cache.set(key, body)
+        past = time.time() - 100 + index
+        os.utime(cache.path / key, (past, past))
+    cache.get("a")
+
+    cache.set("d", body)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("d") is not None
+
+
+def test_from_config(tmp_path):
+    assert QueryCache.from_config(environ={}, base_path=tmp_path) is None
+    cache = QueryCache.from_config(
+        environ={"ADACORD_QUERY_CACHE_TTL": "30"}, base_path=tmp_path
+    )
+    assert cache.ttl == 30
+    assert cache.path == tmp_path / "cache" / "queries"
+
+
+BUCKET = {"uuid": "123", "name": "buckety"}
+
+
+def test_bucket_cache():
+    cache = BucketCache()
+    assert cache.get("token", "123") is None
+    cache.set("token", BUCKET)
+    assert cache.get("token", "123") == BUCKET
+    assert cache.get("token", "buckety") == BUCKET
+    assert cache.get("other-token", "123") is None
+
+    cache.invalidate("token", "buckety")
+    assert cache.get("token", "123") is None
+    assert cache.get("token", "buckety") is None
+
+
+def test_bucket_cache_ttl():
+    cache = BucketCache(ttl=0.01)
+    cache.set("token", BUCKET)
+    time.sleep(0.02)
+    assert cache.get("token", "123") is None
+
+    disabled = BucketCache(ttl=0)
+    disabled.set("token", BUCKET)
+    assert disabled.get("token", "123") is None
+
+
+def test_bucket_cache_on_disk(tmp_path):
+    path = tmp_path / "buckets.json"
+    BucketCache(path=path).set("token", BUCKET)
+    other = BucketCache(path=path)
+    assert other.get("token", "buckety") == BUCKET
+    # The credentials are hashed.
+    assert "token" not in path.read_text()
+
+    BucketCache(path=path).invalidate("token", "123")
+    assert other.get("token", "buckety") is None
+
+
+def test_bucket_cache_from_config(tmp_path):
+    cache = BucketCache.from_config(
+        environ={"ADACORD_BUCKET_CACHE_TTL": "10"}, base_path=tmp_path
+    )
+    assert cache.ttl == 10
+    assert cache.path == tmp_path / "cache" / "buckets.json"
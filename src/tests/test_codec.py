@@ -0,0 +1,51 @@
+import json
+import importlib.util
+
+import pytest
+
+from adacord.cli import codec
+from adacord.cli.codec import CODECS, get_codec
+
+AVAILABLE_CODECS = [
+    pytest.param(
+        name,
+        marks=pytest.mark.skipif(
+            name != "json" and importlib.util.find_spec(name) is None,
+            reason=f"{name} is not installed",
+        ),
+    )
+    for name in CODECS
+]
+
+DOCUMENT = {"id": 1, "name": "ünïcode", "values": [1.5, None, True]}
+
+
+@pytest.mark.parametrize("name", AVAILABLE_CODECS)
+def test_roundtrip(name):
+    json_codec = get_codec(name)
+    data = json_codec.dumps(DOCUMENT)
+    assert isinstance(data, bytes)
+    assert json.loads(data) == DOCUMENT
+    assert json_codec.loads(data) == DOCUMENT
+    assert json_codec.loads(memoryview(data)) == DOCUMENT
+    assert json_codec.loads(data.decode("utf-8")) == DOCUMENT
+
+
+@pytest.mark.parametrize("name", AVAILABLE_CODECS)
+def test_decode_error(name):
+    with pytest.raises(json.JSONDecodeError):
+        get_codec(name).loads(b"{not json")
+
+
+def test_get_codec_from_env(monkeypatch):
+    monkeypatch.setenv("ADACORD_JSON_CODEC", "json")
+    assert get_codec().name == "json"
+
+
+def test_default_codec():
+    assert codec.loads(codec.dumps(DOCUMENT)) == DOCUMENT
+
+
+def test_get_codec_unknown():
+    with pytest.raises(ValueError):
+        get_codec("yaml")
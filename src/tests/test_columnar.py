@@ -0,0 +1,73 @@
+import pytest
+
+from adacord.cli.columnar import (
+    to_arrow,
+    to_numpy,
+    to_pandas,
+    to_columns,
+    infer_dtype,
+    materialize,
+)
+
+ROWS = [
+    {"id": 1, "price": 1.5, "name": "a", "active": True},
+    {"id": 2, "price": 2, "name": "b", "active": False},
+    {"id": 3, "price": None, "name": "c", "active": True, "extra": [1]},
+]
+
+
+def test_to_columns():
+    columns = to_columns(iter(ROWS))
+    assert columns == {
+        "id": [1, 2, 3],
+        "price": [1.5, 2, None],
+        "name": ["a", "b", "c"],
+        "active": [True, False, True],
+        "extra": [None, None, [1]],
+    }
+
+
+@pytest.mark.parametrize(
+    "values, dtype",
+    [
+        ([1, None, 2], "int64"),
+        ([1, 2.5], "float64"),
+        ([True, False], "bool"),
+        (["a", None], "string"),
+        (["a", 1], "object"),
+        ([None], "object"),
+    ],
+)
+def test_infer_dtype(values, dtype):
+    assert infer_dtype(values) == dtype
+
+
+def test_to_numpy():
+    numpy = pytest.importorskip("numpy")
+    arrays = to_numpy(ROWS)
+    assert arrays["id"].dtype == numpy.int64
+    assert arrays["price"].dtype == numpy.float64
+    assert numpy.isnan(arrays["price"][2])
+    assert arrays["active"].dtype == numpy.bool_
+    assert list(arrays["name"]) == ["a", "b", "c"]
+
+
+def test_to_arrow():
+    pytest.importorskip("pyarrow")
+    table = to_arrow(ROWS, dtypes={"id": "int32"})
+    assert str(table.schema.field("id").type) == "int32"
+    assert str(table.schema.field("price").type) == "double"
+    assert table.column("price").to_pylist() == [1.5, 2.0, None]
+
+
+def test_to_pandas():
+    pytest.importorskip("pandas")
+    frame = to_pandas(ROWS)
+    assert str(frame["id"].dtype) == "Int64"
+    assert str(frame["active"].dtype) == "boolean"
+    assert frame["name"].tolist() == ["a", "b", "c"]
+
+
+def test_materialize_unknown():
+    with pytest.raises(ValueError):
+        materialize(ROWS, "excel")
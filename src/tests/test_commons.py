@@ -1,8 +1,22 @@
+import json
 from pathlib import Path
 
 import pytest
 
-from adacord.cli.commons import get_token, parse_csv, read_auth, save_auth
+from adacord.cli.commons import (
+    iter_csv,
+    get_token,
+    iter_json,
+    parse_csv,
+    parse_int,
+    read_auth,
+    save_auth,
+    parse_float,
+    iter_jsonlines,
+    infer_converter,
+    iter_csv_batches,
+    iter_json_batches,
+)
 
 
 def test_write_read_auth(tmp_path):
@@ -77,3 +91,108 @@ def test_parse_csv(csv_filepath):
             "name": "Angola",
         },
     ]
+
+
+def test_iter_csv(csv_filepath):
+    rows = iter_csv(csv_filepath)
+    assert not isinstance(rows, list)
+    assert next(rows)["name"] == "Albania"
+    assert len(list(rows)) == 4
+
+
+def test_iter_json(tmp_path):
+    filepath = tmp_path / "data.json"
+    filepath.write_text('[{"a": 1}, {"a": 2}]')
+    assert list(iter_json(filepath)) == [{"a": 1}, {"a": 2}]
+
+    filepath.write_text('{"a": 1}')
+    assert list(iter_json(filepath)) == [{"a": 1}]
+
+
+def test_iter_json_incremental(tmp_path, monkeypatch):
+    from adacord.cli import commons
+
+    # Read a few bytes at a time, the elements span many reads.
+    monkeypatch.setattr(commons, "READ_SIZE", 7)
+    filepath = tmp_path / "data.json"
+    filepath.write_text(
+        '[\n  {"name": "ünïcode", "values": [1, 2.5]},\n  {"a": 12345}\n]'
+    )
+    rows = iter_json(filepath)
+    assert next(rows) == {"name": "ünïcode", "values": [1, 2.5]}
+    assert list(rows) == [{"a": 12345}]
+
+
+def test_iter_json_batches(tmp_path):
+    filepath = tmp_path / "data.json"
+    filepath.write_text(json.dumps([{"a": index} for index in range(5)]))
+    batches = list(iter_json_batches(filepath, batch_size=2))
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+
+
+def test_iter_jsonlines(tmp_path):
+    filepath = tmp_path / "data.jsonl"
+    filepath.write_text('{"a": 1}\n\n{"a": 2}\n')
+    assert list(iter_jsonlines(filepath)) == [{"a": 1}, {"a": 2}]
+
+
+def test_iter_csv_infer_types(tmp_path):
+    filepath = tmp_path / "typed.csv"
+    filepath.write_text(
+        "id;price;active;zip;name\n"
+        "1;1.5;true;01234;'a;b'\n"
+        "\n"
+        "2;;False;12345;c\n"
+        "3;2;true;00000;d\n"
+    )
+    rows = list(
+        iter_csv(filepath, delimiter=";", quotechar="'", infer_types=True)
+    )
+    assert rows == [
+        {"id": 1, "price": 1.5, "active": True, "zip": "01234", "name": "a;b"},
+        {"id": 2, "price": None, "active": False, "zip": "12345", "name": "c"},
+        {"id": 3, "price": 2.0, "active": True, "zip": "00000", "name": "d"},
+    ]
+
+
+def test_iter_csv_infer_types_outside_sample(tmp_path):
+    filepath = tmp_path / "typed.csv"
+    filepath.write_text("id\n1\n2\nnot a number\n")
+    rows = list(iter_csv(filepath, infer_types=True, sample_size=2))
+    assert rows == [{"id": 1}, {"id": 2}, {"id": "not a number"}]
+
+
+def test_infer_converter():
+    assert infer_converter(["1", "", "-2"]) is parse_int
+    assert infer_converter(["1", "2.5", "0.5"]) is parse_float
+    assert infer_converter(["", ""]) is None
+    assert infer_converter(["a", "1"]) is None
+
+
+@pytest.mark.parametrize(
+    "value", ["NaN", "inf", "-Infinity", "1_000", "1e400", "007", " 1", "٣"]
+)
+def test_parse_numbers_strict(value):
+    with pytest.raises(ValueError):
+        parse_float(value)
+    with pytest.raises(ValueError):
+        parse_int(value)
+    assert infer_converter(["1", value]) is None
+
+
+def test_parse_numbers():
+    assert parse_int("-12") == -12
+    assert parse_int("0") == 0
+    assert parse_float("0.5") == 0.5
+    assert parse_float("-.5e3") == -500.0
+    assert parse_float("1.") == 1.0
+
+
+def test_iter_csv_batches(csv_filepath):
+    batches = list(iter_csv_batches(csv_filepath, batch_size=2))
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+
+    batches = iter_csv_batches(
+        csv_filepath, batch_size=2, columnar=True, infer_types=True
+    )
+    assert next(batches)["area"] == [28748, 2381741]
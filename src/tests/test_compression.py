@@ -0,0 +1,55 @@
+import gzip
+from pathlib import Path
+
+import pytest
+
+from adacord.cli.commons import iter_csv, iter_jsonlines
+from adacord.cli.compression import (
+    compress,
+    compress_body,
+    open_data_file,
+    strip_compression_suffix,
+)
+
+
+def test_compress_body_threshold():
+    body = b"x" * 100
+    assert compress_body(body, "gzip", threshold=1000) == (body, {})
+    assert compress_body(body, None, threshold=0) == (body, {})
+
+    compressed, headers = compress_body(body, "gzip", threshold=10)
+    assert headers == {"Content-Encoding": "gzip"}
+    assert gzip.decompress(compressed) == body
+
+
+def test_compress_zstd():
+    zstandard = pytest.importorskip("zstandard")
+    body = b"x" * 100
+    compressed = compress(body, "zstd", level=1)
+    assert zstandard.ZstdDecompressor().decompress(compressed) == body
+
+
+def test_compress_unknown():
+    with pytest.raises(ValueError):
+        compress(b"", "lz4")
+
+
+def test_strip_compression_suffix():
+    assert strip_compression_suffix(Path("data.csv.gz")) == Path("data.csv")
+    assert strip_compression_suffix(Path("data.csv")) == Path("data.csv")
+
+
+def test_open_gzip(tmp_path):
+    filepath = tmp_path / "data.jsonl.gz"
+    with gzip.open(filepath, "wt") as f:
+        f.write('{"a": 1}\n{"a": 2}\n')
+    assert list(iter_jsonlines(filepath)) == [{"a": 1}, {"a": 2}]
+
+
+def test_open_zstd(tmp_path):
+    zstandard = pytest.importorskip("zstandard")
+    filepath = tmp_path / "data.csv.zst"
+    filepath.write_bytes(zstandard.ZstdCompressor().compress(b"A,b\n1,2\n"))
+    assert list(iter_csv(filepath)) == [{"a": "1", "b": "2"}]
+    with open_data_file(filepath) as f:
+        assert f.readline() == "A,b\n"
@@ -0,0 +1,44 @@
+import json
+
+from adacord.cli.config import Timeouts, ClientConfig
+
+
+def test_timeouts():
+    timeouts = Timeouts(connect=1, read=2, operations={"tokens": (3, 4)})
+    assert timeouts.default == (1, 2)
+    assert timeouts.for_operation() == (1, 2)
+    assert timeouts.for_operation("unknown") == (1, 2)
+    assert timeouts.for_operation("tokens") == (3, 4)
+    assert timeouts.for_operation("query") == (1, 60)
+
+
+def test_client_config_defaults(tmp_path):
+    config = ClientConfig.from_env(environ={}, base_path=tmp_path)
+    assert config.pool_maxsize == 10
+    assert config.timeouts.default == (5, 10)
+    assert not config.http2
+
+
+def test_client_config_from_file_and_env(tmp_path):
+    settings = {
+        "http": {
+            "pool_maxsize": 20,
+            "read_timeout": 30,
+            "http2": True,
+            "timeouts": {"query": 120},
+        }
+    }
+    (tmp_path / "config.json").write_text(json.dumps(settings))
+    environ = {
+        "ADACORD_POOL_MAXSIZE": "50",
+        "ADACORD_CONNECT_TIMEOUT": "2",
+        "ADACORD_PUSH_TIMEOUT": "300",
+    }
+
+    config = ClientConfig.from_env(environ=environ, base_path=tmp_path)
+
+    assert config.pool_maxsize == 50
+    assert config.http2
+    assert config.timeouts.default == (2, 30)
+    assert config.timeouts.for_operation("query") == (2, 120)
+    assert config.timeouts.for_operation("push") == (2, 300)
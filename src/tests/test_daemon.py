@@ -0,0 +1,123 @@
+import stat
+import threading
+
+import pytest
+import requests_mock
+
+from adacord.cli.api import AdacordApi, HTTPClient
+from adacord.cli.daemon import (
+    DaemonServer,
+    DaemonAdapter,
+    use_daemon,
+    send_command,
+)
+from adacord.cli.retries import RetryPolicy
+from adacord.cli.exceptions import AdacordApiError
+
+URL = "https://api.adacord.com/v0/buckets"
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    server = DaemonServer(tmp_path / "daemon.sock")
+    # The daemon's connections to the API.
+    server.upstream = requests_mock.Adapter()
+    server.session.mount("https://", server.upstream)
+    thread = threading.Thread(target=server.serve)
+    thread.start()
+    yield server
+    server.shutdown()
+    thread.join()
+
+
+@pytest.fixture
+def client(daemon):
+    client = HTTPClient.with_token("test", retry_policy=RetryPolicy(retries=0))
+    environ = {"ADACORD_DAEMON_SOCKET": str(daemon.path)}
+    assert use_daemon(client, environ=environ)
+    return client
+
+
+def test_use_daemon_without_daemon(tmp_path):
+    client = HTTPClient.with_token("test")
+    environ = {"ADACORD_DAEMON_SOCKET": str(tmp_path / "daemon.sock")}
+    assert not use_daemon(client, environ=environ)
+    assert not isinstance(client.get_adapter(URL), DaemonAdapter)
+
+
+def test_use_daemon_disabled(daemon):
+    client = HTTPClient.with_token("test")
+    environ = {
+        "ADACORD_DAEMON_SOCKET": str(daemon.path),
+        "ADACORD_DAEMON": "0",
+    }
+    assert not use_daemon(client, environ=environ)
+
+
+def test_daemon_forwards_requests(daemon, client, fake_bucket_data):
+    daemon.upstream.register_uri("GET", URL, json=[fake_bucket_data])
+    buckets = AdacordApi(client).Buckets.list()
+    assert [bucket.uuid for bucket in buckets] == [fake_bucket_data["uuid"]]
+    request = daemon.upstream.last_request
+    assert request.headers["Authorization"] == "Bearer test"
+    assert daemon.requests == 1
+
+
+def test_daemon_forwards_bodies(daemon, client):
+    daemon.upstream.register_uri("POST", URL, json={"ok": True})
+    response = client.post(URL, json={"description": "test"})
+    assert response.json() == {"ok": True}
+    assert daemon.upstream.last_request.json() == {"description": "test"}
+
+
+def test_daemon_streams_responses(daemon, client):
+    body = b"x" * (1024 * 1024)
+    daemon.upstream.register_uri("GET", URL, content=body)
+    response = client.get(URL, stream=True)
+    assert b"".join(response.iter_content(1000)) == body
+
+
+def test_daemon_errors(daemon, client):
+    daemon.upstream.register_uri(
+        "GET", URL, status_code=404, json={"message": "Not found"}
+    )
+    with pytest.raises(AdacordApiError) as error:
+        client.get(URL)
+    assert error.value.status_code == 404
+    assert error.value.message == "Not found"
+
+
+def test_daemon_socket_is_private(daemon):
+    assert stat.S_IMODE(daemon.path.stat().st_mode) == 0o600
+
+
+def test_daemon_commands(daemon):
+    status = send_command("status", daemon.path)
+    assert status["socket"] == str(daemon.path)
+    assert status["requests"] == 0
+
+
+def test_daemon_stop(tmp_path):
+    server = DaemonServer(tmp_path / "daemon.sock")
+    thread = threading.Thread(target=server.serve)
+    thread.start()
+    send_command("stop", server.path)
+    thread.join(5)
+    assert not thread.is_alive()
+    assert not server.path.exists()
+    with pytest.raises(OSError):
+        send_command("status", server.path)
+
+
+def test_daemon_replaces_stale_socket(tmp_path):
+    first = DaemonServer(tmp_path / "daemon.sock")
+    # Not listening anymore, but the socket file is still there.
+    first.server_close()
+    assert first.path.exists()
+    second = DaemonServer(first.path)
+    second.server_close()
+
+
+def test_only_one_daemon(daemon):
+    with pytest.raises(RuntimeError):
+        DaemonServer(daemon.path)
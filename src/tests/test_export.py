@@ -0,0 +1,114 @@
+import re
+import csv
+import json
+
+import pytest
+
+from adacord.cli.export import (
+    Checkpoint,
+    ExportFormat,
+    UnorderedExportError,
+    export_query,
+)
+
+ROWS = [{"id": index, "name": f"row {index}"} for index in range(25)]
+
+
+class FakeBuckets:
+    """Answer the paginated queries from ROWS, failing on some pages."""
+
+    def __init__(self, fail_on_offset=None):
+        self.fail_on_offset = fail_on_offset
+        self.offsets = []
+
+    def iter_query(self, query):
+        limit, offset = map(
+            int, re.search(r"LIMIT (\d+) OFFSET (\d+)", query).groups()
+        )
+        self.offsets.append(offset)
+        if offset == self.fail_on_offset:
+            raise ConnectionError("boom")
+        end = offset + limit
+        return iter(ROWS[offset:end])
+
+
+def test_export_jsonl(tmp_path):
+    out = tmp_path / "export.jsonl"
+    pages = []
+
+    checkpoint = export_query(
+        FakeBuckets(),
+        "select * order by id",
+        out,
+        page_size=10,
+        concurrency=3,
+        on_page=lambda page, rows, checkpoint: pages.append((page, rows)),
+    )
+
+    assert checkpoint.rows == 25
+    assert pages == [(0, 10), (1, 10), (2, 5)]
+    assert [json.loads(line) for line in out.open()] == ROWS
+    assert not Checkpoint.path_for(out).exists()
+
+
+def test_export_csv(tmp_path):
+    out = tmp_path / "export.csv"
+    export_query(
+        FakeBuckets(), "select * order by id", out, ExportFormat.csv, 10
+    )
+    with out.open() as f:
+        rows = list(csv.DictReader(f))
+    assert rows == [
+        {"id": str(row["id"]), "name": row["name"]} for row in ROWS
+    ]
+
+
+@pytest.mark.parametrize("format", [ExportFormat.jsonl, ExportFormat.csv])
+def test_export_resume(tmp_path, format):
+    out = tmp_path / "export.file"
+    with pytest.raises(ConnectionError):
+        export_query(
+            FakeBuckets(fail_on_offset=20),
+            "select * order by id",
+            out,
+            format,
+            10,
+        )
+    checkpoint = Checkpoint.load(out)
+    assert checkpoint.next_page == 2
+    assert checkpoint.rows == 20
+
+    buckets = FakeBuckets()
+    checkpoint = export_query(buckets, "select * order by id", out, format, 10)
+    assert buckets.offsets[0] == 20
+    assert checkpoint.rows == 25
+
+    expected = tmp_path / "expected.file"
+    export_query(FakeBuckets(), "select * order by id", expected, format, 10)
+    assert out.read_bytes() == expected.read_bytes()
+
+
+def test_export_parquet(tmp_path):
+    parquet = pytest.importorskip("pyarrow.parquet")
+    out = tmp_path / "export.parquet"
+    export_query(
+        FakeBuckets(), "select * order by id", out, ExportFormat.parquet, 10
+    )
+    assert parquet.read_table(out).to_pylist() == ROWS
+
+
+def test_export_unordered_single_page(tmp_path):
+    out = tmp_path / "export.jsonl"
+    buckets = FakeBuckets()
+    checkpoint = export_query(buckets, "select *", out, page_size=25)
+    assert checkpoint.rows == 25
+    assert buckets.offsets == [0]
+
+
+def test_export_unordered_pages(tmp_path):
+    out = tmp_path / "export.jsonl"
+    buckets = FakeBuckets()
+    with pytest.raises(UnorderedExportError):
+        export_query(buckets, "select *", out, page_size=10, concurrency=4)
+    assert buckets.offsets == [0]
+    assert not Checkpoint.path_for(out).exists()
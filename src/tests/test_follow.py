@@ -0,0 +1,163 @@
+import os
+import time
+import threading
+
+from adacord.cli.follow import (
+    FollowState,
+    FileFollower,
+    follow_file,
+    parse_lines,
+)
+
+
+class FakeBucket:
+    uuid = "123"
+
+    def __init__(self):
+        self.pushed = []
+
+    def push_data(self, rows, **kwargs):
+        self.pushed.append(list(rows))
+
+
+def test_file_follower_partial_lines(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_bytes(b'{"id": 0}\n{"id"')
+    follower = FileFollower(path)
+    assert follower.read_lines() == [b'{"id": 0}']
+    assert follower.position == 10
+    assert follower.read_lines() == []
+
+    with open(path, "ab") as f:
+        f.write(b": 1}\n")
+    assert follower.read_lines() == [b'{"id": 1}']
+    assert follower.position == path.stat().st_size
+    follower.close()
+
+
+def test_file_follower_rotation(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_bytes(b"old 0\n")
+    follower = FileFollower(path)
+    assert follower.read_lines() == [b"old 0"]
+
+    with open(path, "ab") as f:
+        f.write(b"old 1\n")
+    os.rename(path, tmp_path / "app.log.1")
+    path.write_bytes(b"new 0\n")
+
+    # The rest of the old file first, then the new file.
+    assert follower.read_lines() == [b"old 1"]
+    assert follower.read_lines() == []
+    assert follower.read_lines() == [b"new 0"]
+    follower.close()
+
+
+def test_file_follower_truncation(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_bytes(b"line 0\nline 1\n")
+    follower = FileFollower(path)
+    assert len(follower.read_lines()) == 2
+
+    path.write_bytes(b"line 2\n")
+    assert follower.read_lines() == []
+    assert follower.read_lines() == [b"line 2"]
+    follower.close()
+
+
+def test_file_follower_resume(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_bytes(b"line 0\nline 1\n")
+    inode = path.stat().st_ino
+    follower = FileFollower(path, inode=inode, offset=7)
+    assert follower.read_lines() == [b"line 1"]
+    follower.close()
+
+    # Another file: the offset is not valid anymore.
+    follower = FileFollower(path, inode=inode + 1, offset=7)
+    assert len(follower.read_lines()) == 2
+    follower.close()
+
+
+def test_parse_lines():
+    errors = []
+    lines = [b'{"id": 0}', b"", b'{"id": ', b'{"id": 1}']
+    rows, skipped = parse_lines(lines, lambda *args: errors.append(args))
+    assert rows == [{"id": 0}, {"id": 1}]
+    assert skipped == 1
+    assert errors[0][0] == b'{"id": '
+
+
+def run_follow(bucket, path, tmp_path, pushes):
+    stop = threading.Event()
+
+    def on_push(rows, summary):
+        if len(bucket.pushed) >= pushes:
+            stop.set()
+
+    thread = threading.Thread(
+        target=follow_file,
+        args=(bucket, path),
+        kwargs={
+            "linger": 0.01,
+            "poll_interval": 0.01,
+            "on_push": on_push,
+            "stop": stop,
+            "base_path": tmp_path / "follow",
+        },
+    )
+    thread.start()
+    return thread, stop
+
+
+def test_follow_file(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_text('{"id": 0}\n{"id": 1}\n')
+    bucket = FakeBucket()
+    thread, stop = run_follow(bucket, path, tmp_path, pushes=2)
+
+    time.sleep(0.1)
+    with open(path, "a") as f:
+        f.write('{"id": 2}\n')
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    assert bucket.pushed == [[{"id": 0}, {"id": 1}], [{"id": 2}]]
+
+    state = FollowState.load("123", path, tmp_path / "follow")
+    assert state.offset == path.stat().st_size
+
+    # A restart doesn't push the same lines again.
+    with open(path, "a") as f:
+        f.write('{"id": 3}\n')
+    bucket = FakeBucket()
+    thread, stop = run_follow(bucket, path, tmp_path, pushes=1)
+    thread.join(timeout=5)
+    assert bucket.pushed == [[{"id": 3}]]
+
+
+def test_follow_file_skips_malformed_lines(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_text('{"id": 0}\nnot json\n{"id": 1}\n')
+    bucket = FakeBucket()
+    thread, stop = run_follow(bucket, path, tmp_path, pushes=1)
+    thread.join(timeout=5)
+    assert bucket.pushed == [[{"id": 0}, {"id": 1}]]
+
+    # Only a malformed line: the position still moves past it.
+    with open(path, "a") as f:
+        f.write("not json either\n")
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=follow_file,
+        args=(FakeBucket(), path),
+        kwargs={
+            "poll_interval": 0.01,
+            "on_error": lambda line, error: stop.set(),
+            "stop": stop,
+            "base_path": tmp_path / "follow",
+        },
+    )
+    thread.start()
+    thread.join(timeout=5)
+    state = FollowState.load("123", path, tmp_path / "follow")
+    assert state.offset == path.stat().st_size
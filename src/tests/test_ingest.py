@@ -0,0 +1,119 @@
+import io
+import gzip
+import threading
+
+import pytest
+
+from adacord.cli.ingest import (
+    DataFileFormat,
+    push_files,
+    read_stdin,
+    detect_format,
+    read_data_file,
+    find_data_files,
+)
+from adacord.cli.uploads import PushSummary
+
+
+class FakeBucket:
+    uuid = "123"
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.pushed = []
+        self._lock = threading.Lock()
+
+    def push_data(self, rows, journal, **kwargs):
+        rows = list(rows)
+        if self.fail_on and any(row == self.fail_on for row in rows):
+            raise ValueError("Boom")
+        with self._lock:
+            self.pushed.extend(rows)
+        summary = PushSummary()
+        summary.rows = len(rows)
+        summary.finish()
+        return summary
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        "adacord.cli.journal.JOURNAL_PATH", tmp_path / "journal"
+    )
+    data = tmp_path / "data"
+    (data / "2021" / "01").mkdir(parents=True)
+    (data / "2021" / "01" / "part-0.jsonl").write_text('{"id": 0}\n')
+    (data / "2021" / "01" / "part-1.csv").write_text("id\n1\n")
+    (data / "2021" / "part-2.json.gz").write_bytes(
+        gzip.compress(b'[{"id": 2}]')
+    )
+    (data / "README.md").write_text("Not data")
+    return data
+
+
+def test_detect_format():
+    assert detect_format("data.csv") == DataFileFormat.csv
+    assert detect_format("data.JSON") == DataFileFormat.json
+    assert detect_format("data.ndjson.zst") == DataFileFormat.jsonlines
+    with pytest.raises(ValueError):
+        detect_format("data.txt")
+
+
+def test_find_data_files(data_dir):
+    files = find_data_files([str(data_dir)])
+    assert [file.name for file in files] == [
+        "part-0.jsonl",
+        "part-1.csv",
+        "part-2.json.gz",
+    ]
+    files = find_data_files([str(data_dir / "**" / "part-*.jsonl")])
+    assert [file.name for file in files] == ["part-0.jsonl"]
+    # Duplicates are pushed once.
+    files = find_data_files([str(data_dir), str(data_dir / "2021")])
+    assert len(files) == 3
+    with pytest.raises(FileNotFoundError):
+        find_data_files([str(data_dir / "missing.csv")])
+
+
+def test_read_data_file(data_dir):
+    path = data_dir / "2021" / "01" / "part-1.csv"
+    assert list(read_data_file(path)) == [{"id": "1"}]
+    assert list(read_data_file(path, infer_types=True)) == [{"id": 1}]
+
+
+def test_read_stdin():
+    stream = io.BytesIO(b'{"id": 0}\n\n{"id": 1}\n')
+    assert list(read_stdin(stream=stream)) == [{"id": 0}, {"id": 1}]
+
+    stream = io.BytesIO(b"id;name\n1;a\n")
+    rows = read_stdin(
+        DataFileFormat.csv, stream=stream, delimiter=";", infer_types=True
+    )
+    assert list(rows) == [{"id": 1, "name": "a"}]
+
+    stream = io.BytesIO(b'[{"id": 0}, {"id": 1}]')
+    rows = read_stdin(DataFileFormat.json, stream=stream)
+    assert list(rows) == [{"id": 0}, {"id": 1}]
+
+
+def test_push_files(data_dir):
+    bucket = FakeBucket()
+    results = []
+    files = find_data_files([str(data_dir)])
+    ingest = push_files(
+        bucket, files, file_workers=2, infer_types=True, on_file=results.append
+    )
+    assert ingest.ok
+    assert ingest.files == 3
+    assert ingest.rows == 3
+    assert sorted(row["id"] for row in bucket.pushed) == [0, 1, 2]
+    assert sorted(result.file for result in results) == files
+
+
+def test_push_files_failure(data_dir):
+    bucket = FakeBucket(fail_on={"id": 2})
+    files = find_data_files([str(data_dir)])
+    ingest = push_files(bucket, files, infer_types=True)
+    assert not ingest.ok
+    assert [result.file.name for result in ingest.failed] == ["part-2.json.gz"]
+    assert ingest.rows == 2
@@ -0,0 +1,76 @@
+import pytest
+
+from adacord.cli.journal import PushJournal
+from adacord.cli.uploads import Chunk
+
+ROWS = [{"id": index} for index in range(25)]
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    filepath = tmp_path / "data.jsonl"
+    filepath.write_text('{"id": 1}\n')
+    return filepath
+
+
+def open_journal(data_file, resume=True, **options):
+    base_path = data_file.parent / "journal"
+    return PushJournal.open(
+        "bucket", data_file, resume=resume, base_path=base_path, **options
+    )
+
+
+def test_pending_chunks(data_file):
+    journal = open_journal(data_file, batch_size=10)
+    chunks = list(journal.pending(iter(ROWS)))
+    assert [chunk.rows for chunk in chunks] == [10, 10, 5]
+    assert [chunk.key for chunk in chunks] == [
+        f"{journal.push_id}-{index}" for index in range(3)
+    ]
+    assert chunks[0].headers["Idempotency-Key"] == chunks[0].key
+
+
+def test_ack_out_of_order(data_file):
+    journal = open_journal(data_file, batch_size=10)
+    journal.ack(Chunk(1, b"", 10))
+    assert (journal.rows, journal.chunks, journal.acked) == (0, 0, {1: 10})
+    journal.ack(Chunk(0, b"", 10))
+    assert (journal.rows, journal.chunks, journal.acked) == (20, 2, {})
+
+
+def test_resume(data_file):
+    journal = open_journal(data_file, batch_size=10)
+    journal.ack(Chunk(0, b"", 10))
+    journal.ack(Chunk(2, b"", 5))
+
+    # The chunk sizes of the first attempt win.
+    resumed = open_journal(data_file, batch_size=3)
+    assert resumed.resumed
+    assert resumed.push_id == journal.push_id
+    assert resumed.batch_size == 10
+    chunks = list(resumed.pending(iter(ROWS)))
+    assert [(chunk.index, chunk.rows) for chunk in chunks] == [(1, 10)]
+    assert chunks[0].key == f"{journal.push_id}-1"
+    assert chunks[0].payload.startswith(b'{"data":[{"id":10}')
+
+
+def test_no_resume(data_file):
+    journal = open_journal(data_file, batch_size=10)
+    journal.ack(Chunk(0, b"", 10))
+    assert not open_journal(data_file, resume=False).resumed
+
+
+def test_changed_file_starts_over(data_file):
+    journal = open_journal(data_file, batch_size=10)
+    journal.ack(Chunk(0, b"", 10))
+    data_file.write_text('{"id": 1}\n{"id": 2}\n')
+    assert not open_journal(data_file).resumed
+
+
+def test_delete(data_file):
+    journal = open_journal(data_file)
+    journal.ack(Chunk(0, b"", 10))
+    assert journal.path.exists()
+    journal.delete()
+    assert not journal.path.exists()
+    journal.delete()
@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+from adacord.cli.jsonstream import iter_batches, iter_json_array
+
+
+def split(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        end = start + size
+        yield data[start:end]
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 1024])
+def test_iter_json_array(size):
+    rows = [
+        {"id": index, "name": "é" * index, "values": [1.5, None, True]}
+        for index in range(20)
+    ]
+    rows += [12345, "text", None]
+    data = json.dumps(rows, indent=2).encode("utf-8")
+    assert list(iter_json_array(split(data, size))) == rows
+
+
+def test_iter_json_array_is_lazy():
+    def chunks():
+        yield b'[{"a": 1}, '
+        raise AssertionError("read too much")
+
+    assert next(iter_json_array(chunks())) == {"a": 1}
+
+
+def test_iter_json_array_single_object():
+    assert list(iter_json_array([b'{"a"', b": 1}"])) == [{"a": 1}]
+
+
+def test_iter_json_array_empty():
+    assert list(iter_json_array([b" [ ] "])) == []
+    assert list(iter_json_array([])) == []
+
+
+def test_iter_json_array_numbers_across_chunks():
+    chunks = [b"[1", b".", b"5e", b"-", b"3, 2", b"]"]
+    assert list(iter_json_array(chunks)) == [1.5e-3, 2]
+
+
+def test_iter_json_array_invalid_is_not_refilled():
+    def chunks():
+        yield b'[{"a": 1}, {"a" 1}, {"a": 2}, ' + b" " * 100
+        raise AssertionError("read too much")
+
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_array(chunks()))
+
+
+@pytest.mark.parametrize("data", [b"[1 2]", b"[1, 2", b"[1,]", b"[1] 2"])
+def test_iter_json_array_invalid(data):
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_array([data]))
+
+
+def test_iter_batches():
+    assert list(iter_batches(range(5), 2)) == [[0, 1], [2, 3], [4]]
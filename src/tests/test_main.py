@@ -0,0 +1,72 @@
+import sys
+import subprocess
+from pathlib import Path
+
+import pytest
+
+import adacord
+
+SRC_PATH = str(Path(adacord.__file__).resolve().parents[1])
+
+
+def run_python(code: str, *args, tmp_path: Path):
+    env = {"PYTHONPATH": SRC_PATH, "HOME": str(tmp_path)}
+    return subprocess.run(
+        [sys.executable, "-c", code, *args],
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+
+
+def test_cli_startup_does_not_import_the_commands(tmp_path):
+    code = (
+        "import sys\n"
+        "import adacord.cli.main\n"
+        "assert 'requests' not in sys.modules\n"
+        "assert 'adacord.cli.bucket' not in sys.modules\n"
+    )
+    result = run_python(code, tmp_path=tmp_path)
+    assert result.returncode == 0, result.stderr
+
+
+@pytest.mark.parametrize(
+    "args", [["--help"], ["login", "--help"], ["bucket", "list", "--help"]]
+)
+def test_cli_help(tmp_path, args):
+    code = "from adacord.cli.main import app; app(prog_name='adacord')"
+    result = run_python(code, *args, tmp_path=tmp_path)
+    assert result.returncode == 0, result.stderr
+    assert "Usage: adacord" in result.stdout
+
+
+def test_top_level_help_lists_all_commands(tmp_path):
+    code = (
+        "import sys\n"
+        "from adacord.cli.main import app\n"
+        "try:\n"
+        "    app(['--help'], prog_name='adacord')\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        "assert 'requests' not in sys.modules\n"
+    )
+    result = run_python(code, tmp_path=tmp_path)
+    assert result.returncode == 0, result.stderr
+    for name in ["user", "login", "logout", "bucket", "api_tokens", "spool"]:
+        assert name in result.stdout
+
+
+def test_lazy_sdk_attributes():
+    assert adacord.api.__name__ == "AdacordApi"
+    assert callable(adacord.get_token)
+    assert "api" in dir(adacord)
+    with pytest.raises(AttributeError):
+        adacord.missing
+
+
+def test_top_level_help_offers_completion(tmp_path):
+    code = "from adacord.cli.main import app; app(prog_name='adacord')"
+    result = run_python(code, "--help", tmp_path=tmp_path)
+    assert "--install-completion" in result.stdout
+    assert "--show-completion" in result.stdout
@@ -0,0 +1,64 @@
+import io
+import csv
+import json
+
+import pytest
+
+from adacord.cli.output import (
+    OutputFormat,
+    BufferedOutput,
+    echo_table,
+    write_rows,
+)
+
+ROWS = [{"id": 1, "name": "a", "tags": ["x"]}, {"id": 2, "name": "b"}]
+
+
+def write(rows, output, **kwargs) -> str:
+    stream = io.BytesIO()
+    write_rows(rows, output, stream=stream, **kwargs)
+    return stream.getvalue().decode("utf-8")
+
+
+def test_jsonl():
+    lines = write(iter(ROWS), OutputFormat.jsonl).splitlines()
+    assert [json.loads(line) for line in lines] == ROWS
+
+
+@pytest.mark.parametrize("rows", [ROWS, []])
+def test_json(rows):
+    assert json.loads(write(iter(rows), OutputFormat.json)) == rows
+
+
+def test_csv():
+    output = write(iter(ROWS), OutputFormat.csv)
+    rows = list(csv.DictReader(io.StringIO(output)))
+    assert rows == [
+        {"id": "1", "name": "a", "tags": '["x"]'},
+        {"id": "2", "name": "b", "tags": ""},
+    ]
+
+
+def test_csv_columns():
+    output = write(ROWS, OutputFormat.csv, columns=("name",))
+    assert output.splitlines() == ["name", "a", "b"]
+    assert write([], OutputFormat.csv) == ""
+
+
+def test_buffered_output():
+    stream = io.BytesIO()
+    out = BufferedOutput(stream, buffer_size=10)
+    out.write(b"12345")
+    assert stream.getvalue() == b""
+    out.write(b"67890")
+    assert stream.getvalue() == b"1234567890"
+    out.write(b"x")
+    out.flush()
+    assert stream.getvalue() == b"1234567890x"
+
+
+def test_table(capsys):
+    echo_table(ROWS, columns=("id", "name"), headers=("ID", "Name"))
+    table = capsys.readouterr().out
+    assert "Name" in table
+    assert "tags" not in table
@@ -0,0 +1,66 @@
+import gzip
+
+import pytest
+
+from adacord.cli.parallel import (
+    decode_range,
+    split_ranges,
+    iter_jsonlines_batches,
+    iter_jsonlines_parallel,
+)
+
+ROWS = [{"id": index, "name": f"row {index}"} for index in range(100)]
+
+
+@pytest.fixture
+def jsonl_filepath(tmp_path):
+    filepath = tmp_path / "data.jsonl"
+    lines = [f'{{"id": {row["id"]}, "name": "{row["name"]}"}}' for row in ROWS]
+    # A blank line and no trailing newline.
+    filepath.write_text("\n".join(lines[:50] + [""] + lines[50:]))
+    return filepath
+
+
+def test_split_ranges(jsonl_filepath):
+    data = jsonl_filepath.read_bytes()
+    ranges = split_ranges(jsonl_filepath, range_bytes=100)
+    assert len(ranges) > 1
+    assert ranges[0][0] == 0
+    assert ranges[-1][1] == len(data)
+    for (_, end), (start, _) in zip(ranges, ranges[1:]):
+        assert end == start
+        assert data[end - 1] == ord("\n")
+
+
+def test_split_ranges_empty_file(tmp_path):
+    filepath = tmp_path / "empty.jsonl"
+    filepath.write_bytes(b"")
+    assert split_ranges(filepath) == []
+
+
+def test_decode_range(jsonl_filepath):
+    rows = []
+    for start, end in split_ranges(jsonl_filepath, range_bytes=64):
+        rows.extend(decode_range(jsonl_filepath, start, end))
+    assert rows == ROWS
+
+
+def test_iter_jsonlines_batches_ordered(jsonl_filepath):
+    batches = list(
+        iter_jsonlines_batches(jsonl_filepath, workers=2, range_bytes=200)
+    )
+    assert len(batches) > 1
+    assert [row for batch in batches for row in batch] == ROWS
+
+
+def test_iter_jsonlines_parallel_unordered(jsonl_filepath):
+    rows = iter_jsonlines_parallel(
+        jsonl_filepath, workers=2, ordered=False, range_bytes=200
+    )
+    assert sorted(rows, key=lambda row: row["id"]) == ROWS
+
+
+def test_iter_jsonlines_batches_compressed(tmp_path, jsonl_filepath):
+    filepath = tmp_path / "data.jsonl.gz"
+    filepath.write_bytes(gzip.compress(jsonl_filepath.read_bytes()))
+    assert list(iter_jsonlines_parallel(filepath, workers=2)) == ROWS
@@ -0,0 +1,65 @@
+import time
+from email.utils import formatdate
+
+import pytest
+
+from adacord.cli.retries import RetryBudget, RetryPolicy, parse_retry_after
+
+
+@pytest.fixture
+def policy() -> RetryPolicy:
+    return RetryPolicy(retries=3, backoff_factor=1, jitter=False)
+
+
+def test_parse_retry_after():
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("3") == 3
+    assert parse_retry_after("not a date") is None
+    in_a_minute = formatdate(timeval=time.time() + 60)
+    assert 55 < parse_retry_after(in_a_minute) <= 60
+
+
+def test_backoff(policy):
+    assert [policy.backoff(attempt) for attempt in range(4)] == [1, 2, 4, 8]
+    policy.max_backoff = 3
+    assert policy.backoff(3) == 3
+
+
+def test_backoff_jitter():
+    policy = RetryPolicy(backoff_factor=1, jitter=True)
+    assert all(0 <= policy.backoff(2) <= 4 for _ in range(100))
+
+
+def test_retry_delay_statuses(policy):
+    assert policy.retry_delay("GET", {}, 0, status_code=503) == 1
+    assert policy.retry_delay("GET", {}, 1, status_code=500) == 2
+    assert policy.retry_delay("GET", {}, 0, status_code=404) is None
+    assert policy.retry_delay("GET", {}, 3, status_code=503) is None
+
+
+def test_retry_delay_post(policy):
+    # The server rejected the request, it's safe to send it again.
+    assert policy.retry_delay("POST", {}, 0, status_code=429) == 1
+    assert policy.retry_delay("POST", {}, 0, status_code=503) == 1
+    # The request could have been processed.
+    assert policy.retry_delay("POST", {}, 0, status_code=502) is None
+    assert policy.retry_delay("POST", {}, 0) is None
+    assert policy.retry_delay("POST", {}, 0, maybe_processed=False) == 1
+    headers = {"Idempotency-Key": "123"}
+    assert policy.retry_delay("POST", headers, 0, status_code=502) == 1
+
+
+def test_retry_delay_retry_after(policy):
+    assert policy.retry_delay("GET", {}, 0, 429, retry_after="10") == 10
+    assert policy.retry_delay("GET", {}, 0, 429, retry_after="600") is None
+
+
+def test_retry_budget():
+    budget = RetryBudget(ratio=0.5, capacity=2)
+    policy = RetryPolicy(backoff_factor=0, budget=budget)
+    assert policy.retry_delay("GET", {}, 0, status_code=503) == 0
+    assert policy.retry_delay("GET", {}, 0, status_code=503) == 0
+    assert policy.retry_delay("GET", {}, 0, status_code=503) is None
+    policy.record_request()
+    policy.record_request()
+    assert policy.retry_delay("GET", {}, 0, status_code=503) == 0
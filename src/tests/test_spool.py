@@ -0,0 +1,154 @@
+import json
+import time
+
+import pytest
+
+from adacord.cli.spool import Spool, SpoolDrainer
+from adacord.cli.writer import BucketWriter
+from adacord.cli.exceptions import PushError, AdacordApiError
+
+
+class FakeSend:
+    def __init__(self, fail_after=None, status_code=503):
+        self.fail_after = fail_after
+        self.status_code = status_code
+        self.chunks = []
+        self.keys = []
+
+    def __call__(self, chunk):
+        self.keys.append(chunk.key)
+        if self.fail_after is not None and len(self.chunks) >= self.fail_after:
+            raise AdacordApiError("Unavailable", self.status_code)
+        self.chunks.append(chunk)
+
+    @property
+    def rows(self):
+        return [
+            row
+            for chunk in self.chunks
+            for row in json.loads(chunk.payload)["data"]
+        ]
+
+
+ROWS = [{"id": index} for index in range(25)]
+
+
+def test_spool_append_and_drain(tmp_path):
+    spool = Spool(tmp_path / "bucket", segment_bytes=50)
+    assert spool.append(ROWS[:10]) == 10
+    assert spool.append(ROWS[10:]) == 15
+    assert len(spool.segments()) == 2
+    assert spool.pending_bytes() > 0
+
+    send = FakeSend()
+    summary = spool.drain(send, batch_size=10, retries=0)
+    assert send.rows == ROWS
+    assert summary.rows == 25
+    assert spool.pending_bytes() == 0
+    # The drained segments are deleted, but the last one.
+    assert len(spool.segments()) == 1
+
+    spool.append(ROWS[:1])
+    send = FakeSend()
+    spool.drain(send)
+    assert send.rows == ROWS[:1]
+
+
+def test_spool_drain_failure_keeps_the_rows(tmp_path):
+    spool = Spool(tmp_path / "bucket")
+    spool.append(ROWS)
+    send = FakeSend(fail_after=1)
+    with pytest.raises(PushError):
+        spool.drain(send, batch_size=10, retries=0)
+    assert send.rows == ROWS[:10]
+
+    # The cursor survives a restart, the failed chunk gets the same key.
+    spool = Spool(tmp_path / "bucket")
+    retry = FakeSend()
+    spool.drain(retry, batch_size=10)
+    assert retry.rows == ROWS[10:]
+    assert retry.keys[0] == send.keys[1]
+
+
+def test_spool_skips_partial_line(tmp_path):
+    spool = Spool(tmp_path / "bucket")
+    spool.append(ROWS[:1])
+    with open(spool.segment_path(spool.segments()[-1]), "ab") as f:
+        f.write(b'{"id":')
+    send = FakeSend()
+    spool.drain(send)
+    assert send.rows == ROWS[:1]
+
+
+def test_spool_list(tmp_path):
+    Spool.for_bucket("a", base_path=tmp_path).append(ROWS[:1])
+    Spool.for_bucket("b", base_path=tmp_path)
+    spools = Spool.list(tmp_path)
+    assert list(spools) == ["a", "b"]
+    assert spools["a"].status()["pending_bytes"] > 0
+    assert Spool.list(tmp_path / "missing") == {}
+
+
+def test_spool_drainer(tmp_path):
+    spool = Spool(tmp_path / "bucket")
+    spool.append(ROWS)
+    send = FakeSend()
+    drainer = SpoolDrainer(spool, send, interval=0.01).start()
+    deadline = time.monotonic() + 2
+    while len(send.rows) < len(ROWS) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    drainer.stop()
+    assert send.rows == ROWS
+
+
+def test_writer_spills_to_spool(tmp_path):
+    spool = Spool(tmp_path / "bucket")
+    send = FakeSend(fail_after=0)
+    writer = BucketWriter(
+        send, batch_size=10, retries=0, spool=spool, drain_interval=60
+    )
+    for row in ROWS:
+        writer.write(row)
+    writer.close()
+    assert writer.spooled == 25
+    assert writer.summary.ok
+
+    send = FakeSend()
+    spool.drain(send)
+    assert send.rows == ROWS
+
+
+def test_writer_pushes_spooled_rows_in_order(tmp_path):
+    spool = Spool(tmp_path / "bucket")
+    send = FakeSend(fail_after=1)
+    writer = BucketWriter(
+        send,
+        batch_size=5,
+        max_queued_rows=1,
+        retries=0,
+        spool=spool,
+        drain_interval=0.01,
+    )
+    for row in ROWS[:15]:
+        writer.write(row)
+    writer.flush()
+    # The API is back: the spooled rows go first, then the new ones.
+    send.fail_after = None
+    for row in ROWS[15:]:
+        writer.write(row)
+    deadline = time.monotonic() + 2
+    while len(send.rows) < len(ROWS) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    writer.close()
+    assert send.rows == ROWS
+    assert spool.pending_bytes() == 0
+
+
+def test_writer_does_not_spool_client_errors(tmp_path):
+    spool = Spool(tmp_path / "bucket")
+    send = FakeSend(fail_after=0, status_code=400)
+    writer = BucketWriter(send, retries=0, spool=spool, drain_interval=60)
+    writer.write(ROWS[0])
+    with pytest.raises(AdacordApiError):
+        writer.close()
+    assert spool.pending_bytes() == 0
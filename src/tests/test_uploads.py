@@ -0,0 +1,176 @@
+import json
+import time
+import threading
+
+import typer
+import pytest
+
+from adacord.cli.retries import RetryBudget
+from adacord.cli.uploads import (
+    Chunk,
+    PushSummary,
+    ChunkedUploader,
+    iter_chunks,
+    iter_lingering_chunks,
+)
+from adacord.cli.exceptions import PushError, AdacordApiError, cli_wrapper
+
+
+def make_rows(count):
+    return ({"id": index, "value": "x" * 10} for index in range(count))
+
+
+def test_iter_chunks_by_batch_size():
+    chunks = list(iter_chunks(make_rows(25), batch_size=10))
+    assert [chunk.rows for chunk in chunks] == [10, 10, 5]
+    assert [chunk.index for chunk in chunks] == [0, 1, 2]
+    payload = json.loads(chunks[2].payload)
+    assert payload == {"data": list(make_rows(25))[20:]}
+
+
+def test_iter_chunks_by_max_bytes():
+    max_batch_bytes = 100
+    chunks = list(
+        iter_chunks(
+            make_rows(25), batch_size=None, max_batch_bytes=max_batch_bytes
+        )
+    )
+    assert sum(chunk.rows for chunk in chunks) == 25
+    assert all(chunk.size <= max_batch_bytes for chunk in chunks)
+    rows = [
+        row for chunk in chunks for row in json.loads(chunk.payload)["data"]
+    ]
+    assert rows == list(make_rows(25))
+
+
+def test_iter_chunks_oversized_row():
+    rows = [{"value": "x" * 100}, {"value": "y"}]
+    chunks = list(iter_chunks(rows, batch_size=None, max_batch_bytes=50))
+    assert [chunk.rows for chunk in chunks] == [1, 1]
+
+
+def test_iter_chunks_empty():
+    assert list(iter_chunks([])) == []
+
+
+def test_iter_lingering_chunks():
+    def slow_rows():
+        yield {"id": 0}
+        yield {"id": 1}
+        # The first chunk is sent while the stream waits.
+        time.sleep(0.3)
+        yield {"id": 2}
+
+    chunks = iter_lingering_chunks(slow_rows(), batch_size=10, linger=0.05)
+    started = time.monotonic()
+    first = next(chunks)
+    assert time.monotonic() - started < 0.25
+    assert json.loads(first.payload) == {"data": [{"id": 0}, {"id": 1}]}
+    assert [chunk.rows for chunk in chunks] == [1]
+
+
+def test_iter_lingering_chunks_full_batches():
+    rows = ({"id": index} for index in range(25))
+    chunks = iter_lingering_chunks(rows, batch_size=10, linger=60)
+    assert [chunk.rows for chunk in chunks] == [10, 10, 5]
+
+
+def test_iter_lingering_chunks_reader_error():
+    def broken_rows():
+        yield {"id": 0}
+        raise ValueError("Bad row")
+
+    chunks = iter_lingering_chunks(broken_rows(), batch_size=10, linger=60)
+    assert next(chunks).rows == 1
+    with pytest.raises(ValueError):
+        next(chunks)
+
+
+def test_chunked_uploader():
+    sent = []
+    progress = []
+    uploader = ChunkedUploader(
+        send=sent.append,
+        on_progress=lambda chunk, summary: progress.append(summary.rows),
+    )
+    summary = uploader.push(iter_chunks(make_rows(25), batch_size=10))
+    assert all(isinstance(chunk, Chunk) for chunk in sent)
+    assert progress == [10, 20, 25]
+    assert summary.chunks == 3
+    assert summary.rows == 25
+    assert summary.bytes == sum(chunk.size for chunk in sent)
+
+
+def test_chunked_uploader_concurrency():
+    lock = threading.Lock()
+    in_flight = []
+    max_in_flight = []
+
+    def send(chunk):
+        with lock:
+            in_flight.append(chunk)
+            max_in_flight.append(len(in_flight))
+        with lock:
+            in_flight.remove(chunk)
+
+    uploader = ChunkedUploader(send=send, concurrency=4)
+    summary = uploader.push(iter_chunks(make_rows(100), batch_size=10))
+    assert summary.chunks == 10
+    assert summary.rows == 100
+    assert max(max_in_flight) <= 4
+
+
+def test_chunked_uploader_retries_failed_chunk():
+    attempts = []
+
+    def send(chunk):
+        attempts.append(chunk.index)
+        if chunk.index == 1 and attempts.count(1) < 3:
+            raise AdacordApiError("unavailable", status_code=503)
+
+    uploader = ChunkedUploader(send=send, retries=3, backoff=0)
+    summary = uploader.push(iter_chunks(make_rows(30), batch_size=10))
+    assert summary.ok
+    assert summary.rows == 30
+    assert summary.retries == 2
+    assert attempts == [0, 1, 1, 1, 2]
+
+
+def test_chunked_uploader_send_chunk():
+    attempts = []
+
+    def send(chunk):
+        attempts.append(chunk.index)
+        raise AdacordApiError("unavailable", status_code=503)
+
+    budget = RetryBudget(ratio=0, capacity=2)
+    uploader = ChunkedUploader(send=send, retries=5, backoff=0, budget=budget)
+    summary = PushSummary()
+    chunk = next(iter_chunks(make_rows(5)))
+    with pytest.raises(AdacordApiError):
+        uploader.send_chunk(chunk, summary)
+    # The budget stops the retries before `retries` does.
+    assert attempts == [0, 0, 0]
+    assert summary.retries == 2
+    assert summary.chunks == 0
+
+
+def test_chunked_uploader_raises_on_failure():
+    def send(chunk):
+        if chunk.index == 1:
+            raise AdacordApiError("bad data", status_code=400)
+
+    uploader = ChunkedUploader(send=send, retries=3, backoff=0)
+    with pytest.raises(PushError) as error:
+        uploader.push(iter_chunks(make_rows(50), batch_size=10))
+    summary = error.value.summary
+    assert error.value.status_code == 400
+    assert summary.retries == 0
+    assert [chunk.index for chunk, _ in summary.failed] == [1]
+    assert summary.rows == 10
+
+    # A failed push exits with an error code.
+    push = cli_wrapper(uploader.push)
+    with pytest.raises(typer.Exit) as exit:
+        push(iter_chunks(make_rows(50), batch_size=10))
+    assert exit.value.exit_code == 1
@@ -0,0 +1,111 @@
+import json
+import time
+import threading
+from queue import Full
+
+import pytest
+
+from adacord.cli.writer import BucketWriter
+from adacord.cli.exceptions import AdacordApiError
+
+
+class FakeSend:
+    def __init__(self, fail=False, delay=0):
+        self.fail = fail
+        self.delay = delay
+        self.chunks = []
+
+    def __call__(self, chunk):
+        time.sleep(self.delay)
+        if self.fail:
+            raise AdacordApiError("Bad request", 400)
+        self.chunks.append(chunk)
+
+    @property
+    def rows(self):
+        return [
+            row
+            for chunk in self.chunks
+            for row in json.loads(chunk.payload)["data"]
+        ]
+
+
+def test_writer_batches_rows():
+    send = FakeSend()
+    with BucketWriter(send, batch_size=10, linger=60) as writer:
+        for index in range(25):
+            writer.write({"id": index})
+    assert [chunk.rows for chunk in send.chunks] == [10, 10, 5]
+    assert send.rows == [{"id": index} for index in range(25)]
+    assert writer.summary.rows == 25
+    assert len({chunk.key for chunk in send.chunks}) == 3
+
+
+def test_writer_linger():
+    send = FakeSend()
+    writer = BucketWriter(send, batch_size=100, linger=0.05)
+    writer.write({"id": 0})
+    deadline = time.monotonic() + 2
+    while not send.chunks and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert send.rows == [{"id": 0}]
+    writer.close()
+
+
+def test_writer_flush():
+    send = FakeSend()
+    writer = BucketWriter(send, batch_size=100, linger=60)
+    writer.write({"id": 0})
+    writer.flush()
+    assert send.rows == [{"id": 0}]
+    writer.write({"id": 1})
+    writer.close()
+    assert send.rows == [{"id": 0}, {"id": 1}]
+    with pytest.raises(ValueError):
+        writer.write({"id": 2})
+
+
+def test_writer_backpressure():
+    send = FakeSend(delay=0.2)
+    writer = BucketWriter(send, batch_size=1, linger=60, max_queued_rows=1)
+    writer.write({"id": 0})
+    writer.write({"id": 1})
+    # The second row made the first one a full chunk, being sent.
+    time.sleep(0.05)
+    writer.write({"id": 2})
+    with pytest.raises(Full):
+        writer.write({"id": 3}, timeout=0.01)
+    writer.close()
+    assert len(send.rows) == 3
+
+
+def test_writer_failure():
+    send = FakeSend(fail=True)
+    writer = BucketWriter(send, linger=60, retries=0)
+    writer.write({"id": 0})
+    with pytest.raises(AdacordApiError):
+        writer.flush()
+    with pytest.raises(AdacordApiError):
+        writer.write({"id": 1})
+    assert not writer.summary.ok
+    with pytest.raises(AdacordApiError):
+        writer.close()
+
+
+def test_writer_from_many_threads():
+    send = FakeSend()
+    with BucketWriter(send, batch_size=50, linger=0.01) as writer:
+        threads = [
+            threading.Thread(
+                target=lambda start: [
+                    writer.write({"id": start + index}) for index in range(100)
+                ],
+                args=(start,),
+            )
+            for start in range(0, 400, 100)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert sorted(row["id"] for row in send.rows) == list(range(400))